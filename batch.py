@@ -0,0 +1,136 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# LOTES DE MENSAGENS CURTAS: UM BUFFER CONCATENADO E UM ARRAY DE OFFSETS
+
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+from bits import Bits, BitWriter, as_bits, np, to_bit_array, from_bit_array
+
+
+def as_offsets(lengths):
+    """Array de offsets (com o 0 inicial e o total no final) a partir dos tamanhos das mensagens"""
+    offsets = array('q', [0])
+    offsets.extend(accumulate(lengths))
+    return offsets
+
+
+class TextBatch:
+    """Mensagens de texto concatenadas em `text`, com a mensagem i em text[offsets[i]:offsets[i + 1]]"""
+    __slots__ = ('text', 'offsets')
+
+    def __init__(self, text: str, offsets):
+        self.text = text
+        self.offsets = offsets if isinstance(offsets, array) else array('q', offsets)
+        if self.offsets[0] != 0 or self.offsets[-1] != len(text):
+            raise ValueError("Os offsets precisam começar em 0 e terminar no tamanho do texto")
+
+    @classmethod
+    def from_messages(cls, messages):
+        if isinstance(messages, TextBatch):
+            return messages
+        messages = messages if isinstance(messages, (list, tuple)) else list(messages)
+        return cls(''.join(messages), as_offsets(map(len, messages)))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += len(self)
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        text, offsets = self.text, self.offsets
+        return (text[offsets[n]:offsets[n + 1]] for n in range(len(offsets) - 1))
+
+    def lengths(self):
+        offsets = self.offsets
+        return [offsets[n + 1] - offsets[n] for n in range(len(offsets) - 1)]
+
+
+class BitBatch:
+    """Mensagens em bits concatenadas (sem alinhamento entre elas) em `data`, com offsets em bits. data.data é o
+    buffer empacotado"""
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data: Bits, offsets):
+        self.data = data
+        self.offsets = offsets if isinstance(offsets, array) else array('q', offsets)
+        if self.offsets[0] != 0 or self.offsets[-1] != len(data):
+            raise ValueError("Os offsets precisam começar em 0 e terminar no tamanho dos dados")
+
+    @classmethod
+    def from_messages(cls, messages):
+        """Aceita Bits, bytes ou strings de '0'/'1'"""
+        if isinstance(messages, BitBatch):
+            return messages
+        writer = BitWriter()
+        offsets = array('q', [0])
+        for message in messages:
+            writer.write_bits(as_bits(message))
+            offsets.append(len(writer))
+        return cls(writer.getvalue(), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += len(self)
+        return self.data[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        return (self[n] for n in range(len(self)))
+
+    def lengths(self):
+        offsets = self.offsets
+        return [offsets[n + 1] - offsets[n] for n in range(len(offsets) - 1)]
+
+    def is_aligned(self, block_len: int):
+        """Se todas as mensagens têm tamanho múltiplo de block_len"""
+        return all(offset % block_len == 0 for offset in self.offsets)
+
+    def pad(self, block_len: int):
+        """Completa cada mensagem com zeros até um múltiplo de block_len, como o encode dos códigos de blocos"""
+        if self.is_aligned(block_len):
+            return self
+        lengths = self.lengths()
+        offsets = as_offsets(length + (-length % block_len) for length in lengths)
+        if np is not None:
+            """Cada bit vai para a posição dele somada ao padding acumulado das mensagens anteriores"""
+            old_offsets = np.frombuffer(self.offsets, dtype=np.int64)
+            shifts = np.repeat(np.frombuffer(offsets, dtype=np.int64)[:-1] - old_offsets[:-1], lengths)
+            padded = np.zeros(offsets[-1], dtype=np.uint8)
+            padded[np.arange(len(self.data)) + shifts] = to_bit_array(self.data)
+            return BitBatch(from_bit_array(padded), offsets)
+        writer = BitWriter()
+        for message, length in zip(self, lengths):
+            writer.write_bits(message)
+            writer.write(0, -length % block_len)
+        return BitBatch(writer.getvalue(), offsets)
+
+    def get_message_index(self, position: int):
+        """Índice da mensagem que contém o bit `position`"""
+        return bisect_right(self.offsets, position) - 1
+
+
+def get_code_boundaries(code_ends, bit_offsets):
+    """Número de codewords antes de cada offset, dados os finais (cumulativos, em bits) dos codewords decodificados
+    do buffer inteiro. Um offset que cai no meio de um codeword é um erro"""
+    if np is not None:
+        ends = np.asarray(code_ends, dtype=np.int64)
+        offsets = np.frombuffer(bit_offsets, dtype=np.int64)
+        counts = np.searchsorted(ends, offsets, side='right')
+        previous_ends = np.where(counts > 0, ends[np.maximum(counts - 1, 0)] if len(ends) else 0, 0)
+        if np.any(previous_ends != offsets):
+            raise ValueError("Uma das mensagens do lote termina no meio de um codeword")
+        return array('q', counts.tolist())
+    counts = array('q')
+    for offset in bit_offsets:
+        count = bisect_right(code_ends, offset)
+        if (code_ends[count - 1] if count else 0) != offset:
+            raise ValueError("Uma das mensagens do lote termina no meio de um codeword")
+        counts.append(count)
+    return counts
@@ -0,0 +1,214 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# BENCHMARK DOS CODIFICADORES: VAZÃO, MEMÓRIA E BITS POR SÍMBOLO, COM COMPARAÇÃO CONTRA UM BASELINE
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from bits import Bits, np
+from encoders import Encoder, ErrorCorrectionEncoder, Golomb, EliasGamma, FibonacciZeckendorf, Huffman, Rans, RepetitionCode, Crc, Hamming74, Ascii
+
+DEFAULT_SIZES = ['1K', '10K', '100K', '1M', '10M', '100M']
+DEFAULT_THRESHOLD = 0.10
+SEED = 2024
+SIZE_UNITS = {'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+
+ENCODER_FACTORIES = {
+    'ascii': lambda: Ascii("Ascii"),
+    'golomb': lambda: Golomb(Golomb.DEFAULT_K_VALUE, "Golomb"),
+    'elias-gamma': lambda: EliasGamma("Elias-Gamma"),
+    'fibonacci': lambda: FibonacciZeckendorf("Fibonacci/Zeckendorf"),
+    'huffman': lambda: Huffman("Huffman"),
+    'rans': lambda: Rans("rANS"),
+    'repeticao': lambda: RepetitionCode("Código de Repetição"),
+    'crc': lambda: Crc("CRC"),
+    'hamming74': lambda: Hamming74("Hamming(7, 4)"),
+}
+
+
+def parse_size(value: str):
+    value = value.strip().upper()
+    if value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+# Geradores de dados: sempre bytes de 1 a 255, porque Elias-gamma e Fibonacci não codificam o zero
+
+def generate_uniform(size: int, rng: random.Random):
+    return rng.randbytes(size).replace(b'\0', b'\1')
+
+
+def generate_skewed_text(size: int, rng: random.Random):
+    """Letras, espaço e pontuação com frequências no formato de uma lei de Zipf"""
+    alphabet = b' etaoinsrhldcumfpgwybvkxjqz.,\n'
+    weights = [1 / (rank + 1) for rank in range(len(alphabet))]
+    return bytes(rng.choices(alphabet, weights, k=size))
+
+
+def generate_runs(size: int, rng: random.Random):
+    """Baixa entropia: sequências longas (média de 64) de poucos símbolos repetidos"""
+    alphabet = b'ab01'
+    runs = []
+    total = 0
+    while total < size:
+        length = min(int(rng.expovariate(1 / 64)) + 1, size - total)
+        runs.append(bytes([rng.choice(alphabet)]) * length)
+        total += length
+    return b''.join(runs)
+
+
+DISTRIBUTIONS = {
+    'uniforme': generate_uniform,
+    'texto': generate_skewed_text,
+    'sequencias': generate_runs,
+}
+
+
+def get_input(encoder: Encoder, data: bytes):
+    """Codificadores de fonte recebem texto (um símbolo por byte) e os códigos de correção recebem os bits"""
+    if isinstance(encoder, ErrorCorrectionEncoder):
+        return Bits(data)
+    return data.decode('latin-1')
+
+
+def run_once(encoder: Encoder, message):
+    start = time.perf_counter()
+    encoded = encoder.encode(message)
+    middle = time.perf_counter()
+    decoded = encoder.decode(encoded)
+    end = time.perf_counter()
+    if decoded != message:
+        raise AssertionError(f"{encoder.name}: a mensagem decodificada é diferente da original")
+    return middle - start, end - middle, len(encoded)
+
+
+def measure_peak_memory(encoder: Encoder, message):
+    """Pico de memória alocada (tracemalloc) em um encode seguido de decode, medido fora das rodadas de tempo"""
+    tracemalloc.start()
+    try:
+        encoder.decode(encoder.encode(message))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(encoder_name: str, distribution: str, size: int, repeat: int, memory: bool):
+    encoder = ENCODER_FACTORIES[encoder_name]()
+    if isinstance(encoder, ErrorCorrectionEncoder):
+        encoder.quiet = True
+    message = get_input(encoder, DISTRIBUTIONS[distribution](size, random.Random(SEED)))
+    """O melhor tempo de cada fase entre as repetições"""
+    encode_seconds, decode_seconds = float('inf'), float('inf')
+    for _ in range(repeat):
+        encode_time, decode_time, encoded_bits = run_once(encoder, message)
+        encode_seconds = min(encode_seconds, encode_time)
+        decode_seconds = min(decode_seconds, decode_time)
+    megabytes = size / (1024 * 1024)
+    return {
+        'encoder': encoder_name,
+        'distribution': distribution,
+        'size': size,
+        'encode_seconds': encode_seconds,
+        'decode_seconds': decode_seconds,
+        'encode_mb_s': megabytes / encode_seconds if encode_seconds else float('inf'),
+        'decode_mb_s': megabytes / decode_seconds if decode_seconds else float('inf'),
+        'bits_per_symbol': encoded_bits / size,
+        'peak_memory_bytes': measure_peak_memory(encoder, message) if memory else None,
+    }
+
+
+def get_case_key(result: dict):
+    return result['encoder'], result['distribution'], result['size']
+
+
+def compare_with_baseline(results, baseline, threshold: float):
+    """Regressões: vazão menor que (1 - threshold) vezes a do baseline, ou bits por símbolo / memória maiores que
+    (1 + threshold) vezes. Casos que não existem no baseline são ignorados"""
+    baseline_cases = {get_case_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        old = baseline_cases.get(get_case_key(result))
+        if old is None:
+            continue
+        for metric in ('encode_mb_s', 'decode_mb_s'):
+            if result[metric] < old[metric] * (1 - threshold):
+                regressions.append((result, metric, old[metric], result[metric]))
+        for metric in ('bits_per_symbol', 'peak_memory_bytes'):
+            if result[metric] is not None and old.get(metric) is not None and result[metric] > old[metric] * (1 + threshold):
+                regressions.append((result, metric, old[metric], result[metric]))
+    return regressions
+
+
+def format_result(result: dict):
+    memory = f"{result['peak_memory_bytes'] / (1024 * 1024):9.2f} MB" if result['peak_memory_bytes'] is not None else '        -'
+    return (f"{result['encoder']:<12} {result['distribution']:<11} {result['size']:>11} B  "
+            f"encode {result['encode_mb_s']:9.3f} MB/s  decode {result['decode_mb_s']:9.3f} MB/s  "
+            f"{result['bits_per_symbol']:7.3f} bits/símbolo  pico {memory}")
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Benchmark de encode/decode de todos os codificadores. Os tamanhos "
+                                                 "maiores (10M e 100M) podem levar bastante tempo.")
+    parser.add_argument('--encoders', default=','.join(ENCODER_FACTORIES), help="lista separada por vírgulas")
+    parser.add_argument('--distributions', default=','.join(DISTRIBUTIONS), help="lista separada por vírgulas")
+    parser.add_argument('--sizes', default=','.join(DEFAULT_SIZES), help="tamanhos em bytes, aceita os sufixos K, M e G")
+    parser.add_argument('--repeat', type=int, default=3, help="repetições de cada caso (vale o melhor tempo)")
+    parser.add_argument('--no-memory', action='store_true', help="não mede o pico de memória")
+    parser.add_argument('-o', '--output', help="arquivo JSON para salvar os resultados")
+    parser.add_argument('--baseline', help="arquivo JSON de uma execução anterior para comparar")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="piora relativa tolerada em relação ao baseline")
+    return parser
+
+
+def run_benchmark(argv=None):
+    args = get_parser().parse_args(argv)
+    encoder_names = args.encoders.split(',')
+    distributions = args.distributions.split(',')
+    for name in encoder_names:
+        if name not in ENCODER_FACTORIES:
+            raise SystemExit(f"Codificador desconhecido: {name}. Disponíveis: {', '.join(ENCODER_FACTORIES)}")
+    for name in distributions:
+        if name not in DISTRIBUTIONS:
+            raise SystemExit(f"Distribuição desconhecida: {name}. Disponíveis: {', '.join(DISTRIBUTIONS)}")
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    results = []
+    for size in sizes:
+        for distribution in distributions:
+            for encoder_name in encoder_names:
+                result = run_case(encoder_name, distribution, size, args.repeat, not args.no_memory)
+                print(format_result(result), flush=True)
+                results.append(result)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np is not None,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        for result, metric, old_value, new_value in regressions:
+            print(f"REGRESSÃO {result['encoder']} {result['distribution']} {result['size']} B: {metric} {old_value:.4g} -> {new_value:.4g}")
+        if regressions:
+            print(f"{len(regressions)} regressões acima de {args.threshold:.0%} em relação ao baseline")
+            return 1
+        print(f"Nenhuma regressão acima de {args.threshold:.0%} em relação ao baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmark())
@@ -0,0 +1,465 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# BUFFERS DE BITS COMPACTADOS (8 BITS POR BYTE) COMPARTILHADOS PELOS CODIFICADORES
+
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Bits:
+    """Sequência imutável de bits armazenada em bytes, do bit mais significativo para o menos significativo.
+    Os bits de padding do último byte são sempre zero. A representação em '0'/'1' existe apenas para debug
+    e compatibilidade com a interface de texto."""
+    __slots__ = ('data', 'length')
+
+    def __init__(self, data: bytes = b'', length: int | None = None):
+        if length is None:
+            length = len(data) * 8
+        byte_len = (length + 7) >> 3
+        if length < 0 or byte_len > len(data):
+            raise ValueError(f"Tamanho inválido: {length} bits para {len(data)} bytes")
+        data = bytes(data[:byte_len])
+        """Zera os bits de padding para que a comparação possa ser feita diretamente nos bytes"""
+        if length & 7:
+            data = data[:-1] + bytes([data[-1] & (0xFF << (8 - (length & 7))) & 0xFF])
+        self.data = data
+        self.length = length
+
+    @classmethod
+    def from_str(cls, bit_str: str):
+        if bit_str.count('0') + bit_str.count('1') != len(bit_str):
+            raise ValueError("A mensagem deve conter apenas os caracteres 0 e 1")
+        return cls.from_int(int(bit_str, 2) if bit_str else 0, len(bit_str))
+
+    @classmethod
+    def from_int(cls, value: int, length: int):
+        if value < 0 or value >> length:
+            raise ValueError(f"Valor {value} não cabe em {length} bits")
+        padding = -length & 7
+        return cls((value << padding).to_bytes((length + padding) >> 3, 'big'), length)
+
+    def to_int(self):
+        return int.from_bytes(self.data, 'big') >> (-self.length & 7)
+
+    def to_str(self):
+        if self.length == 0:
+            return ''
+        return format(self.to_int(), f'0{self.length}b')
+
+    def __str__(self):
+        return self.to_str()
+
+    def __repr__(self):
+        return f"Bits('{self.to_str()}')"
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        if not isinstance(other, Bits):
+            return NotImplemented
+        return self.length == other.length and self.data == other.data
+
+    def __hash__(self):
+        return hash((self.data, self.length))
+
+    def __iter__(self):
+        return map(int, self.to_str())
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step != 1:
+                raise ValueError("Fatias de Bits não suportam passo diferente de 1")
+            if stop <= start:
+                return Bits()
+            if start & 7 == 0:
+                return Bits(self.data[start >> 3:(stop + 7) >> 3], stop - start)
+            reader = BitReader(self, start)
+            return Bits.from_int(reader.read(stop - start), stop - start)
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("Índice de bit fora do intervalo")
+        return (self.data[key >> 3] >> (7 - (key & 7))) & 1
+
+    def __add__(self, other):
+        other = as_bits(other)
+        if self.length & 7 == 0:
+            return Bits(self.data + other.data, self.length + other.length)
+        return Bits.from_int((self.to_int() << other.length) | other.to_int(), self.length + other.length)
+
+    def count(self, bit: int = 1):
+        ones = sum(byte.bit_count() for byte in self.data)
+        return ones if bit else self.length - ones
+
+
+def as_bits(value) -> Bits:
+    """Aceita Bits, strings de '0'/'1' (entrada do usuário) ou bytes"""
+    if isinstance(value, Bits):
+        return value
+    if isinstance(value, str):
+        return Bits.from_str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return Bits(bytes(value))
+    raise TypeError(f"Não é possível converter {type(value).__name__} para Bits")
+
+
+class BitWriter:
+    """Acumula bits em um inteiro pequeno e descarrega bytes completos em um bytearray"""
+    __slots__ = ('_buffer', '_acc', '_acc_len')
+
+    FLUSH_THRESHOLD = 64
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._acc = 0
+        self._acc_len = 0
+
+    def __len__(self):
+        return len(self._buffer) * 8 + self._acc_len
+
+    def write(self, value: int, length: int):
+        """Escreve os `length` bits menos significativos de `value`, do mais significativo para o menos"""
+        if value >> length:
+            raise ValueError(f"Valor {value} não cabe em {length} bits")
+        self._acc = (self._acc << length) | value
+        self._acc_len += length
+        if self._acc_len >= self.FLUSH_THRESHOLD:
+            self._flush()
+
+    def write_bit(self, bit: int):
+        self._acc = (self._acc << 1) | bit
+        self._acc_len += 1
+        if self._acc_len >= self.FLUSH_THRESHOLD:
+            self._flush()
+
+    def write_bits(self, bits: Bits):
+        if self._acc_len == 0:
+            self._buffer += bits.data
+            """Os bits de padding do último byte voltam para o acumulador"""
+            if bits.length & 7:
+                self._acc = self._buffer.pop() >> (8 - (bits.length & 7))
+                self._acc_len = bits.length & 7
+        else:
+            self.write(bits.to_int(), bits.length)
+
+    def write_gamma(self, value: int):
+        """Elias-gamma de value (>= 1): bit_length - 1 zeros seguidos do próprio valor"""
+        if value < 1:
+            raise ValueError("Elias-gamma só codifica valores maiores que zero")
+        self.write(0, value.bit_length() - 1)
+        self.write(value, value.bit_length())
+
+    def _flush(self):
+        byte_count = self._acc_len >> 3
+        rest_len = self._acc_len & 7
+        self._buffer += (self._acc >> rest_len).to_bytes(byte_count, 'big')
+        self._acc &= (1 << rest_len) - 1
+        self._acc_len = rest_len
+
+    def take_bytes(self) -> Bits:
+        """Retira os bytes completos já escritos (usado em streams). Os bits restantes continuam no writer"""
+        self._flush()
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return Bits(data)
+
+    def getvalue(self) -> Bits:
+        padding = -self._acc_len & 7
+        tail = (self._acc << padding).to_bytes((self._acc_len + padding) >> 3, 'big')
+        return Bits(bytes(self._buffer) + tail, len(self))
+
+
+class BitReader:
+    """Lê bits de um Bits a partir de uma posição, sem converter para string"""
+    __slots__ = ('_data', '_length', 'position')
+
+    def __init__(self, bits, position: int = 0):
+        bits = as_bits(bits)
+        self._data = bits.data
+        self._length = bits.length
+        self.position = position
+
+    @property
+    def remaining(self):
+        return self._length - self.position
+
+    def at_end(self):
+        return self.position >= self._length
+
+    def peek(self, length: int):
+        end = self.position + length
+        if end > self._length:
+            raise EOFError("Fim inesperado da mensagem codificada")
+        if length == 0:
+            return 0
+        start_byte = self.position >> 3
+        end_byte = (end + 7) >> 3
+        chunk = int.from_bytes(self._data[start_byte:end_byte], 'big')
+        return (chunk >> ((end_byte << 3) - end)) & ((1 << length) - 1)
+
+    def read(self, length: int):
+        value = self.peek(length)
+        self.position += length
+        return value
+
+    def read_bit(self):
+        position = self.position
+        if position >= self._length:
+            raise EOFError("Fim inesperado da mensagem codificada")
+        self.position = position + 1
+        return (self._data[position >> 3] >> (7 - (position & 7))) & 1
+
+    def read_unary(self):
+        """Conta os zeros até o próximo bit 1, consumindo também o bit 1"""
+        zero_count = 0
+        while self.read_bit() == 0:
+            zero_count += 1
+        return zero_count
+
+    def read_gamma(self):
+        zero_count = self.read_unary()
+        return (1 << zero_count) | self.read(zero_count)
+
+
+WORD_BYTES = 8
+
+
+def iter_unary_codes(bits, suffix_len: int | None = None, cutoff: int | None = None, partial: bool = False):
+    """Decodifica códigos no formato zeros + bit de parada + sufixo (Golomb, Elias-gamma) usando uma janela local de
+    palavras de 64 bits: os zeros do prefixo são contados de uma vez com bit_length e o sufixo é extraído com
+    deslocamento e máscara. Prefixos ou sufixos que atravessam o fim da janela fazem a janela ser recarregada.
+    Com suffix_len None, o sufixo tem o mesmo tamanho do prefixo (Elias-gamma). Com cutoff, o sufixo é binário
+    truncado (Golomb com k qualquer): sufixos de suffix_len bits maiores ou iguais a cutoff ganham mais um bit e são
+    subtraídos de cutoff. Gera pares (zeros, sufixo). Com partial, um codeword incompleto no fim não é erro: o último
+    par gerado é (None, número de bits dos codewords completos)"""
+    bits = as_bits(bits)
+    data = bits.data
+    remaining = bits.length
+    acc = 0
+    acc_len = 0
+    byte_pos = 0
+    while remaining > 0:
+        start_remaining = remaining
+        zero_count = 0
+        while True:
+            if acc_len < 64:
+                acc = (acc << 64) | int.from_bytes(data[byte_pos:byte_pos + WORD_BYTES].ljust(WORD_BYTES, b'\0'), 'big')
+                acc_len += 64
+                byte_pos += WORD_BYTES
+            if acc:
+                break
+            """Janela inteira de zeros: o prefixo continua na próxima palavra"""
+            zero_count += acc_len
+            remaining -= acc_len
+            acc_len = 0
+            if remaining <= 0:
+                if partial:
+                    yield None, bits.length - start_remaining
+                    return
+                raise EOFError("Fim inesperado da mensagem codificada")
+        leading_zeros = acc_len - acc.bit_length()
+        zero_count += leading_zeros
+        length = zero_count if suffix_len is None else suffix_len
+        """Descarta os zeros e o bit de parada"""
+        acc_len -= leading_zeros + 1
+        remaining -= leading_zeros + 1 + length
+        if remaining < 0:
+            if partial:
+                yield None, bits.length - start_remaining
+                return
+            raise EOFError("Fim inesperado da mensagem codificada")
+        while acc_len < length:
+            acc = (acc << 64) | int.from_bytes(data[byte_pos:byte_pos + WORD_BYTES].ljust(WORD_BYTES, b'\0'), 'big')
+            acc_len += 64
+            byte_pos += WORD_BYTES
+        acc_len -= length
+        suffix = (acc >> acc_len) & ((1 << length) - 1)
+        if cutoff is not None and suffix >= cutoff:
+            if remaining < 1:
+                if partial:
+                    yield None, bits.length - start_remaining
+                    return
+                raise EOFError("Fim inesperado da mensagem codificada")
+            remaining -= 1
+            if acc_len < 1:
+                acc = (acc << 64) | int.from_bytes(data[byte_pos:byte_pos + WORD_BYTES].ljust(WORD_BYTES, b'\0'), 'big')
+                acc_len += 64
+                byte_pos += WORD_BYTES
+            acc_len -= 1
+            suffix = ((suffix << 1) | ((acc >> acc_len) & 1)) - cutoff
+        acc &= (1 << acc_len) - 1
+        yield zero_count, suffix
+    if partial:
+        yield None, bits.length
+
+
+def read_unary_codes(bits, suffix_len: int | None = None, cutoff: int | None = None):
+    """Decodifica apenas os codewords completos. Retorna a lista de pares (zeros, sufixo) e o número de bits usados"""
+    codes = list(iter_unary_codes(bits, suffix_len, cutoff, partial=True))
+    return codes, codes.pop()[1]
+
+
+class CodewordTable:
+    """Codewords por code point, montados sob demanda por build_codeword(code_point) -> (valor, tamanho).
+    Os code points abaixo de DENSE_SIZE ficam em uma lista (com 256 posições, expandida quando necessário) e o
+    restante em um cache LRU de tamanho limitado"""
+    SMALL_DENSE_SIZE = 256
+    DENSE_SIZE = 65536
+    LRU_SIZE = 4096
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, build_codeword):
+        self.build_codeword = build_codeword
+        self.dense = [None] * self.SMALL_DENSE_SIZE
+        self.sparse = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, code_point: int):
+        """Retorna (valor, tamanho, string de '0'/'1') do codeword"""
+        if code_point < self.DENSE_SIZE:
+            if code_point >= len(self.dense):
+                with self.lock:
+                    if code_point >= len(self.dense):
+                        self.dense = self.dense + [None] * (self.DENSE_SIZE - len(self.dense))
+            codeword = self.dense[code_point]
+            if codeword is None:
+                codeword = self.dense[code_point] = self.make_codeword(code_point)
+            return codeword
+        with self.lock:
+            codeword = self.sparse.get(code_point)
+            if codeword is not None:
+                self.sparse.move_to_end(code_point)
+                return codeword
+        codeword = self.make_codeword(code_point)
+        with self.lock:
+            self.sparse[code_point] = codeword
+            if len(self.sparse) > self.LRU_SIZE:
+                self.sparse.popitem(last=False)
+        return codeword
+
+    def make_codeword(self, code_point: int):
+        value, length = self.build_codeword(code_point)
+        return value, length, format(value, f'0{length}b') if length else ''
+
+    def encode_into(self, writer: BitWriter, text: str):
+        """Codifica o texto em blocos: cada bloco é traduzido de uma vez (str.translate com os codewords dos
+        símbolos distintos do bloco) e adicionado ao writer como um único inteiro"""
+        for start in range(0, len(text), self.CHUNK_SIZE):
+            chunk = text[start:start + self.CHUNK_SIZE]
+            bit_str = chunk.translate({ord(c): self.get(ord(c))[2] for c in set(chunk)})
+            if bit_str:
+                writer.write(int(bit_str, 2), len(bit_str))
+
+    def encode_many(self, text: str, offsets):
+        """Codifica as mensagens text[offsets[i]:offsets[i + 1]] em um único buffer, com a tabela de tradução montada
+        uma vez para o lote. Retorna os bits e os offsets (em bits) de cada mensagem codificada"""
+        translation = {ord(c): self.get(ord(c))[2] for c in set(text)}
+        writer = BitWriter()
+        bit_offsets = array('q', [0])
+        position = 0
+        pending = []
+        pending_len = 0
+        for n in range(len(offsets) - 1):
+            bit_str = text[offsets[n]:offsets[n + 1]].translate(translation)
+            position += len(bit_str)
+            bit_offsets.append(position)
+            pending.append(bit_str)
+            pending_len += len(bit_str)
+            if pending_len >= self.CHUNK_SIZE:
+                writer.write(int(''.join(pending), 2), pending_len)
+                pending = []
+                pending_len = 0
+        if pending_len:
+            writer.write(int(''.join(pending), 2), pending_len)
+        return writer.getvalue(), bit_offsets
+
+
+def iter_chunks(source, chunk_size: int):
+    """Pedaços de uma mensagem para os streams: aceita um iterável de pedaços, um arquivo (lido em pedaços de
+    chunk_size) ou uma única mensagem (str, bytes ou Bits)"""
+    if isinstance(source, (str, bytes, bytearray, memoryview, Bits)):
+        yield source
+        return
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    yield from source
+
+
+def pack_bits_stream(bit_chunks):
+    """Reagrupa pedaços de Bits de tamanhos quaisquer em pedaços com um número inteiro de bytes. O último pedaço
+    gerado tem os bits restantes (e pode ser vazio)"""
+    writer = BitWriter()
+    for bits in bit_chunks:
+        writer.write_bits(bits)
+        packed = writer.take_bytes()
+        if len(packed):
+            yield packed
+    yield writer.getvalue()
+
+
+def iter_packed_bytes(bit_chunks):
+    """Formato empacotado para arquivos: os bits em bytes, seguidos de um byte com o número de bits válidos do último
+    byte (0 se ele está completo). Os pedaços de entrada devem ter um número inteiro de bytes, exceto o último"""
+    tail_len = 0
+    for bits in bit_chunks:
+        if tail_len:
+            raise ValueError("Apenas o último pedaço pode ter bits que não completam um byte")
+        tail_len = len(bits) & 7
+        yield bits.data
+    yield bytes([tail_len])
+
+
+def iter_unpacked_bits(byte_chunks):
+    """Operação inversa de iter_packed_bytes: os dois últimos bytes só são interpretados no fim da entrada"""
+    pending = b''
+    for chunk in byte_chunks:
+        data = pending + bytes(chunk)
+        if len(data) > 2:
+            yield Bits(data[:-2])
+            data = data[-2:]
+        pending = data
+    if not pending:
+        return
+    tail_len = pending[-1]
+    if tail_len > 7 or (tail_len and len(pending) < 2):
+        raise ValueError("Byte final inválido no formato empacotado")
+    data = pending[:-1]
+    yield Bits(data, len(data) * 8 - (-tail_len & 7))
+
+
+NONZERO_BYTE = re.compile(rb'[^\x00]')
+
+
+def iter_one_positions(bits):
+    """Posições dos bits 1, do início para o fim. Os bytes zerados são pulados pela regex, sem passar pelo Python"""
+    bits = as_bits(bits)
+    for match in NONZERO_BYTE.finditer(bits.data):
+        byte = bits.data[match.start()]
+        while byte:
+            yield (match.start() << 3) + 8 - byte.bit_length()
+            byte &= (1 << (byte.bit_length() - 1)) - 1
+
+
+def to_bit_array(bits):
+    """Converte para um array NumPy de uint8 com um bit por posição (requer NumPy)"""
+    bits = as_bits(bits)
+    return np.unpackbits(np.frombuffer(bits.data, dtype=np.uint8), count=bits.length)
+
+
+def from_bit_array(bit_array) -> Bits:
+    """Operação inversa de to_bit_array"""
+    bit_array = np.asarray(bit_array, dtype=np.uint8)
+    return Bits(np.packbits(bit_array).tobytes(), bit_array.size)
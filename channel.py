@@ -0,0 +1,313 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# SIMULAÇÃO DE CANAL RUIDOSO (BSC E RAJADAS) E TAXA DE ERRO RESIDUAL DOS CÓDIGOS DE CORREÇÃO
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+
+from bits import Bits, np, to_bit_array
+from encoders import ErrorCorrectionEncoder, RepetitionCode, Crc, Hamming74, HammingCode
+
+DEFAULT_BIT_COUNT = 1 << 20
+DEFAULT_PROBABILITIES = '1e-4:1e-1:13'
+DEFAULT_BURST_LEN = 16
+DEFAULT_CRC_FRAME_BITS = 256
+SEED = 2024
+
+
+def make_rng(seed: int):
+    return np.random.default_rng(seed) if np is not None else random.Random(seed)
+
+
+def sample_geometric(p: float, rng):
+    """Número de tentativas até o primeiro sucesso (>= 1)"""
+    if p >= 1:
+        return 1
+    if np is not None:
+        return int(rng.geometric(p))
+    return int(math.log(1 - rng.random()) / math.log1p(-p)) + 1
+
+
+def get_error_positions(length: int, p: float, rng):
+    """Posições (ordenadas) dos bits invertidos com probabilidade p cada. Em vez de um número aleatório por bit, são
+    sorteadas as distâncias entre erros consecutivos, que seguem uma distribuição geométrica"""
+    if p <= 0 or length <= 0:
+        return np.zeros(0, dtype=np.int64) if np is not None else []
+    if np is not None:
+        batch = int(length * p + 6 * math.sqrt(length * p)) + 16
+        positions = np.cumsum(rng.geometric(p, size=batch)) - 1
+        while positions[-1] < length:
+            positions = np.concatenate([positions, positions[-1] + np.cumsum(rng.geometric(p, size=batch))])
+        return positions[:np.searchsorted(positions, length)]
+    positions = []
+    position = sample_geometric(p, rng) - 1
+    while position < length:
+        positions.append(position)
+        position += sample_geometric(p, rng)
+    return positions
+
+
+def flip_bits(bits: Bits, positions):
+    """Inverte os bits das posições indicadas (aplicando uma máscara de erros aos bytes)"""
+    if np is not None:
+        positions = np.asarray(positions, dtype=np.int64)
+        mask = np.zeros(len(bits.data), dtype=np.uint8)
+        np.bitwise_xor.at(mask, positions >> 3, (0x80 >> (positions & 7)).astype(np.uint8))
+        return Bits((np.frombuffer(bits.data, dtype=np.uint8) ^ mask).tobytes(), len(bits))
+    data = bytearray(bits.data)
+    for position in positions:
+        data[position >> 3] ^= 0x80 >> (position & 7)
+    return Bits(bytes(data), len(bits))
+
+
+class BinarySymmetricChannel:
+    """Canal binário simétrico: cada bit é invertido de forma independente com probabilidade p"""
+
+    def __init__(self, p: float, seed: int = SEED):
+        if not 0 <= p <= 1:
+            raise ValueError("A probabilidade de erro precisa estar entre 0 e 1")
+        self.p = p
+        self.rng = make_rng(seed)
+
+    def get_error_positions(self, length: int):
+        return get_error_positions(length, self.p, self.rng)
+
+    def transmit(self, bits: Bits) -> Bits:
+        return flip_bits(bits, self.get_error_positions(len(bits)))
+
+
+class BurstChannel:
+    """Modelo de Gilbert-Elliott: o canal alterna entre um estado bom, com erros de probabilidade p_good, e um estado
+    ruim (a rajada), com erros de probabilidade p_bad. As durações dos estados são geométricas, com média burst_len
+    no estado ruim, e a fração do tempo no estado ruim é escolhida para que a taxa média de erro seja p"""
+
+    def __init__(self, p: float, burst_len: float = DEFAULT_BURST_LEN, p_bad: float = 0.5, p_good: float = 0.0, seed: int = SEED):
+        if not 0 <= p_good <= p <= p_bad <= 1 or p_good == p_bad:
+            raise ValueError("É preciso que 0 <= p_good <= p <= p_bad <= 1, com p_good < p_bad")
+        if burst_len < 1:
+            raise ValueError("A duração média das rajadas precisa ser pelo menos 1")
+        self.p = p
+        self.burst_len = burst_len
+        self.p_bad = p_bad
+        self.p_good = p_good
+        self.bad_fraction = (p - p_good) / (p_bad - p_good)
+        self.rng = make_rng(seed)
+
+    def iter_states(self, length: int):
+        """Intervalos (início, fim, probabilidade de erro) dos estados ao longo da transmissão"""
+        if self.bad_fraction >= 1:
+            yield 0, length, self.p_bad
+            return
+        p_leave_bad = 1 / self.burst_len
+        """Duração média do estado bom que resulta na fração bad_fraction no estado ruim"""
+        p_leave_good = min(1.0, p_leave_bad * self.bad_fraction / (1 - self.bad_fraction))
+        bad = self.rng.random() < self.bad_fraction
+        position = 0
+        while position < length:
+            if not bad and p_leave_good == 0:
+                yield position, length, self.p_good
+                return
+            duration = sample_geometric(p_leave_bad if bad else p_leave_good, self.rng)
+            yield position, min(position + duration, length), self.p_bad if bad else self.p_good
+            position += duration
+            bad = not bad
+
+    def get_error_positions(self, length: int):
+        runs = [(start, get_error_positions(end - start, p, self.rng)) for start, end, p in self.iter_states(length)]
+        if np is not None:
+            return np.concatenate([start + positions for start, positions in runs]) if runs else np.zeros(0, dtype=np.int64)
+        return [start + position for start, positions in runs for position in positions]
+
+    def transmit(self, bits: Bits) -> Bits:
+        return flip_bits(bits, self.get_error_positions(len(bits)))
+
+
+def random_bits(length: int, seed: int) -> Bits:
+    if np is not None:
+        return Bits(np.random.default_rng(seed).integers(0, 256, size=(length + 7) >> 3, dtype=np.uint8).tobytes(), length)
+    return Bits.from_int(random.Random(seed).getrandbits(length), length)
+
+
+def concatenate(bit_chunks) -> Bits:
+    if np is not None:
+        return Bits(np.packbits(np.concatenate([to_bit_array(bits) for bits in bit_chunks])).tobytes(), sum(map(len, bit_chunks)))
+    value = 0
+    length = 0
+    for bits in bit_chunks:
+        value = (value << len(bits)) | bits.to_int()
+        length += len(bits)
+    return Bits.from_int(value, length)
+
+
+def get_unit_len(encoder: ErrorCorrectionEncoder, crc_frame_bits: int):
+    """Unidade em que os erros são contados: o bloco de dados do Hamming, cada bit (com suas r cópias) do código de
+    repetição e cada quadro do CRC, as mesmas unidades que o decode_report marca como não corrigíveis"""
+    if isinstance(encoder, Crc):
+        return crc_frame_bits
+    if isinstance(encoder, RepetitionCode):
+        return 1
+    return encoder.get_stream_block_lens()[0]
+
+
+def get_wrong_units(original: Bits, decoded: Bits, unit_len: int):
+    """Número de bits diferentes e índices das unidades com pelo menos um bit diferente"""
+    decoded = decoded[:len(original)]
+    unit_count = len(original) // unit_len
+    if np is not None:
+        wrong = to_bit_array(original) != to_bit_array(decoded)
+        wrong_units = np.flatnonzero(wrong.reshape(unit_count, unit_len).any(axis=1))
+        return int(wrong.sum()), wrong_units.tolist()
+    difference = original.to_int() ^ decoded.to_int()
+    unit_mask = (1 << unit_len) - 1
+    wrong_units = [n for n in range(unit_count) if (difference >> ((unit_count - 1 - n) * unit_len)) & unit_mask]
+    return difference.bit_count(), wrong_units
+
+
+def transmit_crc_frames(encoder: Crc, data: Bits, channel, frame_bits: int):
+    """O CRC só detecta erros, então a mensagem é dividida em quadros de frame_bits bits, cada um com o próprio CRC.
+    Retorna os dados recebidos, os quadros com resto diferente de zero, o tempo de verificação e os bits transmitidos"""
+    frames = [data[start:start + frame_bits] for start in range(0, len(data), frame_bits)]
+    received = channel.transmit(concatenate([encoder.encode(frame) for frame in frames]))
+    frame_len = frame_bits + encoder.d - 1
+    decoded_frames = []
+    detected_frames = []
+    start = time.perf_counter()
+    for n in range(len(frames)):
+        result = encoder.decode_report(received[n * frame_len:(n + 1) * frame_len])
+        decoded_frames.append(result.data)
+        if not result.crc_ok:
+            detected_frames.append(n)
+    return concatenate(decoded_frames), detected_frames, time.perf_counter() - start, len(received)
+
+
+def simulate(encoder: ErrorCorrectionEncoder, channel, bit_count: int = DEFAULT_BIT_COUNT, seed: int = SEED,
+             crc_frame_bits: int = DEFAULT_CRC_FRAME_BITS):
+    """Transmite bit_count bits aleatórios codificados pelo canal e compara o resultado do decode_report com os dados
+    originais. Erros não detectados são unidades erradas que o decodificador não marcou como não corrigíveis"""
+    """Uma cópia silenciosa, para não alterar o codificador recebido"""
+    encoder = encoder.configured(quiet=True)
+    unit_len = get_unit_len(encoder, crc_frame_bits)
+    bit_count -= bit_count % unit_len
+    data = random_bits(bit_count, seed)
+    if isinstance(encoder, Crc):
+        decoded, detected_units, decode_seconds, encoded_bits = transmit_crc_frames(encoder, data, channel, crc_frame_bits)
+    else:
+        encoded = encoder.encode(data)
+        received = channel.transmit(encoded)
+        start = time.perf_counter()
+        result = encoder.decode_report(received)
+        decode_seconds = time.perf_counter() - start
+        decoded, detected_units, encoded_bits = result.data, list(result.uncorrectable_blocks), len(encoded)
+    wrong_bits, wrong_units = get_wrong_units(data, decoded, unit_len)
+    unit_count = bit_count // unit_len
+    undetected = len(set(wrong_units).difference(detected_units))
+    return {
+        'encoder': encoder.name,
+        'channel': type(channel).__name__,
+        'p': channel.p,
+        'data_bits': bit_count,
+        'encoded_bits': encoded_bits,
+        'units': unit_count,
+        'residual_ber': wrong_bits / bit_count,
+        'unit_error_rate': len(wrong_units) / unit_count,
+        'detected_rate': len(detected_units) / unit_count,
+        'undetected_error_rate': undetected / unit_count,
+        'decode_mbit_s': encoded_bits / decode_seconds / 1e6 if decode_seconds else float('inf'),
+    }
+
+
+def build_encoder(spec: str) -> ErrorCorrectionEncoder:
+    """repeticao[:R[:D]], hamming74, hamming[:M], hamming-secded[:M] e crc[:gerador ou padrão]"""
+    name, *params = spec.strip().lower().split(':')
+    if name == 'repeticao':
+        r = int(params[0]) if params else RepetitionCode.DEFAULT_R_VALUE
+        depth = int(params[1]) if len(params) > 1 else RepetitionCode.DEFAULT_INTERLEAVE_DEPTH
+        encoder = RepetitionCode(f"Repetição r={r}" + (f" D={depth}" if depth > 1 else ''))
+        encoder.set_parameters(r=r, interleave_depth=depth)
+        return encoder
+    if name == 'hamming74':
+        return Hamming74("Hamming(7, 4)")
+    if name in ('hamming', 'hamming-secded'):
+        m = int(params[0]) if params else HammingCode.DEFAULT_M_VALUE
+        extended = name == 'hamming-secded'
+        return HammingCode(f"{'SECDED' if extended else 'Hamming'} m={m}", m, extended)
+    if name == 'crc':
+        encoder = Crc(f"CRC {params[0].upper() if params else Crc.DEFAULT_GENERATOR}")
+        if params:
+            encoder.set_parameters(generator=params[0])
+        return encoder
+    raise ValueError(f"Código desconhecido: {spec}")
+
+
+def parse_probabilities(value: str):
+    """Lista separada por vírgulas, ou início:fim:quantidade com espaçamento logarítmico"""
+    if value.count(':') == 2:
+        first, last, count = value.split(':')
+        first, last, count = math.log10(float(first)), math.log10(float(last)), int(count)
+        return [10 ** (first + (last - first) * n / max(count - 1, 1)) for n in range(count)]
+    return [float(p) for p in value.split(',')]
+
+
+def format_result(result: dict):
+    return (f"p={result['p']:<9.3g} {result['encoder']:<18} BER residual {result['residual_ber']:<9.3g} "
+            f"erros detectados {result['detected_rate']:<9.3g} não detectados {result['undetected_error_rate']:<9.3g} "
+            f"decode {result['decode_mbit_s']:8.2f} Mbit/s")
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Taxa de erro residual, erros não detectados e vazão do decode dos "
+                                                 "códigos de correção em um canal ruidoso simulado")
+    parser.add_argument('--codes', default='repeticao:3,repeticao:5,hamming74,hamming:5,hamming-secded:5,crc:CRC-16/CCITT',
+                        help="lista separada por vírgulas de repeticao[:R[:D]], hamming74, hamming[:M], hamming-secded[:M] e crc[:gerador]")
+    parser.add_argument('--channel', choices=['bsc', 'burst'], default='bsc', help="canal binário simétrico ou com rajadas")
+    parser.add_argument('--burst-len', type=float, default=DEFAULT_BURST_LEN, help="duração média das rajadas, em bits")
+    parser.add_argument('--burst-error', type=float, default=0.5, help="probabilidade de erro dentro de uma rajada")
+    parser.add_argument('-p', '--probabilities', default=DEFAULT_PROBABILITIES,
+                        help="probabilidades de erro por bit: lista (0.01,0.02) ou início:fim:quantidade em escala logarítmica")
+    parser.add_argument('--bits', type=int, default=DEFAULT_BIT_COUNT, help="bits de dados transmitidos por simulação")
+    parser.add_argument('--crc-frame-bits', type=int, default=DEFAULT_CRC_FRAME_BITS, help="bits de dados por quadro do CRC")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('-o', '--output', help="arquivo JSON para salvar os resultados")
+    return parser
+
+
+def run_simulations(argv=None):
+    args = get_parser().parse_args(argv)
+    try:
+        encoders = [build_encoder(spec) for spec in args.codes.split(',')]
+    except ValueError as error:
+        raise SystemExit(f"Erro: {error}")
+    results = []
+    for p in parse_probabilities(args.probabilities):
+        for encoder in encoders:
+            """Todos os códigos veem a mesma sequência aleatória de erros para cada p"""
+            if args.channel == 'burst':
+                channel = BurstChannel(p, args.burst_len, max(args.burst_error, p), seed=args.seed)
+            else:
+                channel = BinarySymmetricChannel(p, args.seed)
+            result = simulate(encoder, channel, args.bits, args.seed, args.crc_frame_bits)
+            print(format_result(result), flush=True)
+            results.append(result)
+    if args.output:
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'numpy': np is not None,
+                'channel': args.channel,
+                'burst_len': args.burst_len if args.channel == 'burst' else None,
+                'seed': args.seed,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_simulations())
@@ -0,0 +1,269 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# INTERFACE DE LINHA DE COMANDO NÃO INTERATIVA (ARQUIVOS OU STDIN/STDOUT)
+
+import argparse
+import codecs
+import contextlib
+import mmap
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bits import Bits, iter_packed_bytes, iter_unpacked_bits, pack_bits_stream
+from crc import CRC_PRESETS
+from pipeline import Pipeline, add_end_marker, remove_end_marker
+from encoders import Encoder, ErrorCorrectionEncoder, Golomb, EliasGamma, FibonacciZeckendorf, Huffman, AdaptiveHuffman, Rans, RepetitionCode, Crc, Hamming74, HammingCode, Ascii
+
+DEFAULT_READ_SIZE = 4 * 1024 * 1024
+"""Tamanhos das mensagens do check, incluindo os que deixam mais de um byte de padding no último bloco"""
+CHECK_SIZES = (1, 3, 17, 1000, 100003)
+CHECK_TEXT_ALPHABET = b'abcdefghijklmnopqrstuvwxyz .,\n'
+
+ENCODER_FACTORIES = {
+    'ascii': lambda: Ascii("Ascii"),
+    'golomb': lambda: Golomb(Golomb.DEFAULT_K_VALUE, "Golomb"),
+    'elias-gamma': lambda: EliasGamma("Elias-Gamma"),
+    'fibonacci': lambda: FibonacciZeckendorf("Fibonacci/Zeckendorf"),
+    'huffman': lambda: Huffman("Huffman"),
+    'huffman-adaptativo': lambda: AdaptiveHuffman("Huffman adaptativo"),
+    'rans': lambda: Rans("rANS"),
+    'repeticao': lambda: RepetitionCode("Código de Repetição"),
+    'crc': lambda: Crc("CRC"),
+    'hamming74': lambda: Hamming74("Hamming(7, 4)"),
+    'hamming': lambda: HammingCode("Hamming(2^m - 1, 2^m - m - 1)"),
+    'hamming-secded': lambda: HammingCode("Hamming estendido (SECDED)", extended_=True),
+}
+
+
+def get_encoder_names(value: str):
+    names = value.lower().split('+')
+    for name in names:
+        if name not in ENCODER_FACTORIES:
+            raise argparse.ArgumentTypeError(f"codificador desconhecido: {name}")
+    return names
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="Codifica ou decodifica arquivos sem os prompts do menu interativo. A saída codificada (e a entrada "
+                    "do decode) usa o formato empacotado: bytes seguidos de um byte com o número de bits válidos do "
+                    "último byte. Textos são lidos e escritos em UTF-8 e os códigos de correção recebem (no encode) e "
+                    "geram (no decode) bytes comuns.")
+    parser.add_argument('action', choices=['encode', 'decode', 'check'],
+                        help="check codifica e decodifica a entrada (ou mensagens aleatórias, sem -i) e confere se os bytes voltam iguais")
+    parser.add_argument('encoder', type=get_encoder_names, nargs='?',
+                        help=f"um de {', '.join(ENCODER_FACTORIES)}, ou vários separados por '+' para formar um pipeline (por exemplo huffman+crc+hamming74). "
+                             f"No check, sem codificador são verificados todos os códigos de correção")
+    parser.add_argument('-i', '--input', default='-', help="arquivo de entrada (padrão: stdin)")
+    parser.add_argument('-o', '--output', default='-', help="arquivo de saída (padrão: stdout)")
+    parser.add_argument('-k', help="k do Golomb, ou 'auto' para escolher k por bloco")
+    parser.add_argument('-r', type=int, help="número de repetições do código de repetição")
+    parser.add_argument('--interleave', type=int, help="profundidade do entrelaçamento do código de repetição")
+    parser.add_argument('-g', '--generator', help=f"polinômio gerador do CRC em binário ou um dos padrões {', '.join(CRC_PRESETS)}")
+    parser.add_argument('-m', type=int, help="número de bits de paridade do Hamming genérico")
+    parser.add_argument('--max-code-len', type=int, help="tamanho máximo dos códigos do Huffman")
+    parser.add_argument('--read-size', type=int, default=DEFAULT_READ_SIZE, help="tamanho dos blocos lidos da entrada, em bytes")
+    parser.add_argument('-q', '--quiet', action='store_true', help="não mostra o resumo no final")
+    return parser
+
+
+def get_parameters(args):
+    """Parâmetros da linha de comando com os nomes usados em Encoder.PARAMETERS"""
+    parameters = {
+        'k': args.k,
+        'r': args.r,
+        'interleave_depth': args.interleave,
+        'generator': args.generator,
+        'm': args.m,
+        'max_code_len': args.max_code_len,
+    }
+    return {name: value for name, value in parameters.items() if value is not None}
+
+
+def build_encoder(names, parameters: dict) -> Encoder:
+    """Com mais de um nome, os parâmetros valem para todas as etapas do tipo correspondente"""
+    stages = [configure_encoder(ENCODER_FACTORIES[name](), parameters) for name in names]
+    if len(stages) == 1:
+        return stages[0]
+    return Pipeline(' -> '.join(stage.name for stage in stages), stages)
+
+
+def configure_encoder(encoder: Encoder, parameters: dict) -> Encoder:
+    """Aplica apenas os parâmetros que o codificador aceita, com as mesmas validações do menu interativo"""
+    encoder.set_parameters(**{name: value for name, value in parameters.items() if name in encoder.PARAMETERS})
+    return encoder
+
+
+def iter_input_blocks(path: str, read_size: int, counter: dict):
+    """Arquivos são mapeados em memória (mmap) e fatiados em blocos de read_size bytes; stdin é lido em blocos do
+    mesmo tamanho. counter['input'] acumula o número de bytes lidos"""
+    if path == '-':
+        source = sys.stdin.buffer
+        while True:
+            block = source.read(read_size)
+            if not block:
+                return
+            counter['input'] += len(block)
+            yield block
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, size, read_size):
+                block = mapped[offset:offset + read_size]
+                counter['input'] += len(block)
+                yield block
+
+
+def iter_text(blocks):
+    """Decodifica UTF-8 de forma incremental, então um caractere dividido entre dois blocos não é um erro"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for block in blocks:
+        text = decoder.decode(block)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def iter_output_chunks(encoder: Encoder, action: str, blocks):
+    """Monta o pipeline de streams de acordo com a ação e o tipo de codificador e gera os bytes de saída"""
+    first_stage = encoder.stages[0] if isinstance(encoder, Pipeline) else encoder
+    is_error_correction = isinstance(first_stage, ErrorCorrectionEncoder)
+    """Um código de blocos sozinho recebe o mesmo marcador de fim que o Pipeline usa, para que os zeros de padding
+    do último bloco (que podem passar de um byte) sejam removidos na decodificação"""
+    has_end_marker = not isinstance(encoder, Pipeline) and getattr(encoder, 'PADS_LAST_BLOCK', False)
+    if action == 'encode':
+        source = (Bits(block) for block in blocks) if is_error_correction else iter_text(blocks)
+        if has_end_marker:
+            source = add_end_marker(source)
+        return iter_packed_bytes(encoder.encode_stream(source))
+    decoded = encoder.decode_stream(iter_unpacked_bits(blocks))
+    if has_end_marker:
+        decoded = remove_end_marker(decoded)
+    if is_error_correction:
+        """Os bits de padding que não completam um byte são descartados"""
+        return (bits.data[:len(bits) >> 3] for bits in pack_bits_stream(decoded))
+    return (text.encode('utf-8') for text in decoded)
+
+
+def get_error_correction_names():
+    return [name for name, factory in ENCODER_FACTORIES.items() if isinstance(factory(), ErrorCorrectionEncoder)]
+
+
+def get_check_samples(encoder: Encoder):
+    """Bytes aleatórios para os códigos de correção e texto para os codificadores de fonte, com semente fixa"""
+    first_stage = encoder.stages[0] if isinstance(encoder, Pipeline) else encoder
+    samples = []
+    for size in CHECK_SIZES:
+        rng = random.Random(size)
+        if isinstance(first_stage, ErrorCorrectionEncoder):
+            samples.append(rng.randbytes(size))
+        else:
+            samples.append(bytes(rng.choices(CHECK_TEXT_ALPHABET, k=size)))
+    return samples
+
+
+def check_roundtrip(encoder: Encoder, data: bytes):
+    """Codifica e decodifica pelos mesmos streams do encode e do decode e compara os bytes"""
+    encoded = b''.join(iter_output_chunks(encoder, 'encode', [data]))
+    return b''.join(iter_output_chunks(encoder, 'decode', [encoded])) == data
+
+
+def run_check(args):
+    """Os avisos dos códigos de correção (padding, resto do CRC) são omitidos"""
+    parameters = {'quiet': True, **get_parameters(args)}
+    names_list = [args.encoder] if args.encoder else [[name] for name in get_error_correction_names()]
+    failures = 0
+    for names in names_list:
+        label = '+'.join(names)
+        try:
+            encoder = build_encoder(names, parameters)
+            if args.input == '-':
+                samples = get_check_samples(encoder)
+            else:
+                with open(args.input, 'rb') as file:
+                    samples = [file.read()]
+            with contextlib.redirect_stdout(sys.stderr):
+                failed = [len(data) for data in samples if not check_roundtrip(encoder, data)]
+        except (ValueError, EOFError, OSError, UnicodeError, NotImplementedError, OverflowError, RecursionError) as error:
+            print(f"{label}: erro: {error}")
+            failures += 1
+            continue
+        if failed:
+            print(f"{label}: a mensagem decodificada é diferente da original (tamanhos {', '.join(map(str, failed))})")
+            failures += 1
+        else:
+            print(f"{label}: ok")
+    return 1 if failures else 0
+
+
+@contextlib.contextmanager
+def open_output(path: str):
+    """A saída é escrita em um arquivo temporário no mesmo diretório, que só substitui o destino se tudo der
+    certo. Em caso de erro nada fica no disco"""
+    if path == '-':
+        yield sys.stdout.buffer
+        return
+    directory, name = os.path.split(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            yield output
+        """mkstemp cria o arquivo só com permissão para o dono; o destino recebe as permissões de um open comum"""
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary_path, 0o666 & ~umask)
+        os.replace(temporary_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporary_path)
+        raise
+
+
+def write_output(output, chunks, counter: dict):
+    for chunk in chunks:
+        counter['output'] += len(chunk)
+        output.write(chunk)
+    output.flush()
+
+
+def print_summary(action: str, encoder: Encoder, counter: dict, elapsed: float):
+    input_size, output_size = counter['input'], counter['output']
+    throughput = input_size / elapsed / (1024 * 1024) if elapsed > 0 else float('inf')
+    ratio = output_size / input_size if input_size else 0
+    print(f"{action} com {encoder.name}: {input_size} bytes lidos, {output_size} bytes escritos "
+          f"(razão {ratio:.4f}) em {elapsed:.3f} s, {throughput:.2f} MB/s", file=sys.stderr)
+
+
+def run_batch(argv=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.action == 'check':
+        return run_check(args)
+    if args.encoder is None:
+        parser.error("é necessário informar o codificador")
+    counter = {'input': 0, 'output': 0}
+    start = time.perf_counter()
+    try:
+        encoder = build_encoder(args.encoder, get_parameters(args))
+        blocks = iter_input_blocks(args.input, args.read_size, counter)
+        with open_output(args.output) as output:
+            """Avisos dos codificadores (padding, resto do CRC) vão para stderr para não misturar com a saída"""
+            with contextlib.redirect_stdout(sys.stderr):
+                write_output(output, iter_output_chunks(encoder, args.action, blocks), counter)
+    except (ValueError, EOFError, OSError, UnicodeError, NotImplementedError, OverflowError, RecursionError) as error:
+        print(f"Erro: {error}", file=sys.stderr)
+        return 1
+    if not args.quiet:
+        print_summary(args.action, encoder, counter, time.perf_counter() - start)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_batch())
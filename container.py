@@ -0,0 +1,117 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# CONTAINER EM BLOCOS INDEPENDENTES: CODIFICAÇÃO/DECODIFICAÇÃO EM PARALELO E ACESSO ALEATÓRIO
+
+import struct
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+
+from bits import Bits, as_bits
+
+# Formato:
+#   cabeçalho: MAGIC, versão e número de blocos
+#   índice: para cada bloco, a posição do bloco (em bytes, a partir do fim do índice), o tamanho em bits e o
+#           número de símbolos
+#   blocos: a saída do encode de cada bloco, completada com zeros até um número inteiro de bytes
+# Cada bloco é uma mensagem completa do codificador, com os próprios parâmetros (o cabeçalho de códigos do Huffman,
+# o k escolhido pelo Golomb automático), então os blocos podem ser decodificados em qualquer ordem.
+MAGIC = b'SEAC'
+VERSION = 1
+HEADER = struct.Struct('>4sBI')
+INDEX_ENTRY = struct.Struct('>QQI')
+DEFAULT_BLOCK_SIZE = 1 << 18
+
+
+def encode_block(encoder, text: str):
+    encoded = as_bits(encoder.encode(text))
+    return encoded.data, len(encoded)
+
+
+def decode_block(encoder, data: bytes, bit_length: int):
+    return encoder.decode(Bits(data, bit_length))
+
+
+def run_blocks(worker, encoder, arguments, max_workers: int | None):
+    """Executa worker(encoder, *args) para cada bloco, em um pool de processos quando há mais de um bloco"""
+    if len(arguments) <= 1 or max_workers == 1:
+        return [worker(encoder, *args) for args in arguments]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(worker, [encoder] * len(arguments), *zip(*arguments)))
+
+
+def encode_container(encoder, text: str, block_size: int = DEFAULT_BLOCK_SIZE, max_workers: int | None = None):
+    """Divide o texto em blocos de block_size símbolos, codifica cada um de forma independente e monta o container"""
+    if block_size <= 0:
+        raise ValueError("O tamanho do bloco precisa ser maior que zero")
+    blocks = [(text[start:start + block_size],) for start in range(0, len(text), block_size)]
+    encoded_blocks = run_blocks(encode_block, encoder, blocks, max_workers)
+    index = []
+    offset = 0
+    for (block,), (data, bit_length) in zip(blocks, encoded_blocks):
+        index.append(INDEX_ENTRY.pack(offset, bit_length, len(block)))
+        offset += len(data)
+    return b''.join([HEADER.pack(MAGIC, VERSION, len(blocks))] + index + [data for data, _ in encoded_blocks])
+
+
+def decode_container(encoder, source, max_workers: int | None = None):
+    return ContainerReader(source).decode(encoder, max_workers)
+
+
+class ContainerReader:
+    """Lê o índice de um container em bytes, mmap ou arquivo binário aberto. Os blocos só são lidos quando
+    necessários, então decodificar um símbolo não exige ler o resto do arquivo"""
+
+    def __init__(self, source):
+        self.source = source
+        magic, version, block_count = HEADER.unpack(self.read(0, HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("O arquivo não é um container de blocos")
+        if version != VERSION:
+            raise ValueError(f"Versão de container não suportada: {version}")
+        index_data = self.read(HEADER.size, block_count * INDEX_ENTRY.size)
+        if len(index_data) != block_count * INDEX_ENTRY.size:
+            raise EOFError("Fim inesperado do índice do container")
+        self.blocks = list(INDEX_ENTRY.iter_unpack(index_data))
+        self.data_start = HEADER.size + len(index_data)
+        """Primeiro símbolo de cada bloco, para achar o bloco de um símbolo por busca binária"""
+        self.block_starts = [0] + list(accumulate(symbol_count for _, _, symbol_count in self.blocks))
+
+    def read(self, offset: int, size: int):
+        if hasattr(self.source, 'seek'):
+            self.source.seek(offset)
+            return self.source.read(size)
+        return bytes(self.source[offset:offset + size])
+
+    @property
+    def block_count(self):
+        return len(self.blocks)
+
+    @property
+    def symbol_count(self):
+        return self.block_starts[-1]
+
+    def read_block(self, n: int):
+        """Bytes e tamanho em bits do bloco n"""
+        offset, bit_length, _ = self.blocks[n]
+        data = self.read(self.data_start + offset, (bit_length + 7) >> 3)
+        if len(data) != (bit_length + 7) >> 3:
+            raise EOFError("Fim inesperado do bloco do container")
+        return data, bit_length
+
+    def decode_block(self, encoder, n: int):
+        return decode_block(encoder, *self.read_block(n))
+
+    def get_block_of_symbol(self, position: int):
+        if not 0 <= position < self.symbol_count:
+            raise IndexError("Posição do símbolo fora do intervalo")
+        return bisect_right(self.block_starts, position) - 1
+
+    def get_symbol(self, encoder, position: int):
+        """Decodifica apenas o bloco que contém o símbolo de índice position"""
+        n = self.get_block_of_symbol(position)
+        return self.decode_block(encoder, n)[position - self.block_starts[n]]
+
+    def decode(self, encoder, max_workers: int | None = None):
+        blocks = [self.read_block(n) for n in range(self.block_count)]
+        return ''.join(run_blocks(decode_block, encoder, blocks, max_workers))
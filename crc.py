@@ -0,0 +1,336 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# MOTOR DE CRC BASEADO EM TABELAS (BYTE A BYTE E SLICING-BY-8) COM PADRÕES CONHECIDOS
+
+import binascii
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from bits import Bits, as_bits
+
+SLICES = 8
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+FILE_READ_SIZE = 1024 * 1024
+
+
+def reflect(value: int, width: int):
+    """Inverte a ordem dos `width` bits menos significativos de value"""
+    return int(format(value, f'0{width}b')[::-1], 2)
+
+
+@lru_cache(maxsize=None)
+def build_tables(register_width: int, poly: int, reflected: bool):
+    """Monta as tabelas de slicing: tables[k][b] é o CRC (com registrador zerado) do byte b seguido de k bytes zero.
+    As tabelas são guardadas em cache por polinômio, então cada gerador só é processado uma vez"""
+    mask = (1 << register_width) - 1
+    first = []
+    if reflected:
+        reflected_poly = reflect(poly, register_width)
+        for byte in range(256):
+            register = byte
+            for _ in range(8):
+                register = (register >> 1) ^ reflected_poly if register & 1 else register >> 1
+            first.append(register)
+    else:
+        top_bit = 1 << (register_width - 1)
+        for byte in range(256):
+            register = byte << (register_width - 8)
+            for _ in range(8):
+                register = ((register << 1) ^ poly) & mask if register & top_bit else (register << 1) & mask
+            first.append(register)
+    tables = [first]
+    for _ in range(1, SLICES):
+        previous = tables[-1]
+        if reflected:
+            tables.append([(previous[byte] >> 8) ^ first[previous[byte] & 0xFF] for byte in range(256)])
+        else:
+            shift = register_width - 8
+            tables.append([((previous[byte] << 8) & mask) ^ first[previous[byte] >> shift] for byte in range(256)])
+    return tuple(tuple(table) for table in tables)
+
+
+def gf2_matrix_times(matrix, vector: int):
+    """Multiplica uma matriz sobre GF(2) (lista de colunas) por um vetor de bits"""
+    result = 0
+    i = 0
+    while vector:
+        if vector & 1:
+            result ^= matrix[i]
+        vector >>= 1
+        i += 1
+    return result
+
+
+def gf2_matrix_square(matrix):
+    return [gf2_matrix_times(matrix, column) for column in matrix]
+
+
+class CrcEngine:
+    """CRC parametrizado no formato do catálogo de Ross Williams (width, poly, init, refin, refout, xorout).
+    O registrador interno fica no domínio do algoritmo (refletido ou não); use initial_register, update e
+    finalize para calcular de forma incremental ou compute para calcular de uma vez"""
+
+    def __init__(self, width: int, poly: int, init: int = 0, reflect_in: bool = False, reflect_out: bool = False, xor_out: int = 0):
+        if width <= 0:
+            raise ValueError("O CRC precisa ter pelo menos 1 bit")
+        self.width = width
+        self.poly = poly & ((1 << width) - 1)
+        self.init = init
+        self.reflect_in = reflect_in
+        self.reflect_out = reflect_out
+        self.xor_out = xor_out
+        """CRCs com menos de 8 bits são calculados alinhados à esquerda em um registrador de 8 bits"""
+        self.shift = 0 if reflect_in else max(0, 8 - width)
+        self.register_width = width + self.shift
+        self.register_mask = (1 << self.register_width) - 1
+        self.tables = build_tables(self.register_width, self.poly << self.shift, reflect_in)
+        self.native = self.get_native_update()
+        """zero_operators[i] avança o registrador por 2^i bytes zero, montado sob demanda para o crc-combine. A lista
+        só cresce com o lock, então uma engine compartilhada entre threads nunca vê um operador na posição errada"""
+        self.zero_operators = []
+        self.zero_operators_lock = threading.Lock()
+
+    @property
+    def params(self):
+        """Parâmetros para recriar a engine em outro processo (as tabelas ficam no cache de cada processo)"""
+        return dict(width=self.width, poly=self.poly, init=self.init, reflect_in=self.reflect_in,
+                    reflect_out=self.reflect_out, xor_out=self.xor_out)
+
+    def get_native_update(self):
+        """Usa as implementações em C da biblioteca padrão quando o polinômio coincide"""
+        if self.width == 32 and self.poly == 0x04C11DB7 and self.reflect_in:
+            return lambda register, data: zlib.crc32(data, register ^ 0xFFFFFFFF) ^ 0xFFFFFFFF
+        if self.width == 16 and self.poly == 0x1021 and not self.reflect_in:
+            return lambda register, data: binascii.crc_hqx(data, register)
+        return None
+
+    @property
+    def initial_register(self):
+        return reflect(self.init, self.width) if self.reflect_in else self.init << self.shift
+
+    def update(self, register: int, data: bytes):
+        if self.native is not None:
+            return self.native(register, data)
+        return self.update_reflected(register, data) if self.reflect_in else self.update_normal(register, data)
+
+    def update_normal(self, register: int, data: bytes):
+        t0, t1, t2, t3, t4, t5, t6, t7 = self.tables
+        width = self.register_width
+        mask = self.register_mask
+        size = len(data)
+        end = size - size % SLICES
+        if width <= 64:
+            """Slicing-by-8: o registrador é combinado com 8 bytes de uma vez e cada byte resulta de uma tabela"""
+            for i in range(0, end, SLICES):
+                value = int.from_bytes(data[i:i + SLICES], 'big') ^ (register << (64 - width))
+                register = (t7[value >> 56] ^ t6[(value >> 48) & 0xFF] ^ t5[(value >> 40) & 0xFF] ^ t4[(value >> 32) & 0xFF]
+                            ^ t3[(value >> 24) & 0xFF] ^ t2[(value >> 16) & 0xFF] ^ t1[(value >> 8) & 0xFF] ^ t0[value & 0xFF])
+        else:
+            end = 0
+        shift = width - 8
+        for byte in data[end:]:
+            register = t0[(register >> shift) ^ byte] ^ ((register << 8) & mask)
+        return register
+
+    def update_reflected(self, register: int, data: bytes):
+        t0, t1, t2, t3, t4, t5, t6, t7 = self.tables
+        size = len(data)
+        end = size - size % SLICES
+        if self.width <= 64:
+            for i in range(0, end, SLICES):
+                value = int.from_bytes(data[i:i + SLICES], 'little') ^ register
+                register = (t7[value & 0xFF] ^ t6[(value >> 8) & 0xFF] ^ t5[(value >> 16) & 0xFF] ^ t4[(value >> 24) & 0xFF]
+                            ^ t3[(value >> 32) & 0xFF] ^ t2[(value >> 40) & 0xFF] ^ t1[(value >> 48) & 0xFF] ^ t0[value >> 56])
+        else:
+            end = 0
+        for byte in data[end:]:
+            register = t0[(register ^ byte) & 0xFF] ^ (register >> 8)
+        return register
+
+    def update_bits(self, register: int, value: int, length: int):
+        """Processa bits avulsos (do mais significativo para o menos), usado no final de mensagens que não
+        ocupam bytes inteiros. Nos CRCs refletidos cada bit entra no bit menos significativo do registrador, na
+        ordem da mensagem (um byte inteiro processado assim equivale ao byte com os bits invertidos)"""
+        if self.reflect_in:
+            reflected_poly = reflect(self.poly, self.width)
+            for i in range(length - 1, -1, -1):
+                register ^= (value >> i) & 1
+                register = (register >> 1) ^ reflected_poly if register & 1 else register >> 1
+            return register
+        top_bit = 1 << (self.register_width - 1)
+        poly = self.poly << self.shift
+        for i in range(length - 1, -1, -1):
+            register ^= ((value >> i) & 1) << (self.register_width - 1)
+            register = ((register << 1) ^ poly) & self.register_mask if register & top_bit else (register << 1) & self.register_mask
+        return register
+
+    def update_from_bits(self, register: int, data):
+        data = as_bits(data)
+        full_bytes = len(data) >> 3
+        register = self.update(register, data.data[:full_bytes])
+        if len(data) & 7:
+            register = self.update_bits(register, data.data[full_bytes] >> (8 - (len(data) & 7)), len(data) & 7)
+        return register
+
+    def finalize(self, register: int):
+        if self.reflect_in:
+            crc = register if self.reflect_out else reflect(register, self.width)
+        else:
+            crc = register >> self.shift
+            if self.reflect_out:
+                crc = reflect(crc, self.width)
+        return crc ^ self.xor_out
+
+    def unfinalize(self, crc: int):
+        """Operação inversa de finalize: volta do valor de CRC para o registrador interno"""
+        crc ^= self.xor_out
+        if self.reflect_in:
+            return crc if self.reflect_out else reflect(crc, self.width)
+        return (reflect(crc, self.width) if self.reflect_out else crc) << self.shift
+
+    def compute(self, data):
+        """Aceita bytes ou Bits (inclusive com número de bits que não é múltiplo de 8)"""
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return self.finalize(self.update(self.initial_register, data))
+        return self.finalize(self.update_from_bits(self.initial_register, data))
+
+    def get_zero_operator(self, power: int):
+        """Matriz que avança o registrador por 2^power bytes zero, obtida elevando ao quadrado a de 1 bit"""
+        zero_operators = self.zero_operators
+        if power < len(zero_operators):
+            return zero_operators[power]
+        with self.zero_operators_lock:
+            if not zero_operators:
+                width = self.register_width
+                if self.reflect_in:
+                    operator = [reflect(self.poly, width)] + [1 << (i - 1) for i in range(1, width)]
+                else:
+                    operator = [1 << (i + 1) for i in range(width - 1)] + [self.poly << self.shift]
+                for _ in range(3):
+                    operator = gf2_matrix_square(operator)
+                zero_operators.append(operator)
+            while len(zero_operators) <= power:
+                zero_operators.append(gf2_matrix_square(zero_operators[-1]))
+        return zero_operators[power]
+
+    def shift_register(self, register: int, byte_count: int):
+        """Equivale a update(register, bytes(byte_count)) em O(log byte_count) multiplicações de matriz"""
+        power = 0
+        while byte_count:
+            if byte_count & 1:
+                register = gf2_matrix_times(self.get_zero_operator(power), register)
+            byte_count >>= 1
+            power += 1
+        return register
+
+    def combine_registers(self, register_a: int, raw_register_b: int, length_b: int):
+        """Registrador de A + B a partir do registrador de A e do registrador de B calculado a partir de zero"""
+        return self.shift_register(register_a, length_b) ^ raw_register_b
+
+    def combine(self, crc_a: int, crc_b: int, length_b: int):
+        """CRC da concatenação A + B a partir dos CRCs finais de A e de B (como o crc32_combine da zlib)"""
+        register_a = self.unfinalize(crc_a) ^ self.initial_register
+        return self.finalize(self.shift_register(register_a, length_b) ^ self.unfinalize(crc_b))
+
+    def compute_parallel(self, source, chunk_size: int = DEFAULT_CHUNK_SIZE, max_workers: int | None = None):
+        """Calcula o CRC de bytes, Bits ou de um arquivo (caminho) dividindo em blocos processados em paralelo.
+        Cada bloco é calculado a partir do registrador zerado e os resultados são combinados em ordem,
+        então o valor é idêntico ao de compute"""
+        tail = Bits()
+        if isinstance(source, Bits):
+            """Os bits que não completam um byte são processados no final, sem paralelismo"""
+            tail = source[len(source) - (len(source) & 7):]
+            source = source.data[:len(source) >> 3]
+        if isinstance(source, (str, os.PathLike)):
+            size = os.path.getsize(source)
+            ranges = [(offset, min(chunk_size, size - offset)) for offset in range(0, size, chunk_size)]
+            worker, arguments = compute_file_range_register, [(self.params, source, offset, length) for offset, length in ranges]
+        else:
+            ranges = [(offset, min(chunk_size, len(source) - offset)) for offset in range(0, len(source), chunk_size)]
+            worker, arguments = compute_raw_register, [(self.params, source[offset:offset + length]) for offset, length in ranges]
+        if len(ranges) <= 1 or max_workers == 1:
+            raw_registers = [worker(*args) for args in arguments]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                raw_registers = list(executor.map(worker, *zip(*arguments)))
+        register = self.initial_register
+        for (_, length), raw_register in zip(ranges, raw_registers):
+            register = self.combine_registers(register, raw_register, length)
+        if len(tail):
+            register = self.update_bits(register, tail.to_int(), len(tail))
+        return self.finalize(register)
+
+    def hasher(self):
+        return CrcHasher(self)
+
+
+def compute_raw_register(params: dict, data: bytes):
+    return CrcEngine(**params).update(0, data)
+
+
+def compute_file_range_register(params: dict, path, offset: int, length: int):
+    engine = CrcEngine(**params)
+    register = 0
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        while length > 0:
+            block = file.read(min(FILE_READ_SIZE, length))
+            if not block:
+                break
+            register = engine.update(register, block)
+            length -= len(block)
+    return register
+
+
+class CrcHasher:
+    """Interface incremental no estilo do hashlib: update pode ser chamado com os dados conforme chegam"""
+
+    def __init__(self, engine: CrcEngine, data: bytes = b''):
+        self.engine = engine
+        self.register = engine.initial_register
+        self.length = 0
+        self.update(data)
+
+    def update(self, data: bytes):
+        self.register = self.engine.update(self.register, data)
+        self.length += len(data)
+
+    @property
+    def value(self):
+        return self.engine.finalize(self.register)
+
+    def digest(self):
+        return self.value.to_bytes((self.engine.width + 7) >> 3, 'big')
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+    def copy(self):
+        other = CrcHasher(self.engine)
+        other.register = self.register
+        other.length = self.length
+        return other
+
+
+# Parâmetros de acordo com o catálogo de CRCs (https://reveng.sourceforge.io/crc-catalogue/)
+CRC_PRESETS = {
+    "CRC-8": dict(width=8, poly=0x07, init=0x00, reflect_in=False, reflect_out=False, xor_out=0x00),
+    "CRC-16/CCITT": dict(width=16, poly=0x1021, init=0xFFFF, reflect_in=False, reflect_out=False, xor_out=0x0000),
+    "CRC-32": dict(width=32, poly=0x04C11DB7, init=0xFFFFFFFF, reflect_in=True, reflect_out=True, xor_out=0xFFFFFFFF),
+    "CRC-32C": dict(width=32, poly=0x1EDC6F41, init=0xFFFFFFFF, reflect_in=True, reflect_out=True, xor_out=0xFFFFFFFF),
+}
+
+
+def get_preset_engine(preset_name: str):
+    try:
+        return CrcEngine(**CRC_PRESETS[preset_name.upper()])
+    except KeyError:
+        raise ValueError(f"Padrão de CRC desconhecido: {preset_name}. Disponíveis: {', '.join(CRC_PRESETS)}") from None
+
+
+def get_generator_engine(generator: str):
+    """Engine equivalente à divisão polinomial do Crc: sem valor inicial, reflexão ou XOR final"""
+    return CrcEngine(len(generator) - 1, int(generator, 2))
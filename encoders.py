@@ -1,14 +1,30 @@
 # DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
 
+import copy
 from abc import ABC, abstractmethod
-import math
-import bisect
-from textwrap import wrap
-from functools import reduce
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce, lru_cache
+from itertools import accumulate
+from bits import Bits, BitWriter, BitReader, CodewordTable, as_bits, iter_chunks, iter_one_positions, iter_unary_codes, pack_bits_stream, read_unary_codes, to_bit_array, from_bit_array, np
+from crc import CrcEngine, CRC_PRESETS, get_generator_engine, get_preset_engine
+from instrumentation import Instrumentation
+from batch import BitBatch, TextBatch, get_code_boundaries
+from huffman import MAX_CODE_LEN, get_code_lengths, get_canonical_codes, get_decode_table, get_static_codebook, read_header, write_header, write_reference_header, AdaptiveHuffmanModel
+import rans
 
 # CLASSES ABSTRATAS PARA FACILITAR O DESENVOLVIMENTO DA UI
 
 class Encoder(ABC):
+    """encode e decode não alteram a instância (o estado de cada chamada fica em variáveis locais e os caches
+    compartilhados são protegidos), então um codificador configurado pode ser usado por várias threads ao mesmo
+    tempo. Os parâmetros ficam em PARAMETERS e são trocados com configured, que retorna uma nova instância"""
+    STREAM_CHUNK_SIZE = 1 << 16
+    INSTRUMENTED_METHODS = ('encode', 'decode')
+    PARAMETERS = ()
+    instrumentation: Instrumentation | None = None
+
     def __init__(self, name_: str):
         self.name = name_
 
@@ -27,131 +43,696 @@ class Encoder(ABC):
     def is_valid_str_to_encode(self, str_to_encode: str):
         return True
 
+    def set_parameters(self, **parameters):
+        """Valida e aplica os parâmetros na própria instância. Usado pelo menu interativo e por configured"""
+        for name, value in parameters.items():
+            if name not in self.PARAMETERS:
+                raise ValueError(f"{self.name} não tem o parâmetro {name}")
+            setattr(self, name, value)
+
+    def configured(self, **parameters):
+        """Cópia da instância com os parâmetros alterados, sem mudar a original (nem a medição dela, que __getstate__
+        não copia)"""
+        encoder = copy.copy(self)
+        encoder.set_parameters(**parameters)
+        return encoder
+
+    def __getstate__(self):
+        """Cópias e instâncias enviadas para outros processos (pools do container e do servidor) vão sem a medição:
+        os métodos medidos, o lock e os hooks ficam apenas na instância original"""
+        state = self.__dict__.copy()
+        for operation in self.INSTRUMENTED_METHODS:
+            state.pop(operation, None)
+        state.pop('instrumentation', None)
+        return state
+
+    def enable_instrumentation(self, *hooks):
+        """Passa a medir as chamadas de encode/decode (tempo, tamanhos, bits por símbolo e erros corrigidos).
+        Cada hook recebe o CallRecord de cada chamada; os totais ficam em get_stats"""
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation(self.name, isinstance(self, ErrorCorrectionEncoder))
+            for operation in self.INSTRUMENTED_METHODS:
+                setattr(self, operation, self.instrumentation.wrap(operation, getattr(self, operation)))
+        for hook in hooks:
+            self.instrumentation.add_hook(hook)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        for operation in self.INSTRUMENTED_METHODS:
+            self.__dict__.pop(operation, None)
+        self.__dict__.pop('instrumentation', None)
+
+    def get_stats(self):
+        """Totais por operação desde que a medição foi ativada (vazio se está desativada)"""
+        return self.instrumentation.snapshot() if self.instrumentation is not None else {}
+
+    def encode_stream(self, chunks):
+        """Codifica um iterável de pedaços de texto (ou um arquivo de texto) gerando Bits. Todos os pedaços gerados,
+        exceto o último, têm um número inteiro de bytes e podem ser gravados diretamente"""
+        return pack_bits_stream(self.encode_stream_chunk(chunk) for chunk in iter_chunks(chunks, self.STREAM_CHUNK_SIZE))
+
+    def encode_stream_chunk(self, chunk: str):
+        """Por padrão cada pedaço é codificado de forma independente, o que é correto nos códigos em que cada símbolo
+        tem sempre o mesmo codeword"""
+        return as_bits(self.encode(chunk))
+
+    def decode_stream(self, chunks):
+        """Decodifica um iterável de pedaços de bits (Bits, bytes, strings de '0'/'1' ou um arquivo binário) gerando
+        o texto decodificado. Um codeword incompleto no fim de um pedaço continua no pedaço seguinte"""
+        carry = Bits()
+        for chunk in iter_chunks(chunks, self.STREAM_CHUNK_SIZE):
+            data = carry + as_bits(chunk)
+            decoded, consumed = self.decode_prefix(data)
+            carry = data[consumed:]
+            if decoded:
+                yield decoded
+        if len(carry):
+            yield self.decode_stream_end(carry)
+
+    def decode_prefix(self, data: Bits):
+        """Decodifica os codewords completos do início de data. Retorna o texto e o número de bits usados"""
+        raise NotImplementedError(f"{self.name} não suporta decodificação em stream")
+
+    def decode_stream_end(self, data: Bits):
+        """Bits que sobraram no fim do stream. Nos códigos de prefixo isso gera o erro de fim inesperado"""
+        return self.decode(data)
+
+    def encode_many(self, messages) -> BitBatch:
+        """Codifica várias mensagens (uma sequência ou um TextBatch) e retorna um BitBatch: as mensagens codificadas
+        concatenadas em um único buffer e os offsets de cada uma. Por padrão cada mensagem passa pelo encode; os
+        codificadores que conseguem processar o buffer concatenado de uma vez sobrescrevem"""
+        writer = BitWriter()
+        offsets = array('q', [0])
+        for message in messages:
+            writer.write_bits(as_bits(self.encode(message)))
+            offsets.append(len(writer))
+        return BitBatch(writer.getvalue(), offsets)
+
+    def decode_many(self, messages) -> TextBatch:
+        """Operação inversa de encode_many: recebe um BitBatch (ou uma sequência de mensagens codificadas) e retorna
+        um TextBatch"""
+        return TextBatch.from_messages([self.decode(message) for message in BitBatch.from_messages(messages)])
+
 
 # ------------------------------ CODIFICAÇÕES DO TRABALHO 2 ------------------------------
 
+def as_position_array(positions):
+    """Listas e arrays NumPy de posições viram sempre um array de inteiros de 64 bits"""
+    if np is not None and isinstance(positions, np.ndarray):
+        return array('q', positions.astype(np.int64).tobytes())
+    return array('q', positions)
+
+
+class DecodeResult:
+    """Resultado de decode_report: os dados decodificados, as posições corrigidas (na mensagem codificada, iniciando
+    em 0), os blocos que não puderam ser corrigidos e, no CRC, o resto e se ele é zero"""
+    __slots__ = ('data', 'corrected_positions', 'uncorrectable_blocks', 'crc_ok', 'rest')
+
+    def __init__(self, data: Bits, corrected_positions=(), uncorrectable_blocks=(), crc_ok: bool | None = None, rest: Bits | None = None):
+        self.data = data
+        self.corrected_positions = as_position_array(corrected_positions)
+        self.uncorrectable_blocks = as_position_array(uncorrectable_blocks)
+        self.crc_ok = crc_ok
+        self.rest = rest
+
+    @property
+    def ok(self):
+        return not self.uncorrectable_blocks and self.crc_ok is not False
+
+    def __repr__(self):
+        return (f"DecodeResult(bits={len(self.data)}, corrigidos={len(self.corrected_positions)}, "
+                f"incorrigíveis={len(self.uncorrectable_blocks)}, crc_ok={self.crc_ok})")
+
+
+class DecodeError(ValueError):
+    """Falha na decodificação. Quando a mensagem pôde ser lida, result tem o que foi decodificado"""
+
+    def __init__(self, message: str, result: DecodeResult | None = None):
+        super().__init__(message)
+        self.result = result
+
+
+class UncorrectableError(DecodeError):
+    pass
+
+
+class CrcMismatchError(DecodeError):
+    pass
+
+
 class ErrorCorrectionEncoder(Encoder):
-    def __init__(self, name_: str):
+    """Se o encode completa o último bloco com zeros de padding"""
+    PADS_LAST_BLOCK = False
+    """Se o código trabalha com blocos de tamanho fixo (get_stream_block_lens)"""
+    FIXED_BLOCKS = False
+    INSTRUMENTED_METHODS = ('encode', 'decode', 'decode_report')
+    PARAMETERS = ('quiet',)
+
+    def __init__(self, name_: str, quiet_: bool = False):
         super().__init__(name_)
+        """No modo silencioso nada é impresso: os erros corrigidos ficam apenas no resultado de decode_report"""
+        self.quiet = quiet_
 
     @abstractmethod
     def encode(self, str_to_encode: str):
         pass
 
     @abstractmethod
-    def decode(self, encoded_str: str):
+    def get_additional_parameters(self):
         pass
 
+    def is_valid_str_to_encode(self, str_to_encode: str):
+        return len(str_to_encode) > 0 and not str_to_encode.strip('01')
+
+    def is_valid_str_to_decode(self, encoded_str):
+        return True
+
     @abstractmethod
-    def get_additional_parameters(self):
+    def decode_report(self, encoded_str) -> DecodeResult:
+        """Decodifica sem imprimir nada e sem gerar exceções para erros detectados, apenas para mensagens inválidas"""
         pass
 
-    def is_valid_str_to_encode(self, str_to_encode: str):
-        return all([c == "1" or c == "0" for c in str_to_encode]) and len(str_to_encode) > 0
+    def report_errors(self, data: Bits, result: DecodeResult):
+        """Mensagens do menu interativo para os erros do resultado (data é a mensagem codificada)"""
+        pass
+
+    def decode(self, encoded_str):
+        """Decodifica e retorna os dados. Fora do modo silencioso os erros corrigidos são impressos. Erros que não
+        podem ser corrigidos geram exceções, com o resultado em error.result"""
+        data = as_bits(encoded_str)
+        result = self.decode_report(data)
+        if not self.quiet:
+            self.report_errors(data, result)
+        self.check_result(result)
+        return result.data
+
+    def check_result(self, result: DecodeResult):
+        if result.crc_ok is False:
+            raise CrcMismatchError(f"Resto = {result.rest}, mensagem recebida com erro.", result)
+        if result.uncorrectable_blocks:
+            raise UncorrectableError(f"Erros que não podem ser corrigidos nos segmentos {', '.join(str(n + 1) for n in result.uncorrectable_blocks[:10])}"
+                                     f"{'...' if len(result.uncorrectable_blocks) > 10 else ''}", result)
+
+    def check_decode_length(self, data: Bits):
+        if not self.is_valid_str_to_decode(data):
+            raise DecodeError("Mensagem com um número incorreto de caracteres!")
+
+    def print_padding(self, padding_len: int):
+        if not self.quiet:
+            print(f"Foi necessário adicionar {padding_len} zeros de padding ao final da mensagem. Por favor, desconsidere-os após a decodificação.")
+
+    def get_stream_block_lens(self):
+        """Tamanho de um bloco de dados e do bloco codificado correspondente"""
+        raise NotImplementedError(f"{self.name} não suporta codificação em stream")
+
+    def encode_blocks(self, data: Bits):
+        """Codifica dados com tamanho múltiplo do bloco de dados, sem padding"""
+        return as_bits(self.encode(data))
+
+    def get_block_position(self, block: int):
+        """Posição nos dados decodificados do início de um bloco indicado em uncorrectable_blocks"""
+        return block * self.get_stream_block_lens()[0]
+
+    def encode_many(self, messages) -> BitBatch:
+        """Nos códigos de blocos, cada mensagem é completada como no encode e o lote inteiro é codificado por uma única
+        chamada de encode_blocks. Nada é impresso"""
+        batch = BitBatch.from_messages(messages)
+        if not self.FIXED_BLOCKS:
+            return super().encode_many(batch)
+        data_len, encoded_len = self.get_stream_block_lens()
+        if self.PADS_LAST_BLOCK:
+            batch = batch.pad(data_len)
+        elif not batch.is_aligned(data_len):
+            return super().encode_many(batch)
+        return BitBatch(as_bits(self.encode_blocks(batch.data)), array('q', [offset // data_len * encoded_len for offset in batch.offsets]))
+
+    def decode_many_report(self, messages) -> DecodeResult:
+        """Como decode_report para um lote: data é um BitBatch com os dados de cada mensagem, corrected_positions são
+        posições no buffer concatenado e uncorrectable_blocks são os índices das mensagens com erros que não puderam
+        ser corrigidos (ou com o CRC errado). Com todas as mensagens alinhadas aos blocos, o lote é decodificado por
+        uma única chamada de decode_report"""
+        batch = BitBatch.from_messages(messages)
+        if self.FIXED_BLOCKS and batch.is_aligned(self.get_stream_block_lens()[1]):
+            data_len, encoded_len = self.get_stream_block_lens()
+            result = self.decode_report(batch.data)
+            data = BitBatch(result.data, array('q', [offset // encoded_len * data_len for offset in batch.offsets]))
+            failed = sorted({data.get_message_index(self.get_block_position(block)) for block in result.uncorrectable_blocks})
+            return DecodeResult(data, result.corrected_positions, failed, result.crc_ok, result.rest)
+        writer = BitWriter()
+        offsets = array('q', [0])
+        corrected_positions = array('q')
+        failed = []
+        crc_ok = None
+        for n, message in enumerate(batch):
+            result = self.decode_report(message)
+            writer.write_bits(result.data)
+            offsets.append(len(writer))
+            corrected_positions.extend(position + batch.offsets[n] for position in result.corrected_positions)
+            if result.uncorrectable_blocks or result.crc_ok is False:
+                failed.append(n)
+            if result.crc_ok is not None:
+                crc_ok = crc_ok is not False and result.crc_ok
+        return DecodeResult(BitBatch(writer.getvalue(), offsets), corrected_positions, failed, crc_ok)
+
+    def decode_many(self, messages) -> BitBatch:
+        """Decodifica o lote sem imprimir nada. Se alguma mensagem não pode ser recuperada, gera a mesma exceção do
+        decode, com o resultado do lote em error.result"""
+        result = self.decode_many_report(messages)
+        failed = result.uncorrectable_blocks
+        if len(failed):
+            error_type = CrcMismatchError if result.crc_ok is False else UncorrectableError
+            raise error_type(f"Erros que não podem ser corrigidos nas mensagens {', '.join(str(n) for n in failed[:10])}"
+                             f"{'...' if len(failed) > 10 else ''}", result)
+        return result.data
+
+    def encode_stream(self, chunks):
+        """Codifica um iterável de pedaços de bits gerando Bits com um número inteiro de bytes (exceto o último).
+        Os bits que não completam um bloco continuam no pedaço seguinte e o último bloco é completado como no encode"""
+        data_len, _ = self.get_stream_block_lens()
+
+        def encode_chunks():
+            carry = Bits()
+            for chunk in iter_chunks(chunks, self.STREAM_CHUNK_SIZE):
+                data = carry + as_bits(chunk)
+                full_len = len(data) - len(data) % data_len
+                carry = data[full_len:]
+                if full_len:
+                    yield self.encode_blocks(data[:full_len])
+            if len(carry):
+                yield as_bits(self.encode(carry))
+        return pack_bits_stream(encode_chunks())
+
+    def decode_stream(self, chunks):
+        """Decodifica um iterável de pedaços de bits bloco a bloco, gerando os bits de dados corrigidos com um número
+        inteiro de bytes (exceto o último). Cada pedaço passa por decode_report e check_result, como no decode, então
+        blocos que não podem ser corrigidos geram UncorrectableError antes que os dados do pedaço sejam entregues"""
+        _, encoded_len = self.get_stream_block_lens()
+        decoded_len = 0
+
+        def decode_checked(data: Bits):
+            nonlocal decoded_len
+            result = self.decode_report(data)
+            if len(result.uncorrectable_blocks):
+                """Numera os blocos a partir do início do stream, e não do pedaço"""
+                block_offset = decoded_len // self.get_block_position(1)
+                result = DecodeResult(result.data, result.corrected_positions, [block + block_offset for block in result.uncorrectable_blocks], result.crc_ok, result.rest)
+            self.check_result(result)
+            decoded_len += len(result.data)
+            return result.data
+
+        def decode_chunks():
+            carry = Bits()
+            for chunk in iter_chunks(chunks, self.STREAM_CHUNK_SIZE):
+                data = carry + as_bits(chunk)
+                full_len = len(data) - len(data) % encoded_len
+                carry = data[full_len:]
+                if full_len:
+                    yield decode_checked(data[:full_len])
+            if len(carry):
+                if not self.is_valid_str_to_decode(carry):
+                    raise ValueError("Mensagem com um número incorreto de caracteres!")
+                yield decode_checked(carry)
+        return pack_bits_stream(decode_chunks())
+
+
+def majority_vote(slices, width: int):
+    """Votação por maioria bit-sliced: cada slice é um inteiro com uma cópia de cada bit (uma posição por grupo).
+    As r cópias são somadas em um contador binário cujos bits também são inteiros, então todas as posições
+    são processadas ao mesmo tempo. Retorna a máscara dos bits majoritários e a máscara dos empates"""
+    r = len(slices)
+    all_ones = (1 << width) - 1
+    counter = []
+    for bits_slice in slices:
+        carry = bits_slice
+        for i in range(len(counter)):
+            counter[i], carry = counter[i] ^ carry, counter[i] & carry
+            if not carry:
+                break
+        if carry:
+            counter.append(carry)
+    """Compara o contador com r // 2, do bit mais significativo para o menos"""
+    threshold = r // 2
+    greater = 0
+    equal = all_ones
+    for i in range(max(len(counter), threshold.bit_length()) - 1, -1, -1):
+        count_bit = counter[i] if i < len(counter) else 0
+        if (threshold >> i) & 1:
+            equal &= count_bit
+        else:
+            greater |= equal & count_bit
+            equal &= ~count_bit & all_ones
+    return greater, equal if r % 2 == 0 else 0
+
+
+def get_periodic_mask(width: int, period: int, count: int):
+    """Máscara com count campos de width bits, um a cada period bits (o primeiro nos bits menos significativos)"""
+    mask = (1 << width) - 1
+    built = 1
+    while built < count:
+        mask |= mask << (built * period)
+        built *= 2
+    return mask & ((1 << (count * period)) - 1)
+
+
+def get_field_masks(width: int, period: int, count: int):
+    """Máscaras das rodadas de gather_fields e spread_fields: a cada rodada os campos dobram de tamanho e de período,
+    até sobrar um único campo"""
+    masks = [get_periodic_mask(width, period, count)]
+    while count > 1:
+        width, period, count = width * 2, period * 2, (count + 1) // 2
+        masks.append(get_periodic_mask(width, period, count))
+    return masks
+
+
+def gather_fields(value: int, width: int, period: int, masks):
+    """Junta os campos de width bits que estão a cada period bits em um inteiro contínuo, na mesma ordem. Cada rodada
+    encosta os campos ímpares nos pares com um único deslocamento, então são log2(campos) operações sobre o inteiro
+    inteiro, sem percorrer os bits em Python"""
+    value &= masks[0]
+    for i in range(1, len(masks)):
+        value = (value | (value >> ((period - width) << (i - 1)))) & masks[i]
+    return value
+
+
+def spread_fields(value: int, width: int, period: int, masks):
+    """Operação inversa de gather_fields: separa os campos contínuos de width bits, um a cada period bits"""
+    for i in range(len(masks) - 2, -1, -1):
+        value = (value | (value << ((period - width) << i))) & masks[i]
+    return value
 
 
 class RepetitionCode(ErrorCorrectionEncoder):
     DEFAULT_R_VALUE = 3
+    DEFAULT_INTERLEAVE_DEPTH = 1
+    FIXED_BLOCKS = True
+    PARAMETERS = ('quiet', 'r', 'interleave_depth')
     r: int
+    interleave_depth: int
 
-    def __init__(self, name_: str):
+    def __init__(self, name_: str, interleave_depth_: int = DEFAULT_INTERLEAVE_DEPTH):
         super().__init__(name_)
         self.r = self.DEFAULT_R_VALUE
-
-    def encode(self, str_to_encode: str):
-        encoded_str = ''
-        for i in range(len(str_to_encode)):
-            """Multiplica o caracter atual por r e adiciona no valor de retorno"""
-            encoded_str += str_to_encode[i] * self.r
-        return encoded_str
-
-    def decode(self, encoded_str: str):
-        decoded_str = ''
-        for i in range(len(encoded_str) // self.r):
-            """obtem o deslocamento multiplicando o indice atual por r"""
-            shift = i * self.r
-            substring = encoded_str[shift : shift + self.r]
-            """Conta o número de bits 0 e 1"""
-            bit_count_dict = {bit: substring.count(bit) for bit in substring}
-            """Determina qual o bit prevalente"""
-            max_count = max(bit_count_dict.values())
-            prevalent_bits = [i for i, count in bit_count_dict.items() if count == max_count]
-            """Se houve empate no caso de um valor r par, retorna a mensagem de erro e descarta a mensagem"""
-            if len(prevalent_bits) > 1:
-                return f"Múltiplos erros no segmento de número {i}: {substring} causaram empate entre os bits, impossível corrigir"
-            """Adiciona o bit correto na string de retorno"""
-            correct_bit = prevalent_bits[0]
-            decoded_str += correct_bit
-            """Se houve erro (ambos 0 e 1 estavam presente no segmento), avisa o usuario"""
-            if len(bit_count_dict) > 1:
-                error_index = substring.index("1") if correct_bit == "0" else substring.index("0")
-                print(f"Erro encontrado no bit número {error_index + shift + 1} (da esquerda para a direita, iniciando em 1): {get_error_highlight(substring, error_index)}")
-        return decoded_str
+        """Com profundidade D > 1, cada bloco de D bits é transmitido r vezes seguidas, então um burst de até D bits
+        atinge no máximo uma das cópias de cada bit. Com D = 1 é o código de repetição simples"""
+        self.interleave_depth = interleave_depth_
+
+    def encode(self, str_to_encode):
+        data = as_bits(str_to_encode)
+        depth = self.interleave_depth
+        block_count, tail_len = divmod(len(data), depth)
+        if np is not None:
+            """Cada linha é um bloco de D bits, repetido r vezes em sequência"""
+            bits = to_bit_array(data)
+            blocks = np.repeat(bits[:block_count * depth].reshape(-1, 1, depth), self.r, axis=1)
+            return from_bit_array(np.concatenate((blocks.ravel(), np.tile(bits[block_count * depth:], self.r))))
+        """Afasta os blocos completos para que cada um ocupe D * r bits e preenche o espaço com as cópias. Com D = 1
+        é a repetição de cada bit r vezes. O último bloco (menor) é repetido separadamente"""
+        value = data.to_int()
+        tail = value & ((1 << tail_len) - 1)
+        blocks = 0
+        if block_count:
+            blocks = spread_fields(value >> tail_len, depth, depth * self.r, get_field_masks(depth, depth * self.r, block_count))
+        repeated_blocks = sum(blocks << (replica * depth) for replica in range(self.r))
+        repeated_tail = sum(tail << (replica * tail_len) for replica in range(self.r))
+        return Bits.from_int((repeated_blocks << (tail_len * self.r)) | repeated_tail, len(data) * self.r)
+
+    def get_stream_block_lens(self):
+        return self.interleave_depth, self.interleave_depth * self.r
+
+    def get_block_position(self, block: int):
+        """uncorrectable_blocks são índices de bits (empates), não de grupos"""
+        return block
+
+    def get_slices(self, data: Bits, group_count: int):
+        """Separa a mensagem codificada nas r cópias (um inteiro de group_count bits por cópia, com os grupos na ordem
+        da mensagem)"""
+        depth = self.interleave_depth
+        block_count, tail_len = divmod(group_count, depth)
+        value = data.to_int() >> (len(data) - group_count * self.r)
+        tail = value & ((1 << (tail_len * self.r)) - 1)
+        blocks = value >> (tail_len * self.r)
+        masks = get_field_masks(depth, depth * self.r, block_count) if block_count else None
+        slices = []
+        for replica in range(self.r):
+            """A cópia j de cada bloco fica D * (r - 1 - j) bits acima do fim do bloco"""
+            shift = self.r - 1 - replica
+            replica_blocks = gather_fields(blocks >> (shift * depth), depth, depth * self.r, masks) if masks else 0
+            replica_tail = (tail >> (shift * tail_len)) & ((1 << tail_len) - 1)
+            slices.append((replica_blocks << tail_len) | replica_tail)
+        return slices
+
+    def get_position(self, group: int, replica: int, group_count: int):
+        """Posição na mensagem codificada da cópia `replica` do bit de índice `group`"""
+        if self.interleave_depth == 1:
+            return group * self.r + replica
+        block_start = group - group % self.interleave_depth
+        size = min(self.interleave_depth, group_count - block_start)
+        return block_start * self.r + replica * size + group % self.interleave_depth
+
+    def get_group_and_copy(self, position: int, group_count: int):
+        if self.interleave_depth == 1:
+            return divmod(position, self.r)
+        block_start = position // (self.interleave_depth * self.r) * self.interleave_depth
+        size = min(self.interleave_depth, group_count - block_start)
+        replica, index = divmod(position - block_start * self.r, size)
+        return block_start + index, replica
+
+    def vote(self, slices, group_count: int):
+        majority, ties = majority_vote(slices, group_count)
+        corrected_positions = []
+        for replica, bits_slice in enumerate(slices):
+            """Os bits diferentes do majoritário (fora dos empates) são os corrigidos"""
+            wrong = Bits.from_int((bits_slice ^ majority) & ~ties, group_count)
+            corrected_positions.extend(self.get_position(group, replica, group_count) for group in iter_one_positions(wrong))
+        corrected_positions.sort()
+        return Bits.from_int(majority, group_count), corrected_positions, list(iter_one_positions(Bits.from_int(ties, group_count)))
+
+    def vote_vectorized(self, data: Bits, group_count: int):
+        """Mesma votação de vote com as cópias em uma matriz de r linhas (uma por cópia) e group_count colunas"""
+        depth = self.interleave_depth
+        block_count, tail_len = divmod(group_count, depth)
+        bits = to_bit_array(data)[:group_count * self.r]
+        blocks = bits[:block_count * depth * self.r].reshape(-1, self.r, depth).transpose(1, 0, 2).reshape(self.r, -1)
+        copies = np.concatenate((blocks, bits[block_count * depth * self.r:].reshape(self.r, tail_len)), axis=1)
+        counts = copies.sum(axis=0, dtype=np.min_scalar_type(self.r))
+        majority = (counts > self.r // 2).view(np.uint8)
+        ties = counts == self.r // 2 if self.r % 2 == 0 else np.zeros(group_count, dtype=bool)
+        replicas, groups = np.nonzero((copies != majority) & ~ties)
+        """Mesmo cálculo de get_position para todos os bits corrigidos"""
+        block_starts = groups - groups % depth
+        corrected_positions = np.sort(block_starts * self.r + replicas * np.minimum(depth, group_count - block_starts) + groups % depth)
+        return from_bit_array(majority), corrected_positions, np.flatnonzero(ties)
+
+    def decode_blocks(self, encoded_str):
+        """Decodifica todos os grupos por votação bit-sliced. Retorna os bits decodificados, as posições corrigidas
+        (na mensagem codificada, iniciando em 0, em ordem crescente) e os índices dos grupos empatados (r par),
+        que não podem ser corrigidos"""
+        data = as_bits(encoded_str)
+        group_count = len(data) // self.r
+        if group_count == 0:
+            return Bits(), [], []
+        if np is not None:
+            return self.vote_vectorized(data, group_count)
+        return self.vote(self.get_slices(data, group_count), group_count)
+
+    def decode_report(self, encoded_str):
+        decoded, corrected_positions, tied_groups = self.decode_blocks(encoded_str)
+        return DecodeResult(decoded, corrected_positions, tied_groups)
+
+    def report_errors(self, data: Bits, result: DecodeResult):
+        group_count = len(data) // self.r
+        if group_count == 0:
+            return
+        first_tie = result.uncorrectable_blocks[0] if result.uncorrectable_blocks else group_count
+        reported_groups = set()
+        for position in result.corrected_positions:
+            group, replica = self.get_group_and_copy(position, group_count)
+            """Avisa o usuario do primeiro erro de cada grupo (até o primeiro empate)"""
+            if group < first_tie and group not in reported_groups:
+                reported_groups.add(group)
+                copies = ''.join([str(data[self.get_position(group, j, group_count)]) for j in range(self.r)])
+                print(f"Erro encontrado no bit número {position + 1} (da esquerda para a direita, iniciando em 1): {get_error_highlight(copies, replica)}")
+
+    def check_result(self, result: DecodeResult):
+        """Se houve empate no caso de um valor r par, a mensagem é descartada"""
+        if result.uncorrectable_blocks:
+            first_tie = result.uncorrectable_blocks[0]
+            raise UncorrectableError(f"Múltiplos erros no segmento de número {first_tie} causaram empate entre os bits, impossível corrigir", result)
 
     def get_additional_parameters(self):
         try:
             r_ = int(input(
                 f"Insira um valor válido para R (caso inválido, r = {self.DEFAULT_R_VALUE} ou qualquer valor configurado anteriormente): "))
-            if r_ <= 0:
-                raise ValueError
-            self.r = r_
+            self.set_parameters(r=r_)
+        except ValueError:
+            pass
+        try:
+            depth_ = int(input(
+                f"Insira a profundidade do entrelaçamento, 1 para não entrelaçar (caso inválido, mantém {self.interleave_depth}): "))
+            self.set_parameters(interleave_depth=depth_)
         except ValueError:
             pass
 
+    def set_parameters(self, **parameters):
+        if parameters.get('r', 1) <= 0:
+            raise ValueError("r precisa ser maior que zero")
+        if parameters.get('interleave_depth', 1) <= 0:
+            raise ValueError("A profundidade do entrelaçamento precisa ser maior que zero")
+        super().set_parameters(**parameters)
+
 
 class Crc(ErrorCorrectionEncoder):
     DEFAULT_GENERATOR = "1001"
+    PARAMETERS = ('quiet', 'generator', 'workers')
     generator: str
     d: int
+    preset: str | None
+    engine: CrcEngine
+    workers: int
 
-    def __init__(self, name_: str):
+    def __init__(self, name_: str, workers_: int = 1):
         super().__init__(name_)
+        """Com mais de um worker, mensagens grandes têm o CRC calculado em blocos por um pool de processos"""
+        self.workers = workers_
         self.set_generator(self.DEFAULT_GENERATOR)
 
-    def get_rest(self, data: str):
-        """Pega a substring inicial"""
-        substring = data[:self.d]
-        for i in range(len(substring), len(data) + 1):
-            """Transforma o gerador em número e zera se o primeiro caracter da substring for 0"""
-            xor_value = int(self.generator, 2) * int(substring[0])
-            """Aplica o XOR"""
-            xor_sum = int(substring, 2) ^ xor_value
-            """Converte o resultado de volta para binário e descarta o primeiro caracter"""
-            substring = format(xor_sum, f'0{self.d}b')[1:]
-            if i < len(data):
-                """Se ainda não acabou, puxa o próximo bit da string"""
-                substring += data[i]
-        return substring
-
-    def encode(self, str_to_encode: str):
-        """Adicionando zeros ao final"""
-        str_with_zeros = str_to_encode + ('0' * (self.d - 1))
-        return str_to_encode + self.get_rest(str_with_zeros)
-
-    def decode(self, encoded_str: str):
-        expected_rest = '0' * (self.d - 1)
-        rest = self.get_rest(encoded_str)
-        if rest == expected_rest:
-            print(f"Resto = {rest}, mensagem recebida corretamente.")
-            return encoded_str[:-self.d + 1]
-        else:
-            print(f"Resto = {rest}, mensagem recebida com erro.")
-            return encoded_str[:-self.d + 1] + rest
+    def get_crc(self, data):
+        if self.workers > 1:
+            return self.engine.compute_parallel(as_bits(data), max_workers=self.workers)
+        return self.engine.compute(data)
+
+    def get_rest(self, data):
+        """Calcula o CRC dos bits iniciais com a tabela e combina com os últimos d - 1 bits.
+        Sem um padrão configurado, é exatamente o resto da divisão polinomial de data pelo gerador"""
+        data = as_bits(data)
+        split = max(0, len(data) - (self.d - 1))
+        return Bits.from_int(self.get_crc(data[:split]) ^ data[split:].to_int(), self.d - 1)
+
+    def encode(self, str_to_encode):
+        """Equivale a adicionar d - 1 zeros ao final e calcular o resto"""
+        data = as_bits(str_to_encode)
+        return data + Bits.from_int(self.get_crc(data), self.d - 1)
+
+    def decode_report(self, encoded_str):
+        data = as_bits(encoded_str)
+        rest = self.get_rest(data)
+        message = data[:len(data) - (self.d - 1)]
+        return DecodeResult(message, crc_ok=rest.count(1) == 0, rest=rest)
+
+    def report_errors(self, data: Bits, result: DecodeResult):
+        if result.crc_ok:
+            print(f"Resto = {result.rest}, mensagem recebida corretamente.")
+
+    def encode_stream(self, chunks):
+        """Repassa os dados conforme chegam e adiciona o CRC ao final. Bits que não completam um byte são guardados
+        para que a tabela seja sempre usada com bytes inteiros"""
+        engine = self.engine
+
+        def encode_chunks():
+            register = engine.initial_register
+            carry = Bits()
+            for chunk in iter_chunks(chunks, self.STREAM_CHUNK_SIZE):
+                data = carry + as_bits(chunk)
+                full_len = len(data) & ~7
+                register = engine.update(register, data.data[:full_len >> 3])
+                carry = data[full_len:]
+                yield data[:full_len]
+            register = engine.update_from_bits(register, carry)
+            yield carry + Bits.from_int(engine.finalize(register), self.d - 1)
+        return pack_bits_stream(encode_chunks())
+
+    def decode_stream(self, chunks):
+        """Os últimos d - 1 bits recebidos ficam guardados até o fim do stream, quando o resto é verificado como no
+        decode (com CrcMismatchError se não for zero)"""
+        engine = self.engine
+        rest_len = self.d - 1
+
+        def decode_chunks():
+            register = engine.initial_register
+            carry = Bits()
+            for chunk in iter_chunks(chunks, self.STREAM_CHUNK_SIZE):
+                data = carry + as_bits(chunk)
+                full_len = max(0, len(data) - rest_len) & ~7
+                register = engine.update(register, data.data[:full_len >> 3])
+                carry = data[full_len:]
+                yield data[:full_len]
+            split = max(0, len(carry) - rest_len)
+            register = engine.update_from_bits(register, carry[:split])
+            rest = Bits.from_int(engine.finalize(register) ^ carry[split:].to_int(), rest_len)
+            """Os dados já foram entregues, então o erro só pode ser avisado com a exceção no fim do stream"""
+            result = DecodeResult(carry[:split], crc_ok=rest.count(1) == 0, rest=rest)
+            if not self.quiet:
+                self.report_errors(carry, result)
+            yield carry[:split]
+            self.check_result(result)
+        return pack_bits_stream(decode_chunks())
 
     def get_additional_parameters(self):
-        generator_ = input("Insira o polinômio gerador em formato binário (caso inválido, o valor padrão é 1001): ")
-        if all([c == "1" or c == "0" for c in generator_]) and len(generator_) > 0:
+        generator_ = input(f"Insira o polinômio gerador em formato binário ou um dos padrões {', '.join(CRC_PRESETS)} (caso inválido, o valor padrão é 1001): ")
+        try:
+            self.set_parameters(generator=generator_)
+        except ValueError:
+            pass
+
+    def set_parameters(self, **parameters):
+        """generator aceita o polinômio em binário ou o nome de um dos padrões"""
+        generator_ = parameters.pop('generator', None)
+        if parameters.get('workers', 1) <= 0:
+            raise ValueError("O número de workers precisa ser maior que zero")
+        super().set_parameters(**parameters)
+        if generator_ is None:
+            return
+        if generator_.upper() in CRC_PRESETS:
+            self.set_preset(generator_)
+        elif len(generator_) > 1 and not generator_.strip('01'):
             self.set_generator(generator_)
+        else:
+            raise ValueError(f"Polinômio gerador inválido: {generator_}")
 
     def set_generator(self, generator_):
+        if len(generator_) < 2:
+            raise ValueError("O polinômio gerador precisa ter pelo menos 2 bits")
         self.generator = generator_
         self.d = len(generator_)
+        self.preset = None
+        self.engine = get_generator_engine(generator_)
+
+    def hasher(self):
+        """Cálculo incremental (update/digest) com o gerador ou padrão configurado, para dados em stream"""
+        return self.engine.hasher()
+
+    def set_preset(self, preset_name: str):
+        """Usa um CRC padrão (com valor inicial, reflexão e XOR final) no lugar da divisão simples"""
+        self.engine = get_preset_engine(preset_name)
+        self.preset = preset_name.upper()
+        self.d = self.engine.width + 1
+        self.generator = '1' + format(self.engine.poly, f'0{self.engine.width}b')
 
 
 def get_error_highlight(sequence: str, error_index: int):
     return sequence[:error_index] + '>' + sequence[error_index] + '<' + sequence[error_index+1:]
 
 
+def build_hamming74_codewords(code_sequence):
+    """Tabela de 16 palavras-código: bits de dados seguidos do XOR dos códigos dos bits de dados iguais a 1"""
+    codewords = []
+    for nibble in range(16):
+        codes_to_use = [code_sequence[i] * ((nibble >> (3 - i)) & 1) for i in range(4)]
+        codewords.append((nibble << 3) | reduce(lambda x, y: x ^ y, codes_to_use))
+    return codewords
+
+
+def build_hamming74_syndromes(code_sequence):
+    """Tabela síndrome -> índice do bit errado no bloco (-1 se não há erro). Um erro no bit de dados i
+    gera a síndrome code_sequence[i], e um erro no bit de paridade j gera apenas o próprio bit j"""
+    error_indices = [-1] * 8
+    for i, code in enumerate(code_sequence):
+        error_indices[code] = i
+    for parity_bit_index in range(4, 7):
+        error_indices[1 << (6 - parity_bit_index)] = parity_bit_index
+    return error_indices
+
+
 class Hamming74(ErrorCorrectionEncoder):
     # Matriz geradora:
     # 1 0 0 0 | 1 0 1 -> 5
@@ -160,154 +741,471 @@ class Hamming74(ErrorCorrectionEncoder):
     # 0 0 0 1 | 0 1 1 -> 3
     CODE_SEQUENCE = [5, 6, 7, 3]
 
-    # Ordem do cálculo de paridade para cada bit de paridade:
-    XOR_ORDER = {
-        4: [0, 2, 1],
-        5: [1, 2, 3],
-        6: [0, 2, 3]
-    }
+    # Palavra-código (DDDDPPP) para cada valor de 4 bits de dados
+    CODEWORD_TABLE = build_hamming74_codewords(CODE_SEQUENCE)
+
+    # Índice do bit errado para cada síndrome (paridade recalculada XOR paridade recebida)
+    SYNDROME_TABLE = build_hamming74_syndromes(CODE_SEQUENCE)
+
+    PADS_LAST_BLOCK = True
+    FIXED_BLOCKS = True
 
     def __init__(self, name_: str):
         super().__init__(name_)
 
     # DDDDPPP
-    def encode(self, str_to_encode: str):
+    def encode(self, str_to_encode):
+        data = as_bits(str_to_encode)
         """Adiciona zeros ao final para que o tamanho seja multiplo de 4"""
-        if len(str_to_encode) % 4 != 0:
-            padding_zeros = '0' * ((-len(str_to_encode)) % 4)
-            str_to_encode += padding_zeros
-            print(f"Foi necessário adicionar {len(padding_zeros)} zeros de padding ao final da mensagem. Por favor, desconsidere-os após a decodificação.")
-        sequences = wrap(str_to_encode, 4)
-        encoded_str = ''
-        for sequence in sequences:
-            """Pega o código pela lista e multiplica por 1 ou 0 de acordo com o bit da posição"""
-            codes_to_use = [self.CODE_SEQUENCE[i] * int(sequence[i]) for i in range(4)]
-            """Reduz a lista de códigos com XOR"""
-            reduced_code = reduce(lambda x, y: x ^ y, codes_to_use)
-            """Formata em binário com zeros à esquerda e adiciona tudo ao valor de retorno"""
-            encoded_str += sequence + format(reduced_code, f'0{3}b')
-        return encoded_str
-
-    def decode(self, encoded_str: str):
+        if len(data) % 4 != 0:
+            padding_len = (-len(data)) % 4
+            data += Bits.from_int(0, padding_len)
+            self.print_padding(padding_len)
+        return self.encode_blocks(data)
+
+    def get_stream_block_lens(self):
+        return 4, 7
+
+    def encode_blocks(self, data: Bits):
+        """Codifica todos os blocos de 4 bits pela tabela de palavras-código"""
+        if np is not None:
+            nibbles = to_bit_array(data).reshape(-1, 4) @ np.array([8, 4, 2, 1], dtype=np.uint8)
+            codewords = np.array(self.CODEWORD_TABLE, dtype=np.uint8)[nibbles]
+            return from_bit_array(np.unpackbits(codewords[:, None], axis=1)[:, 1:])
+        reader = BitReader(data)
+        writer = BitWriter()
+        while not reader.at_end():
+            writer.write(self.CODEWORD_TABLE[reader.read(4)], 7)
+        return writer.getvalue()
+
+    def decode_report(self, encoded_str):
+        data = as_bits(encoded_str)
         """Verifica se o número de bits é múltiplo de 7"""
-        if not self.is_valid_str_to_decode(encoded_str):
-            return "Mensagem com um número incorreto de caracteres!"
-
-        """Divide as strings em um lista a cada 7 caracteres"""
-        decoded_str = ''
-        sequences = wrap(encoded_str, 7)
-        for n, sequence in enumerate(sequences):
-            """Inicializa um dicionário que mantém o número de cálculos corretos para cada bit"""
-            check_count_dict = {i: 0 for i in range(7)}
-            bits = list(map(int, sequence))
-            sequence_correct = True
-            for parity_bit_index in range(4, 7):
-                """Pega a ordem dos bits de dados que compoe o calculo de paridade"""
-                data_index_list = self.XOR_ORDER[parity_bit_index]
-                """Calculo da paridade"""
-                expected_parity_bit = bits[data_index_list[0]] ^ bits[data_index_list[1]] ^ bits[data_index_list[2]]
-                """Se o resultado estiver correto, adicionamos no dicionário para cada bit de dados e para o bit de paridade"""
-                if expected_parity_bit == bits[parity_bit_index]:
-                    check_count_dict[parity_bit_index] += 1
-                    for index in data_index_list:
-                        check_count_dict[index] += 1
-                else:
-                    sequence_correct = False
-            """Se não houve erro, concatena na string de retorno"""
-            if sequence_correct:
-                decoded_str += sequence[:4]
+        self.check_decode_length(data)
+        return DecodeResult(*self.decode_blocks(data))
+
+    def report_errors(self, data: Bits, result: DecodeResult):
+        for position in result.corrected_positions:
+            n, error_index = divmod(position, 7)
+            sequence = str(data[n * 7:(n + 1) * 7])
+            if error_index >= 4:
+                print(f'Erro no bit de paridade número {error_index - 3} do segmento de número {n + 1}: {get_error_highlight(sequence, error_index)}')
             else:
-                """Monta uma lista com True para os bits de dados que participaram de calculos corretos e False para os outros"""
-                bool_indices = [check_count_dict[i] > 0 for i in range(4)]
-                if all(bool_indices[:4]):
-                    """Se todos participaram de cálculos corretos, o erro está no bit de paridade que não participou de um cálculo correto"""
-                    wrong_parity_bit = min(check_count_dict, key=check_count_dict.get)
-                    print(f'Erro no bit de paridade número {wrong_parity_bit - 3} do segmento de número {n + 1}: {get_error_highlight(sequence, wrong_parity_bit)}')
-                    decoded_str += sequence[:4]
-                elif sum(bool_indices[:4]) == 3:
-                    """Se apenas 3 bits de dados participaram de cálculos corretos, o erro está naquele que não participou"""
-                    wrong_data_bit_index = bool_indices.index(False)
-                    correction_bit = (int(sequence[wrong_data_bit_index]) + 1) % 2  # Transforma 1 em 0 e 0 em 1
-                    print(f'Erro no bit de dados número {wrong_data_bit_index + 1} do segmento de número {n + 1}: {get_error_highlight(sequence, wrong_data_bit_index)}')
-                    decoded_str += sequence[:wrong_data_bit_index] + str(correction_bit) + sequence[wrong_data_bit_index + 1 : 4]
-                elif sum(bool_indices) == 0:
-                    """Se todos os calculos falharam, o bit do meio está errado"""
-                    correction_bit = (int(sequence[2]) + 1) % 2
-                    print(f'Erro no bit de dados número 3 do segmento de número {n + 1}: {get_error_highlight(sequence, 2)}')
-                    decoded_str += sequence[:2] + str(correction_bit) + sequence[3:4]
-                else:
-                    """Guard apenas para debug"""
-                    print("Algo deu errado!")
-                    return
-        return decoded_str
+                print(f'Erro no bit de dados número {error_index + 1} do segmento de número {n + 1}: {get_error_highlight(sequence, error_index)}')
+
+    def decode_blocks(self, data: Bits):
+        """Corrige todos os blocos de 7 bits pela tabela de síndromes. Retorna os bits de dados corrigidos e as
+        posições (na mensagem codificada, iniciando em 0) dos bits que foram corrigidos"""
+        if np is not None:
+            codewords = to_bit_array(data).reshape(-1, 7) @ np.array([64, 32, 16, 8, 4, 2, 1], dtype=np.uint8)
+            syndromes = np.array(self.CODEWORD_TABLE, dtype=np.uint8)[codewords >> 3] ^ codewords
+            error_indices = np.array(self.SYNDROME_TABLE, dtype=np.int64)[syndromes]
+            error_masks = np.array([0 if i < 0 else 1 << (6 - i) for i in self.SYNDROME_TABLE], dtype=np.uint8)[syndromes]
+            wrong_blocks = np.flatnonzero(error_indices >= 0)
+            nibbles = (codewords ^ error_masks) >> 3
+            return from_bit_array(np.unpackbits(nibbles[:, None], axis=1)[:, 4:]), wrong_blocks * 7 + error_indices[wrong_blocks]
+        reader = BitReader(data)
+        writer = BitWriter()
+        corrected_positions = []
+        for n in range(len(data) // 7):
+            codeword = reader.read(7)
+            error_index = self.SYNDROME_TABLE[(self.CODEWORD_TABLE[codeword >> 3] ^ codeword) & 7]
+            if error_index >= 0:
+                codeword ^= 1 << (6 - error_index)
+                corrected_positions.append(n * 7 + error_index)
+            writer.write(codeword >> 3, 4)
+        return writer.getvalue(), corrected_positions
 
     def get_additional_parameters(self):
         pass
 
-    def is_valid_str_to_decode(self, encoded_str: str):
+    def is_valid_str_to_decode(self, encoded_str):
         return len(encoded_str) % 7 == 0
 
 
+class HammingTables:
+    """Matriz de verificação de paridade de um código de Hamming com m bits de paridade e as tabelas derivadas dela"""
+
+    def __init__(self, m: int):
+        self.m = m
+        self.n = (1 << m) - 1
+        self.k = self.n - m
+        """Colunas da matriz de verificação: os bits de dados usam os valores que não são potência de 2
+        e o bit de paridade j usa apenas o bit j, então a paridade é o XOR das colunas dos dados iguais a 1"""
+        self.data_columns = [value for value in range(3, self.n + 1) if value & (value - 1)]
+        self.columns = self.data_columns + [1 << (m - 1 - j) for j in range(m)]
+        """Tabela síndrome -> índice do bit errado no bloco (-1 se não há erro)"""
+        self.syndrome_table = [-1] * (1 << m)
+        for index, column in enumerate(self.columns):
+            self.syndrome_table[column] = index
+        """Paridade dos dados byte a byte: parity_tables[c][v] é a contribuição do byte c (a partir do menos significativo)"""
+        self.parity_tables = []
+        for c in range((self.k + 7) // 8):
+            table = [0] * 256
+            for value in range(1, 256):
+                low_bit = (value & -value).bit_length() - 1
+                bit = 8 * c + low_bit
+                column = self.data_columns[self.k - 1 - bit] if bit < self.k else 0
+                table[value] = table[value & (value - 1)] ^ column
+            self.parity_tables.append(table)
+
+    def get_parity(self, data: int):
+        parity = 0
+        for table in self.parity_tables:
+            parity ^= table[data & 0xFF]
+            data >>= 8
+        return parity
+
+
+@lru_cache(maxsize=None)
+def get_hamming_tables(m: int):
+    return HammingTables(m)
+
+
+class HammingCode(ErrorCorrectionEncoder):
+    """Hamming(2^m - 1, 2^m - m - 1) no formato dados + paridade (como o Hamming(7, 4)). Na versão estendida
+    (SECDED) um bit de paridade geral é adicionado ao final, o que permite detectar erros duplos"""
+    DEFAULT_M_VALUE = 4
+    PADS_LAST_BLOCK = True
+    FIXED_BLOCKS = True
+    PARAMETERS = ('quiet', 'm')
+    m: int
+    extended: bool
+
+    def __init__(self, name_: str, m_: int = DEFAULT_M_VALUE, extended_: bool = False):
+        super().__init__(name_)
+        self.extended = extended_
+        self.set_m(m_)
+
+    def set_m(self, m_: int):
+        if m_ < 2:
+            raise ValueError("O código de Hamming precisa de pelo menos 2 bits de paridade")
+        self.m = m_
+        self.tables = get_hamming_tables(m_)
+
+    @property
+    def block_len(self):
+        return self.tables.n + self.extended
+
+    def get_stream_block_lens(self):
+        return self.tables.k, self.block_len
+
+    def encode(self, str_to_encode):
+        data = as_bits(str_to_encode)
+        k = self.tables.k
+        """Adiciona zeros ao final para que o tamanho seja multiplo de k"""
+        if len(data) % k != 0:
+            padding_len = (-len(data)) % k
+            data += Bits.from_int(0, padding_len)
+            self.print_padding(padding_len)
+        return self.encode_blocks(data)
+
+    def encode_blocks(self, data: Bits):
+        tables = self.tables
+        reader = BitReader(data)
+        writer = BitWriter()
+        while not reader.at_end():
+            block = reader.read(tables.k)
+            codeword = (block << tables.m) | tables.get_parity(block)
+            if self.extended:
+                codeword = (codeword << 1) | (codeword.bit_count() & 1)
+            writer.write(codeword, self.block_len)
+        return writer.getvalue()
+
+    def decode_report(self, encoded_str):
+        data = as_bits(encoded_str)
+        self.check_decode_length(data)
+        return DecodeResult(*self.decode_blocks(data))
+
+    def report_errors(self, data: Bits, result: DecodeResult):
+        for position in result.corrected_positions:
+            n, error_index = divmod(position, self.block_len)
+            sequence = str(data[n * self.block_len:(n + 1) * self.block_len])
+            if error_index >= self.tables.k:
+                print(f'Erro no bit de paridade número {error_index - self.tables.k + 1} do segmento de número {n + 1}: {get_error_highlight(sequence, error_index)}')
+            else:
+                print(f'Erro no bit de dados número {error_index + 1} do segmento de número {n + 1}: {get_error_highlight(sequence, error_index)}')
+        for n in result.uncorrectable_blocks:
+            print(f'Erro duplo detectado no segmento de número {n + 1}, impossível corrigir')
+
+    def decode_blocks(self, data: Bits):
+        """Corrige os blocos pela tabela de síndromes. Retorna os bits de dados, as posições corrigidas (na mensagem
+        codificada, iniciando em 0) e os índices dos blocos com erro duplo detectado (apenas na versão estendida),
+        que são mantidos sem correção"""
+        if np is not None:
+            return self.decode_blocks_vectorized(data)
+        tables = self.tables
+        reader = BitReader(data)
+        writer = BitWriter()
+        corrected_positions = []
+        uncorrectable_blocks = []
+        for n in range(len(data) // self.block_len):
+            codeword = reader.read(self.block_len)
+            if self.extended:
+                odd_parity = codeword.bit_count() & 1
+                codeword >>= 1
+            block = codeword >> tables.m
+            syndrome = tables.get_parity(block) ^ (codeword & ((1 << tables.m) - 1))
+            error_index = tables.syndrome_table[syndrome]
+            if self.extended and not odd_parity:
+                """Paridade geral correta com síndrome diferente de zero: número par de erros"""
+                if syndrome:
+                    uncorrectable_blocks.append(n)
+                error_index = -1
+            elif self.extended and not syndrome:
+                """Paridade geral errada com síndrome zero: o erro está no próprio bit de paridade geral"""
+                error_index = tables.n
+            if 0 <= error_index < tables.k:
+                block ^= 1 << (tables.k - 1 - error_index)
+            if error_index >= 0:
+                corrected_positions.append(n * self.block_len + error_index)
+            writer.write(block, tables.k)
+        return writer.getvalue(), corrected_positions, uncorrectable_blocks
+
+    def decode_blocks_vectorized(self, data: Bits):
+        tables = self.tables
+        blocks = to_bit_array(data).reshape(-1, self.block_len)
+        parity_check = np.array([[(column >> (tables.m - 1 - j)) & 1 for j in range(tables.m)] for column in tables.columns], dtype=np.uint8)
+        syndrome_bits = (blocks[:, :tables.n].astype(np.int64) @ parity_check) & 1
+        syndromes = syndrome_bits @ (1 << np.arange(tables.m - 1, -1, -1))
+        error_indices = np.array(tables.syndrome_table, dtype=np.int64)[syndromes]
+        uncorrectable_blocks = np.array([], dtype=np.int64)
+        if self.extended:
+            odd_parity = blocks.sum(axis=1, dtype=np.int64) & 1
+            uncorrectable_blocks = np.flatnonzero((odd_parity == 0) & (syndromes != 0))
+            error_indices[odd_parity == 0] = -1
+            error_indices[(odd_parity == 1) & (syndromes == 0)] = tables.n
+        wrong_blocks = np.flatnonzero(error_indices >= 0)
+        data_blocks = blocks[:, :tables.k].copy()
+        data_errors = wrong_blocks[error_indices[wrong_blocks] < tables.k]
+        data_blocks[data_errors, error_indices[data_errors]] ^= 1
+        return from_bit_array(data_blocks.ravel()), wrong_blocks * self.block_len + error_indices[wrong_blocks], uncorrectable_blocks
+
+    def get_additional_parameters(self):
+        try:
+            m_ = int(input(f"Insira o número de bits de paridade m, com m >= 2 (caso inválido, m = {self.DEFAULT_M_VALUE} ou qualquer valor configurado anteriormente): "))
+            self.set_parameters(m=m_)
+        except ValueError:
+            pass
+
+    def set_parameters(self, **parameters):
+        m_ = parameters.pop('m', None)
+        super().set_parameters(**parameters)
+        if m_ is not None:
+            self.set_m(m_)
+
+    def is_valid_str_to_decode(self, encoded_str):
+        return len(encoded_str) % self.block_len == 0
+
+
 # ------------------------------ CODIFICAÇÕES DO PRÉVIAS (TRABALHO 1) ------------------------------
 
+def get_golomb_parameters(k: int):
+    """Suffix length and truncated binary cutoff: remainders below the cutoff use one bit less. The cutoff is zero
+    exactly when k is a power of two (Rice code)"""
+    suffix_len = (k - 1).bit_length()
+    return suffix_len, (1 << suffix_len) - k
+
+
+def golomb_codeword(ascii_value: int, k: int):
+    suffix_len, cutoff = get_golomb_parameters(k)
+    if cutoff == 0:
+        """Rice: quotient and remainder with shift and mask"""
+        prefix_length = ascii_value >> suffix_len
+        suffix_value = ascii_value & (k - 1)
+    else:
+        prefix_length, suffix_value = divmod(ascii_value, k)
+        if suffix_value < cutoff:
+            suffix_len -= 1
+        else:
+            suffix_value += cutoff
+    """Prefix of zeros, stop-bit and suffix with necessary padding zeros to the left"""
+    return (1 << suffix_len) | suffix_value, prefix_length + 1 + suffix_len
+
+
+@lru_cache(maxsize=None)
+def get_golomb_table(k: int):
+    """One lazily built codeword table per k"""
+    return CodewordTable(lambda ascii_value: golomb_codeword(ascii_value, k))
+
+
+def get_golomb_cost(counts: Counter, k: int):
+    """Exact size in bits of the symbols in counts encoded with k"""
+    suffix_len, cutoff = get_golomb_parameters(k)
+    total = 0
+    for ascii_value, count in counts.items():
+        prefix_length, suffix_value = divmod(ascii_value, k)
+        total += count * (prefix_length + 1 + suffix_len - (suffix_value < cutoff))
+    return total
+
+
+def get_optimal_golomb_k(counts: Counter):
+    """Tries every small k, the powers of two and the neighbourhood of the k a geometric source with the same mean
+    would use, keeping the one with the smallest exact cost"""
+    symbol_count = sum(counts.values())
+    max_value = max(counts)
+    mean = sum(ascii_value * count for ascii_value, count in counts.items()) / symbol_count
+    geometric_k = max(1, round(mean * 0.6931))
+    candidates = set(range(1, min(max_value + 1, Golomb.MAX_EXHAUSTIVE_K) + 1))
+    candidates.update(1 << shift for shift in range(max_value.bit_length() + 1))
+    candidates.update(max(1, round(geometric_k * factor)) for factor in (0.5, 0.75, 0.9, 1, 1.1, 1.25, 1.5, 2))
+    return min(sorted(candidates), key=lambda k: get_golomb_cost(counts, k))
+
+
 class Golomb(Encoder):
     DEFAULT_K_VALUE = 64
+    """Symbols per block when k is chosen automatically. Each block stores its k and its size in bits (Elias-gamma)"""
+    AUTO_K_BLOCK_SIZE = 1 << 16
+    MAX_EXHAUSTIVE_K = 256
+    PARAMETERS = ('k',)
     k: int
     suffix_len: int
+    cutoff: int
+    auto_k: bool
 
-    def __init__(self, k_, name_: str):
+    def __init__(self, k_, name_: str, auto_k_: bool = False):
         super().__init__(name_)
         self.k = k_
+        self.auto_k = auto_k_
         self.set_suffix_len()
 
     def encode(self, str_to_encode: str):
-        encoded_str = ''
-        for c in str_to_encode:
-            ascii_value = ord(c)
-
-            """Adding prefix"""
-            prefix_length = int(ascii_value / self.k)
-            encoded_str += '0' * prefix_length
-
-            """Adding stop-bit"""
-            encoded_str += '1'
-
-            """Adding suffix with necessary padding zeros to the left"""
-            suffix_value = ascii_value % self.k
-            encoded_str += format(suffix_value, f'0{self.suffix_len}b')
-        return encoded_str
-
-    def decode(self, encoded_str: str):
-        decoded_str = ''
-        index = 0
-        while index < len(encoded_str):
-            """Prefix reading"""
-            zero_count = 0
-            while encoded_str[index] == '0':
-                zero_count += 1
-                index += 1
-            symbol_sum_value = self.k * zero_count
-            """Suffix reading"""
-            index += 1
-            suffix_substring = encoded_str[index:(index+self.suffix_len)]
-            symbol_sum_value += int(suffix_substring, 2)
-            index += self.suffix_len
-            decoded_str += chr(symbol_sum_value)
-        return decoded_str
+        writer = BitWriter()
+        if not self.auto_k:
+            get_golomb_table(self.k).encode_into(writer, str_to_encode)
+            return writer.getvalue()
+        for start in range(0, len(str_to_encode), self.AUTO_K_BLOCK_SIZE):
+            block = str_to_encode[start:start + self.AUTO_K_BLOCK_SIZE]
+            k = get_optimal_golomb_k(Counter(map(ord, block)))
+            block_writer = BitWriter()
+            get_golomb_table(k).encode_into(block_writer, block)
+            body = block_writer.getvalue()
+            writer.write_gamma(k)
+            writer.write_gamma(len(body) + 1)
+            writer.write_bits(body)
+        return writer.getvalue()
+
+    def decode(self, encoded_str):
+        if not self.auto_k:
+            return self.decode_block(encoded_str, self.k)
+        reader = BitReader(encoded_str)
+        decoded_blocks = []
+        while not reader.at_end():
+            k = reader.read_gamma()
+            body_len = reader.read_gamma() - 1
+            body = Bits.from_int(reader.read(body_len), body_len)
+            decoded_blocks.append(self.decode_block(body, k))
+        return ''.join(decoded_blocks)
+
+    def encode_many(self, messages) -> BitBatch:
+        """With a fixed k the whole batch goes through one translate pass, recording where each message ends"""
+        if self.auto_k:
+            return super().encode_many(messages)
+        batch = TextBatch.from_messages(messages)
+        return BitBatch(*get_golomb_table(self.k).encode_many(batch.text, batch.offsets))
+
+    def decode_many(self, messages) -> TextBatch:
+        """The concatenated codes are decoded in a single pass and the message boundaries are found among the
+        codeword ends. If a boundary falls inside a codeword, each message is decoded on its own to report the error"""
+        if self.auto_k:
+            return super().decode_many(messages)
+        batch = BitBatch.from_messages(messages)
+        suffix_len, cutoff = self.get_code_format(self.k)
+        codes = list(iter_unary_codes(batch.data, suffix_len, cutoff))
+        if cutoff is None:
+            code_ends = array('q', accumulate(zero_count + 1 + suffix_len for zero_count, _ in codes))
+        else:
+            """Truncated binary: remainders at or above the cutoff used one more suffix bit"""
+            code_ends = array('q', accumulate(zero_count + 1 + suffix_len + (suffix >= cutoff) for zero_count, suffix in codes))
+        try:
+            return TextBatch(self.get_chars(codes, self.k), get_code_boundaries(code_ends, batch.offsets))
+        except ValueError:
+            return super().decode_many(batch)
+
+    def decode_prefix(self, data: Bits):
+        if not self.auto_k:
+            codes, consumed = read_unary_codes(data, *self.get_code_format(self.k))
+            return self.get_chars(codes, self.k), consumed
+        """Only whole blocks are decoded, the block header may also be cut at the end of the chunk"""
+        reader = BitReader(data)
+        decoded_blocks = []
+        consumed = 0
+        try:
+            while not reader.at_end():
+                k = reader.read_gamma()
+                body_len = reader.read_gamma() - 1
+                body = Bits.from_int(reader.read(body_len), body_len)
+                decoded_blocks.append(self.decode_block(body, k))
+                consumed = reader.position
+        except EOFError:
+            pass
+        return ''.join(decoded_blocks), consumed
+
+    @staticmethod
+    def get_code_format(k: int):
+        """Suffix length and cutoff as iter_unary_codes expects them"""
+        suffix_len, cutoff = get_golomb_parameters(k)
+        return (suffix_len, None) if cutoff == 0 else (suffix_len - 1, cutoff)
+
+    @staticmethod
+    def get_chars(codes, k: int):
+        suffix_len, cutoff = get_golomb_parameters(k)
+        if cutoff == 0:
+            return ''.join([chr((zero_count << suffix_len) | suffix) for zero_count, suffix in codes])
+        return ''.join([chr(k * zero_count + suffix) for zero_count, suffix in codes])
+
+    @classmethod
+    def decode_block(cls, encoded_str, k: int):
+        """Prefix (zero count) and suffix are read a 64-bit word at a time"""
+        return cls.get_chars(iter_unary_codes(encoded_str, *cls.get_code_format(k)), k)
 
     def get_additional_parameters(self):
         try:
-            k_ = int(input(f"Insira um valor válido para K (caso inválido, k = {self.DEFAULT_K_VALUE} ou qualquer valor configurado anteriormente): "))
-            if k_ <= 0:
-                raise ValueError
-            self.k = k_
+            k_ = input(f"Insira um valor válido para K ou 'auto' para escolher K por bloco a partir da mensagem (caso inválido, k = {self.DEFAULT_K_VALUE} ou qualquer valor configurado anteriormente): ")
+            self.set_parameters(k=k_)
         except ValueError:
             pass
-        finally:
-            self.set_suffix_len()
+
+    def set_parameters(self, **parameters):
+        """k also accepts 'auto', which chooses k for each block"""
+        k_ = parameters.pop('k', None)
+        super().set_parameters(**parameters)
+        if k_ is None:
+            return
+        if str(k_).strip().lower() == 'auto':
+            self.auto_k = True
+            return
+        k_ = int(k_)
+        if k_ <= 0:
+            raise ValueError("k precisa ser maior que zero")
+        self.k = k_
+        self.auto_k = False
+        self.set_suffix_len()
 
     def set_suffix_len(self):
-        self.suffix_len = math.ceil(math.log2(self.k))
+        self.suffix_len, self.cutoff = get_golomb_parameters(self.k)
+
+
+def elias_gamma_codeword(char_value: int):
+    if char_value <= 0:
+        raise ValueError("Elias-Gamma can only encode values greater than zero")
+    """Prefix of n zeros followed by the stop bit and the suffix, which together are char_value in n + 1 bits"""
+    n = char_value.bit_length() - 1
+    return char_value, 2 * n + 1
+
+
+ELIAS_GAMMA_TABLE = CodewordTable(elias_gamma_codeword)
+"""Largest value a decoded codeword may have (the last Unicode code point)"""
+MAX_CODE_POINT = 0x10FFFF
+
+
+def get_elias_gamma_chars(codes):
+    """Joins the (zero count, suffix) pairs as characters. A long run of zeros in a corrupted message gives a value
+    above the last code point, which is reported as ValueError instead of leaking OverflowError from chr"""
+    try:
+        return ''.join([chr((1 << zero_count) | suffix) for zero_count, suffix in codes])
+    except (ValueError, OverflowError):
+        raise ValueError(f"Codeword de Elias-Gamma com valor maior que {MAX_CODE_POINT:#x} na mensagem") from None
 
 
 class EliasGamma(Encoder):
@@ -315,36 +1213,32 @@ class EliasGamma(Encoder):
         super().__init__(name_)
 
     def encode(self, str_to_encode: str):
-        encoded_str = ''
-        for character in str_to_encode:
-            char_value = ord(character)
-            """Calculate prefix and suffix length"""
-            n = int(math.log2(char_value))
-            """Append prefix and stop bit"""
-            encoded_str += ('0' * n) + '1'
-            """Append suffix"""
-            if n > 0:
-                encoded_str += format(char_value - (2 ** n), f'0{n}b')
-        return encoded_str
-
-    def decode(self, encoded_str: str):
-        decoded_str = ''
-        index = 0
-        while index < len(encoded_str):
-            """Prefix reading"""
-            zero_count = 0
-            while encoded_str[index] == '0':
-                zero_count += 1
-                index += 1
-            symbol_sum_value = 2 ** zero_count
-            """Suffix reading"""
-            index += 1
-            suffix_substring = encoded_str[index:index + zero_count]
-            if len(suffix_substring) > 0:
-                symbol_sum_value += int(suffix_substring, 2)
-                decoded_str += chr(symbol_sum_value)
-            index += zero_count
-        return decoded_str
+        writer = BitWriter()
+        ELIAS_GAMMA_TABLE.encode_into(writer, str_to_encode)
+        return writer.getvalue()
+
+    def decode(self, encoded_str):
+        """Prefix (zero count) and suffix, with as many bits as the prefix, are read a 64-bit word at a time"""
+        return get_elias_gamma_chars(iter_unary_codes(encoded_str))
+
+    def decode_prefix(self, data: Bits):
+        codes, consumed = read_unary_codes(data)
+        return get_elias_gamma_chars(codes), consumed
+
+    def encode_many(self, messages) -> BitBatch:
+        batch = TextBatch.from_messages(messages)
+        return BitBatch(*ELIAS_GAMMA_TABLE.encode_many(batch.text, batch.offsets))
+
+    def decode_many(self, messages) -> TextBatch:
+        """Same single pass as Golomb.decode_many, each codeword has 2 * zero_count + 1 bits"""
+        batch = BitBatch.from_messages(messages)
+        codes = list(iter_unary_codes(batch.data))
+        code_ends = array('q', accumulate(2 * zero_count + 1 for zero_count, _ in codes))
+        try:
+            boundaries = get_code_boundaries(code_ends, batch.offsets)
+        except ValueError:
+            return super().decode_many(batch)
+        return TextBatch(get_elias_gamma_chars(codes), boundaries)
 
     def get_additional_parameters(self):
         pass
@@ -355,71 +1249,161 @@ class EliasGamma(Encoder):
 
 def has_no_zeros(str_to_encode):
     """True if no character are 0"""
-    return all([ord(c) != 0 for c in str_to_encode])
+    return '\0' not in str_to_encode
+
+
+def fibonacci_codeword(char_value: int):
+    if char_value <= 0:
+        raise ValueError("Fibonacci coding can only encode values greater than zero")
+    fibonacci_seq = [1, 2]
+    while fibonacci_seq[-1] <= char_value:
+        fibonacci_seq.append(fibonacci_seq[-1] + fibonacci_seq[-2])
+    """Index of the largest fibonacci value that is lesser than or equal to char_value"""
+    top_index = len(fibonacci_seq) - 2
+    """The code has one bit per fibonacci index plus the stop bit, which is the least significant one"""
+    code_len = top_index + 2
+    code = 1
+    """Starting from the largest fibonacci value and decreasing"""
+    for i in range(top_index, -1, -1):
+        fibo_val = fibonacci_seq[i]
+        """If fibonacci value fits, subtract it from remainder and set the bit of index i (from left to right)"""
+        if char_value - fibo_val >= 0:
+            char_value -= fibo_val
+            code |= 1 << (code_len - 1 - i)
+    return code, code_len
+
+
+FIBONACCI_TABLE = CodewordTable(fibonacci_codeword)
+
+"""Longest codeword (without the stop bit) the table decoder accepts: enough for every unicode code point"""
+FIBONACCI_MAX_OFFSET = 40
+FIBONACCI_VALUES = [1, 2]
+while len(FIBONACCI_VALUES) < FIBONACCI_MAX_OFFSET + 8:
+    FIBONACCI_VALUES.append(FIBONACCI_VALUES[-1] + FIBONACCI_VALUES[-2])
+
+
+def build_fibonacci_decode_row(state: int):
+    """Decoding table row for one state, where state = 2 * offset + last bit, and offset is how many bits of the
+    current codeword were already read. Each entry, indexed by the next byte, holds the partial sum of the codeword
+    that ends in this byte (None if none ends), the symbols fully inside the byte, the next state (-1 if the
+    codeword grows too long) and the partial sum of the codeword left unfinished at the end of the byte"""
+    row = []
+    for byte in range(256):
+        offset, last_read = divmod(state, 2)
+        sum_value = 0
+        first_sum = None
+        middle = []
+        for t in range(7, -1, -1):
+            curr_bit = (byte >> t) & 1
+            if curr_bit & last_read:
+                """Second of two consecutive 1's: the codeword ends and the next one starts after it"""
+                if first_sum is None:
+                    first_sum = sum_value
+                else:
+                    middle.append(chr(sum_value))
+                sum_value = 0
+                offset = 0
+                last_read = 0
+            else:
+                if curr_bit:
+                    sum_value += FIBONACCI_VALUES[offset] if offset < len(FIBONACCI_VALUES) else 0
+                offset += 1
+                last_read = curr_bit
+        next_state = 2 * offset + last_read if offset <= FIBONACCI_MAX_OFFSET else -1
+        row.append((first_sum, ''.join(middle), next_state, sum_value))
+    return row
+
+
+FIBONACCI_DECODE_TABLE = [None] * (2 * FIBONACCI_MAX_OFFSET + 2)
+
+
+def decode_fibonacci(encoded_str, partial: bool = False):
+    """Finds the "11" stop bits and sums the fibonacci values a whole byte at a time through the state table.
+    With partial, an unfinished codeword at the end is not an error and the number of bits used is also returned"""
+    bits = as_bits(encoded_str)
+    table = FIBONACCI_DECODE_TABLE
+    state = 0
+    carry = 0
+    pieces = []
+    for byte in bits.data:
+        row = table[state]
+        if row is None:
+            row = table[state] = build_fibonacci_decode_row(state)
+        first_sum, middle, state, tail_sum = row[byte]
+        if first_sum is not None:
+            pieces.append(chr(carry + first_sum))
+            pieces.append(middle)
+            carry = tail_sum
+        else:
+            carry += tail_sum
+        if state < 0:
+            raise ValueError("Codeword de Fibonacci inválido na mensagem")
+    if partial:
+        """The state offset counts the bits read after the last stop bit"""
+        return ''.join(pieces), len(bits.data) * 8 - state // 2
+    """Only the padding zeros of the last byte may be left after the last stop bit"""
+    if carry or state // 2 > -bits.length & 7:
+        raise EOFError("Fim inesperado da mensagem codificada")
+    return ''.join(pieces)
+
+
+def find_fibonacci_boundary(bits: Bits, start: int):
+    """Self-synchronization: the first "11" after a 0 always ends a codeword, because a codeword ending right before
+    it would have to end with a 1. Returns the position right after that stop bit (None if there is none)"""
+    window = 64
+    while True:
+        window_str = bits[start:start + window].to_str()
+        zero_index = window_str.find('0')
+        pair_index = window_str.find('11', zero_index + 1) if zero_index >= 0 else -1
+        if pair_index >= 0:
+            return start + pair_index + 2
+        if start + window >= len(bits):
+            return None
+        window *= 2
 
 
 class FibonacciZeckendorf(Encoder):
+    PARALLEL_SEGMENT_BITS = 1 << 23
 
     def __init__(self, name_: str):
         super().__init__(name_)
-        self.fibonacci_seq = [1, 2]
 
     def encode(self, str_to_encode: str):
-        encoded_str = ''
-        for character in str_to_encode:
-            """Adding bits from right to left - starting with stop bit"""
-            code = '1'
-            """Ascii code"""
-            char_value = ord(character)
-            """Starting from the index of the largest fibonacci value that is lesser than char_value and decreasing"""
-            for i in range(self.get_index_of_nearest_fibonacci(char_value), -1, -1):
-                fibo_val = self.get_nth_fibonacci_val(i)
-                """If fibonacci value fits, subtract it from remainder and add 1 to encoding"""
-                if char_value - fibo_val >= 0:
-                    char_value -= fibo_val
-                    code = '1' + code
-                else:
-                    code = '0' + code
-            encoded_str += code
-        return encoded_str
-
-    def decode(self, encoded_str: str):
-        decoded_str = ''
-        index = 0
-        while index < len(encoded_str):
-            last_read = '0'
-            sum_value = 0
-            current_symbol_index = 0
-            """Until reads the second of two consecutive 1's"""
-            while last_read != (curr_bit := encoded_str[current_symbol_index + index]) or last_read == '0':
-                """Add Nth fibonacci value if read 1 where N is the current index in the current symbol"""
-                if curr_bit == '1':
-                    sum_value += self.get_nth_fibonacci_val(current_symbol_index)
-                current_symbol_index += 1
-                last_read = curr_bit
-            """Use ascii table to turn value into symbol"""
-            decoded_str += chr(sum_value)
-            """increase the outer index by the inner index plus 1 to skip the stop bit"""
-            index += current_symbol_index + 1
-        return decoded_str
+        writer = BitWriter()
+        FIBONACCI_TABLE.encode_into(writer, str_to_encode)
+        return writer.getvalue()
+
+    def decode(self, encoded_str):
+        return decode_fibonacci(encoded_str)
+
+    def decode_prefix(self, data: Bits):
+        return decode_fibonacci(data, partial=True)
+
+    def encode_many(self, messages) -> BitBatch:
+        batch = TextBatch.from_messages(messages)
+        return BitBatch(*FIBONACCI_TABLE.encode_many(batch.text, batch.offsets))
+
+    def decode_parallel(self, encoded_str, max_workers: int | None = None, segment_bits: int = PARALLEL_SEGMENT_BITS):
+        """Splits the stream every segment_bits, moves each split point to the next codeword boundary and decodes
+        the segments in a process pool"""
+        bits = as_bits(encoded_str)
+        boundaries = [0]
+        for split in range(segment_bits, len(bits), segment_bits):
+            boundary = find_fibonacci_boundary(bits, split)
+            if boundary is None:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+        boundaries.append(len(bits))
+        segments = [bits[start:end] for start, end in zip(boundaries, boundaries[1:]) if end > start]
+        if len(segments) <= 1:
+            return self.decode(bits)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return ''.join(executor.map(decode_fibonacci, segments))
 
     def get_additional_parameters(self):
         pass
 
-    def get_index_of_nearest_fibonacci(self, value):
-        """Example: input value 15 returns index of 13, the nearest fibonacci value to 15"""
-        index = 0
-        while (fibo_val := self.get_nth_fibonacci_val(index)) < value:
-            index += 1
-        return index if fibo_val == value else index - 1
-
-    def get_nth_fibonacci_val(self, n: int):
-        """Compute fibonacci sequence as needed and store it for future reference"""
-        if (curr_size := len(self.fibonacci_seq)) <= n:
-            for _ in range(n - (curr_size - 1)):
-                self.fibonacci_seq.append(self.fibonacci_seq[-1] + self.fibonacci_seq[-2])
-        return self.fibonacci_seq[n]
-
     def is_valid_str_to_encode(self, str_to_encode: str):
         return has_no_zeros(str_to_encode)
 
@@ -429,68 +1413,243 @@ class Ascii(Encoder):
         super().__init__(name_)
 
     def encode(self, str_to_encode: str):
-        return ''.join([format(ord(c), f'0{8}b') for c in str_to_encode])
+        return Bits(str_to_encode.encode('latin-1'))
+
+    def decode(self, encoded_str):
+        data = as_bits(encoded_str)
+        full_len = len(data) - len(data) % 8
+        decoded_str = data[:full_len].data.decode('latin-1')
+        if full_len < len(data):
+            """Leftover bits at the end are read as one last character"""
+            decoded_str += chr(data[full_len:].to_int())
+        return decoded_str
 
-    def decode(self, encoded_str: str):
-        char_list = wrap(encoded_str, 8)
-        return ''.join([chr(int(c, 2)) for c in char_list])
+    def decode_prefix(self, data: Bits):
+        full_len = len(data) - len(data) % 8
+        return data[:full_len].data.decode('latin-1'), full_len
+
+    def encode_many(self, messages) -> BitBatch:
+        batch = TextBatch.from_messages(messages)
+        return BitBatch(Bits(batch.text.encode('latin-1')), array('q', [offset * 8 for offset in batch.offsets]))
+
+    def decode_many(self, messages) -> TextBatch:
+        """Messages made of whole bytes are decoded all at once"""
+        batch = BitBatch.from_messages(messages)
+        if not batch.is_aligned(8):
+            return super().decode_many(batch)
+        return TextBatch(batch.data.data.decode('latin-1'), array('q', [offset >> 3 for offset in batch.offsets]))
 
     def get_additional_parameters(self):
         pass
 
+    def is_valid_str_to_encode(self, str_to_encode: str):
+        return max(str_to_encode, default='\0') <= '\xff'
+
 
 
 
 class Huffman(Encoder):
-    def __init__(self, name_):
+    DEFAULT_MAX_CODE_LEN = 32
+    PARAMETERS = ('max_code_len', 'static_codebook', 'embed_codebook')
+
+    def __init__(self, name_, max_code_len_: int = DEFAULT_MAX_CODE_LEN, static_codebook_: bool = False, embed_codebook_: bool = True):
         super().__init__(name_)
-        self.root: Node | None = None
-        self.codes_dict: dict = {}
+        self.max_code_len = max_code_len_
+        """With a static codebook, messages with the same (quantized) frequency profile reuse a cached codebook.
+        If the codebook is not embedded, the header only carries its fingerprint and the decoder must know it"""
+        self.static_codebook = static_codebook_
+        self.embed_codebook = embed_codebook_
+
+    def set_parameters(self, **parameters):
+        if not 1 <= parameters.get('max_code_len', 1) <= MAX_CODE_LEN:
+            raise ValueError(f"O tamanho máximo dos códigos precisa estar entre 1 e {MAX_CODE_LEN}")
+        super().set_parameters(**parameters)
 
     def encode(self, str_to_encode: str):
-        frequency_dict = {symbol: str_to_encode.count(symbol) for symbol in str_to_encode}
-        sorted_nodes_list = sorted([Node(frequency_dict[symbol], symbol) for symbol in frequency_dict], key=get_value)
-        while len(sorted_nodes_list) > 1:
-            left_node = sorted_nodes_list.pop(0)
-            right_node = sorted_nodes_list.pop(0)
-            new_node = Node(left_node.value + right_node.value, symbol_=None, left_=left_node, right_=right_node)
-            bisect.insort(sorted_nodes_list, new_node, key=get_value)
-        self.root = sorted_nodes_list[0]
-        self.build_codes_dict(self.root, '')
-        return ''.join([self.codes_dict[c] for c in str_to_encode])
+        """Single pass frequency count, heap based code lengths and canonical codes"""
+        frequencies = Counter(str_to_encode)
+        writer = BitWriter()
+        if self.static_codebook:
+            fingerprint, code_lengths = get_static_codebook(frequencies, self.max_code_len)
+        else:
+            fingerprint, code_lengths = None, get_code_lengths(frequencies, self.max_code_len)
+        """The header makes the encoded message self-describing"""
+        if fingerprint is not None and not self.embed_codebook:
+            write_reference_header(writer, fingerprint)
+        else:
+            write_header(writer, code_lengths)
+        codes_dict = get_canonical_codes(code_lengths)
+        for c in str_to_encode:
+            writer.write(*codes_dict[c])
+        return writer.getvalue()
+
+    def decode(self, encoded_str):
+        """Code lengths come from the header, decoding tables are built once per set of code lengths and cached"""
+        reader = BitReader(encoded_str)
+        code_lengths = read_header(reader)
+        if not code_lengths:
+            return ''
+        return get_decode_table(code_lengths).decode(encoded_str, reader.position)
+
+    def encode_stream_chunk(self, chunk: str):
+        """Each chunk is a complete message (with its own header) preceded by its size in bits (Elias-gamma)"""
+        encoded = self.encode(chunk)
+        writer = BitWriter()
+        writer.write_gamma(len(encoded) + 1)
+        writer.write_bits(encoded)
+        return writer.getvalue()
+
+    def decode_prefix(self, data: Bits):
+        reader = BitReader(data)
+        decoded_chunks = []
+        consumed = 0
+        try:
+            while not reader.at_end():
+                chunk_len = reader.read_gamma() - 1
+                decoded_chunks.append(self.decode(Bits.from_int(reader.read(chunk_len), chunk_len)))
+                consumed = reader.position
+        except EOFError:
+            pass
+        return ''.join(decoded_chunks), consumed
 
-    def decode(self, encoded_str: str):
-        decoded_str = ''
-        index = 0
-        while index < len(encoded_str):
-            symbol, index = self.find_symbol(self.root, encoded_str, index)
-            decoded_str += symbol
-        return decoded_str
+    def decode_stream_end(self, data: Bits):
+        raise EOFError("Fim inesperado da mensagem codificada")
 
-    def find_symbol(self, node, encoded_str, index):
-        if node.symbol:
-            return node.symbol, index
-        next_node = node.left if encoded_str[index] == '0' else node.right
-        return self.find_symbol(next_node, encoded_str, index + 1)
+    def get_additional_parameters(self):
+        pass
 
-    def build_codes_dict(self, node, code_str: str):
-        if node.symbol:
-            self.codes_dict[node.symbol] = code_str
-        else:
-            self.build_codes_dict(node.left, code_str + '0')
-            self.build_codes_dict(node.right, code_str + '1')
+
+class AdaptiveHuffman(Encoder):
+    """Single pass Huffman: encoder and decoder update the same model after each symbol, so there is no header
+    and no need to know the whole message in advance"""
+
+    def __init__(self, name_):
+        super().__init__(name_)
+
+    def encode(self, str_to_encode: str):
+        model = AdaptiveHuffmanModel()
+        writer = BitWriter()
+        for c in str_to_encode:
+            model.encode_symbol(writer, c)
+        return writer.getvalue()
+
+    def decode(self, encoded_str):
+        model = AdaptiveHuffmanModel()
+        reader = BitReader(encoded_str)
+        decoded_chars = []
+        while not reader.at_end():
+            decoded_chars.append(model.decode_symbol(reader))
+        return ''.join(decoded_chars)
+
+    def encode_stream(self, chunks):
+        """The model is shared by all chunks, so the output is the same as encoding the whole message at once"""
+        model = AdaptiveHuffmanModel()
+
+        def encode_chunks():
+            for chunk in iter_chunks(chunks, self.STREAM_CHUNK_SIZE):
+                writer = BitWriter()
+                for c in chunk:
+                    model.encode_symbol(writer, c)
+                yield writer.getvalue()
+        return pack_bits_stream(encode_chunks())
+
+    def decode_stream(self, chunks):
+        """The model is only updated after a whole symbol is read, so a symbol cut at the end of a chunk is read
+        again from its start with the next chunk"""
+        model = AdaptiveHuffmanModel()
+        carry = Bits()
+        for chunk in iter_chunks(chunks, self.STREAM_CHUNK_SIZE):
+            data = carry + as_bits(chunk)
+            reader = BitReader(data)
+            decoded_chars = []
+            position = 0
+            try:
+                while not reader.at_end():
+                    decoded_chars.append(model.decode_symbol(reader))
+                    position = reader.position
+            except EOFError:
+                pass
+            carry = data[position:]
+            if decoded_chars:
+                yield ''.join(decoded_chars)
+        if len(carry):
+            raise EOFError("Fim inesperado da mensagem codificada")
 
     def get_additional_parameters(self):
         pass
 
 
-def get_value(node):
-    return node.value
+class Rans(Encoder):
+    """Range ANS entropy coder with the same frequency model as Huffman, but with fractional bits per symbol, so
+    skewed distributions are not limited to at least one bit per symbol"""
+    PARAMETERS = ('scale_bits', 'static_model', 'embed_model')
+
+    def __init__(self, name_, scale_bits_: int = rans.DEFAULT_SCALE_BITS, static_model_: bool = False, embed_model_: bool = True):
+        super().__init__(name_)
+        self.scale_bits = scale_bits_
+        """With a static model, messages with the same (quantized) frequency profile reuse cached frequencies and
+        tables. If the model is not embedded, the header only carries its fingerprint and the decoder must know it"""
+        self.static_model = static_model_
+        self.embed_model = embed_model_
+
+    def set_parameters(self, **parameters):
+        if not 1 <= parameters.get('scale_bits', rans.DEFAULT_SCALE_BITS) <= rans.MAX_SCALE_BITS:
+            raise ValueError(f"A escala precisa ter entre 1 e {rans.MAX_SCALE_BITS} bits")
+        super().set_parameters(**parameters)
+
+    def encode(self, str_to_encode: str):
+        frequencies = Counter(str_to_encode)
+        writer = BitWriter()
+        if not frequencies:
+            rans.write_header(writer, 0, {})
+            return writer.getvalue()
+        scale_bits = rans.get_scale_bits(len(frequencies), self.scale_bits)
+        if self.static_model:
+            fingerprint, model = rans.get_static_model(frequencies, scale_bits)
+        else:
+            fingerprint, model = None, rans.normalize_frequencies(frequencies, scale_bits)
+        if fingerprint is not None and not self.embed_model:
+            rans.write_reference_header(writer, len(str_to_encode), fingerprint)
+        else:
+            rans.write_header(writer, len(str_to_encode), model)
+        """The rANS state words always have whole bytes, only the header has an arbitrary size"""
+        writer.write_bits(Bits(rans.get_tables(model).encode(str_to_encode)))
+        return writer.getvalue()
+
+    def decode(self, encoded_str):
+        data = as_bits(encoded_str)
+        reader = BitReader(data)
+        symbol_count, model = rans.read_header(reader)
+        if not model:
+            return ''
+        return rans.get_tables(model).decode(data[reader.position:].data, symbol_count)
+
+    def encode_stream_chunk(self, chunk: str):
+        """Each chunk is a complete message (with its own header) preceded by its size in bits (Elias-gamma)"""
+        encoded = self.encode(chunk)
+        writer = BitWriter()
+        writer.write_gamma(len(encoded) + 1)
+        writer.write_bits(encoded)
+        return writer.getvalue()
+
+    def decode_prefix(self, data: Bits):
+        reader = BitReader(data)
+        decoded_chunks = []
+        consumed = 0
+        try:
+            while not reader.at_end():
+                chunk_len = reader.read_gamma() - 1
+                if reader.remaining < chunk_len:
+                    break
+                decoded_chunks.append(self.decode(data[reader.position:reader.position + chunk_len]))
+                reader.position += chunk_len
+                consumed = reader.position
+        except EOFError:
+            pass
+        return ''.join(decoded_chunks), consumed
 
+    def decode_stream_end(self, data: Bits):
+        raise EOFError("Fim inesperado da mensagem codificada")
 
-class Node:
-    def __init__(self, value_, symbol_=None, left_=None, right_=None):
-        self.value: int = value_
-        self.symbol: str | None = symbol_
-        self.left: Node | None = left_
-        self.right: Node | None = right_
+    def get_additional_parameters(self):
+        pass
@@ -0,0 +1,438 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# CONSTRUÇÃO DE CÓDIGOS DE HUFFMAN CANÔNICOS COM TAMANHO MÁXIMO DE CÓDIGO
+
+import hashlib
+import heapq
+import json
+import math
+import threading
+from collections import Counter, OrderedDict
+from functools import lru_cache
+
+from bits import BitReader, BitWriter, as_bits
+
+
+def get_code_lengths(frequencies: Counter, max_code_len: int):
+    """Tamanho do código de cada símbolo. A árvore é montada com um heap e, se algum código passar de max_code_len,
+    os tamanhos são ajustados mantendo a desigualdade de Kraft (mesmo ajuste usado no JPEG, anexo K.3)"""
+    if not frequencies:
+        return {}
+    if len(frequencies) == 1:
+        """Um único símbolo ainda precisa de 1 bit por ocorrência"""
+        return {symbol: 1 for symbol in frequencies}
+    if len(frequencies) > 1 << max_code_len:
+        raise ValueError(f"Não é possível codificar {len(frequencies)} símbolos com códigos de até {max_code_len} bits")
+    """Cada item do heap é (frequência, id do nó). As folhas são os ids 0..n-1 e cada junção cria um nó com id maior
+    que o dos filhos, então a profundidade pode ser calculada depois em uma única passada do maior id para o menor"""
+    symbols = sorted(frequencies)
+    heap = [(frequencies[symbol], i) for i, symbol in enumerate(symbols)]
+    heapq.heapify(heap)
+    parents = [0] * (2 * len(symbols) - 1)
+    next_id = len(symbols)
+    while len(heap) > 1:
+        left_frequency, left_id = heapq.heappop(heap)
+        right_frequency, right_id = heapq.heappop(heap)
+        parents[left_id] = parents[right_id] = next_id
+        heapq.heappush(heap, (left_frequency + right_frequency, next_id))
+        next_id += 1
+    depths = [0] * len(parents)
+    for node_id in range(len(parents) - 2, -1, -1):
+        depths[node_id] = depths[parents[node_id]] + 1
+    lengths = {symbol: depths[i] for i, symbol in enumerate(symbols)}
+    if max(lengths.values()) <= max_code_len:
+        return lengths
+    return limit_code_lengths(frequencies, lengths, max_code_len)
+
+
+def limit_code_lengths(frequencies: Counter, lengths: dict, max_code_len: int):
+    length_count = [0] * (max(lengths.values()) + 1)
+    for length in lengths.values():
+        length_count[length] += 1
+    for length in range(len(length_count) - 1, max_code_len, -1):
+        while length_count[length] > 0:
+            """Dois símbolos do nível mais fundo viram irmãos de um símbolo que desce de um nível mais raso"""
+            shallower = length - 2
+            while length_count[shallower] == 0:
+                shallower -= 1
+            length_count[length] -= 2
+            length_count[length - 1] += 1
+            length_count[shallower + 1] += 2
+            length_count[shallower] -= 1
+    """Os menores códigos ficam com os símbolos mais frequentes"""
+    by_frequency = sorted(frequencies, key=lambda symbol: (-frequencies[symbol], symbol))
+    limited = {}
+    for length in range(1, max_code_len + 1):
+        for _ in range(length_count[length]):
+            limited[by_frequency[len(limited)]] = length
+    return limited
+
+
+def get_canonical_codes(code_lengths: dict):
+    """Códigos canônicos (valor, tamanho): em ordem de (tamanho, símbolo), cada código é o anterior + 1, deslocado
+    à esquerda quando o tamanho aumenta. Assim apenas os tamanhos precisam ser conhecidos para reconstruir os códigos"""
+    codes = {}
+    code = 0
+    previous_len = 0
+    for symbol in sorted(code_lengths, key=lambda symbol: (code_lengths[symbol], symbol)):
+        length = code_lengths[symbol]
+        code <<= length - previous_len
+        codes[symbol] = (code, length)
+        code += 1
+        previous_len = length
+    return codes
+
+
+LOOKUP_BITS = 10
+
+
+def build_tree(codes: dict):
+    """Árvore em um único array: os filhos do nó i ficam em nodes[2 * i] (bit 0) e nodes[2 * i + 1] (bit 1).
+    Um filho positivo é o id de outro nó, ~j (negativo) é a folha do símbolo symbols[j] e 0 é um ramo vazio"""
+    nodes = [0, 0]
+    symbols = []
+    for symbol, (code, code_len) in codes.items():
+        node = 0
+        for i in range(code_len - 1, 0, -1):
+            slot = 2 * node + ((code >> i) & 1)
+            if nodes[slot] == 0:
+                nodes[slot] = len(nodes) // 2
+                nodes.extend((0, 0))
+            node = nodes[slot]
+        nodes[2 * node + (code & 1)] = ~len(symbols)
+        symbols.append(symbol)
+    return nodes, symbols
+
+
+class DecodeTable:
+    """Decodificador por tabelas: cada consulta usa até LOOKUP_BITS bits de uma vez. Códigos maiores que a tabela
+    principal apontam para tabelas secundárias, montadas a partir do nó da árvore onde a consulta parou"""
+
+    def __init__(self, code_lengths: dict):
+        self.max_code_len = max(code_lengths.values(), default=0)
+        self.nodes, self.symbols = build_tree(get_canonical_codes(code_lengths))
+        self.subtables = {}
+        """As tabelas secundárias ficam em uma pilha até serem preenchidas, em vez de montadas por recursão, então
+        códigos longos ou degenerados não chegam ao limite de recursão"""
+        pending = []
+        self.root = self.new_table(0, 0, pending)
+        while pending:
+            self.build_table(*pending.pop(), pending)
+
+    def new_table(self, root_node: int, depth: int, pending: list):
+        """Tabela (bits, entradas) ainda vazia, adicionada à pilha para ser preenchida por build_table"""
+        table = (max(1, min(LOOKUP_BITS, self.max_code_len - depth)), [])
+        pending.append((root_node, depth, table))
+        return table
+
+    def build_table(self, root_node: int, depth: int, table: tuple, pending: list):
+        """Cada entrada é (símbolo, bits consumidos, None) para uma folha, (None, bits, tabela) para uma tabela
+        secundária ou (None, 0, None) para um código inexistente"""
+        table_bits, entries = table
+        for value in range(1 << table_bits):
+            node = root_node
+            entry = (None, 0, None)
+            for step in range(table_bits):
+                child = self.nodes[2 * node + ((value >> (table_bits - 1 - step)) & 1)]
+                if child < 0:
+                    entry = (self.symbols[~child], step + 1, None)
+                    break
+                if child == 0:
+                    break
+                node = child
+            else:
+                subtable = self.subtables.get(node)
+                if subtable is None:
+                    subtable = self.subtables[node] = self.new_table(node, depth + table_bits, pending)
+                entry = (None, table_bits, subtable)
+            entries.append(entry)
+
+    def decode(self, bits, position: int = 0):
+        """Decodifica do bit `position` até o final"""
+        bits = as_bits(bits)
+        data = bits.data
+        remaining = bits.length - position
+        root_bits, root_entries = self.root
+        decoded = []
+        append = decoded.append
+        """Janela de bits local: recarregada 64 bits por vez (o final da mensagem é completado com zeros)"""
+        byte_pos = position >> 3
+        acc_len = -position & 7
+        acc = data[byte_pos] & ((1 << acc_len) - 1) if acc_len else 0
+        byte_pos += acc_len > 0
+        while remaining > 0:
+            table_bits, entries = root_bits, root_entries
+            while True:
+                if acc_len < table_bits:
+                    acc = (acc << 64) | int.from_bytes(data[byte_pos:byte_pos + 8].ljust(8, b'\0'), 'big')
+                    acc_len += 64
+                    byte_pos += 8
+                symbol, length, subtable = entries[acc >> (acc_len - table_bits)]
+                if subtable is None:
+                    break
+                acc_len -= length
+                remaining -= length
+                acc &= (1 << acc_len) - 1
+                table_bits, entries = subtable
+            if length == 0 or length > remaining:
+                raise ValueError("Código de Huffman inválido na mensagem")
+            acc_len -= length
+            remaining -= length
+            acc &= (1 << acc_len) - 1
+            append(symbol)
+        return ''.join(decoded)
+
+
+"""Limitado, porque as chaves vêm dos cabeçalhos das mensagens recebidas"""
+DECODE_TABLE_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=DECODE_TABLE_CACHE_SIZE)
+def get_cached_decode_table(code_lengths_key: tuple):
+    return DecodeTable(dict(code_lengths_key))
+
+
+def get_decode_table(code_lengths: dict):
+    """A tabela é montada uma vez por conjunto de tamanhos de código (que define os códigos canônicos)"""
+    return get_cached_decode_table(tuple(sorted(code_lengths.items())))
+
+
+# CABEÇALHO AUTODESCRITIVO E CACHE DE CODEBOOKS ESTÁTICOS
+
+HEADER_INLINE = 0
+HEADER_REFERENCE = 1
+FINGERPRINT_BITS = 64
+"""Maior tamanho de código aceito no cabeçalho (e como max_code_len do codificador)"""
+MAX_CODE_LEN = 64
+MAX_CODE_POINT = 0x10FFFF
+
+
+def write_header(writer: BitWriter, code_lengths: dict):
+    """Cabeçalho com os tamanhos de código: como os códigos são canônicos, eles bastam para o decodificador.
+    Formato: bit de modo (0), gamma(número de símbolos + 1), gamma(bits por tamanho) e, para cada símbolo em
+    ordem de code point, gamma da diferença para o símbolo anterior seguido do tamanho do código"""
+    writer.write_bit(HEADER_INLINE)
+    writer.write_gamma(len(code_lengths) + 1)
+    if not code_lengths:
+        return
+    length_bits = max(code_lengths.values()).bit_length()
+    writer.write_gamma(length_bits)
+    previous = -1
+    for symbol in sorted(code_lengths):
+        writer.write_gamma(ord(symbol) - previous)
+        writer.write(code_lengths[symbol], length_bits)
+        previous = ord(symbol)
+
+
+def write_reference_header(writer: BitWriter, fingerprint: int):
+    """Cabeçalho que só referencia um codebook já conhecido pelo decodificador (registrado no cache)"""
+    writer.write_bit(HEADER_REFERENCE)
+    writer.write(fingerprint, FINGERPRINT_BITS)
+
+
+def read_header(reader: BitReader):
+    if reader.read_bit() == HEADER_REFERENCE:
+        fingerprint = reader.read(FINGERPRINT_BITS)
+        code_lengths = codebook_cache.get(fingerprint)
+        if code_lengths is None:
+            raise ValueError(f"Codebook {fingerprint:016x} desconhecido, é necessário registrá-lo antes de decodificar")
+        """O cache pode ter sido carregado de um arquivo, então o codebook também é verificado"""
+        check_code_lengths(code_lengths)
+        return code_lengths
+    symbol_count = reader.read_gamma() - 1
+    if symbol_count == 0:
+        return {}
+    if symbol_count > MAX_CODE_POINT + 1:
+        raise ValueError("Cabeçalho de Huffman inválido: número de símbolos fora do intervalo")
+    length_bits = reader.read_gamma()
+    if length_bits > MAX_CODE_LEN.bit_length():
+        raise ValueError("Cabeçalho de Huffman inválido: tamanhos de código grandes demais")
+    code_lengths = {}
+    previous = -1
+    for _ in range(symbol_count):
+        previous += reader.read_gamma()
+        if previous > MAX_CODE_POINT:
+            raise ValueError("Cabeçalho de Huffman inválido: code point fora do intervalo")
+        code_lengths[chr(previous)] = reader.read(length_bits)
+    check_code_lengths(code_lengths)
+    return code_lengths
+
+
+def check_code_lengths(code_lengths: dict):
+    """Os tamanhos precisam formar um código de prefixo completo (soma de Kraft igual a 1), ou um único símbolo de
+    1 bit, como os gerados por get_code_lengths. Isso é verificado antes que qualquer tabela seja montada"""
+    lengths = code_lengths.values()
+    if any(not 1 <= length <= MAX_CODE_LEN for length in lengths):
+        raise ValueError(f"Cabeçalho de Huffman inválido: tamanhos de código precisam estar entre 1 e {MAX_CODE_LEN}")
+    if len(code_lengths) == 1:
+        if next(iter(lengths)) != 1:
+            raise ValueError("Cabeçalho de Huffman inválido: um único símbolo precisa de código de 1 bit")
+        return
+    if sum(1 << (MAX_CODE_LEN - length) for length in lengths) != 1 << MAX_CODE_LEN:
+        raise ValueError("Cabeçalho de Huffman inválido: os tamanhos de código não satisfazem a desigualdade de Kraft")
+
+
+def get_frequency_profile(frequencies: Counter):
+    """Perfil quantizado em escala logarítmica (meia potência de 2 da probabilidade), de modo que mensagens do
+    mesmo tipo, com frequências parecidas, caiam no mesmo perfil"""
+    total = sum(frequencies.values())
+    return tuple((symbol, max(1, round(2 * math.log2(count * 65536 / total)))) for symbol, count in sorted(frequencies.items()))
+
+
+def get_fingerprint(profile: tuple, max_code_len: int):
+    digest = hashlib.blake2b(repr((profile, max_code_len)).encode(), digest_size=FINGERPRINT_BITS // 8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class CodebookCache:
+    """Cache LRU de codebooks (tamanhos de código) por fingerprint, seguro para uso entre threads.
+    Pode ser salvo e carregado de um arquivo JSON para ser reaproveitado entre execuções ou máquinas"""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.codebooks = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, fingerprint: int):
+        with self.lock:
+            code_lengths = self.codebooks.get(fingerprint)
+            if code_lengths is not None:
+                self.codebooks.move_to_end(fingerprint)
+            return code_lengths
+
+    def put(self, fingerprint: int, code_lengths: dict):
+        with self.lock:
+            self.codebooks[fingerprint] = code_lengths
+            self.codebooks.move_to_end(fingerprint)
+            while len(self.codebooks) > self.maxsize:
+                self.codebooks.popitem(last=False)
+
+    def save(self, path):
+        with self.lock:
+            content = {f'{fingerprint:016x}': code_lengths for fingerprint, code_lengths in self.codebooks.items()}
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(content, file, ensure_ascii=False)
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as file:
+            content = json.load(file)
+        for fingerprint, code_lengths in content.items():
+            self.put(int(fingerprint, 16), code_lengths)
+
+
+codebook_cache = CodebookCache()
+
+
+def get_static_codebook(frequencies: Counter, max_code_len: int):
+    """Codebook montado a partir do perfil quantizado. Mensagens com o mesmo perfil reaproveitam o codebook do cache
+    sem montar a árvore novamente. Retorna (fingerprint, tamanhos de código)"""
+    profile = get_frequency_profile(frequencies)
+    fingerprint = get_fingerprint(profile, max_code_len)
+    code_lengths = codebook_cache.get(fingerprint)
+    if code_lengths is None:
+        code_lengths = get_code_lengths(Counter({symbol: 2 ** (level / 2) for symbol, level in profile}), max_code_len)
+        codebook_cache.put(fingerprint, code_lengths)
+    return fingerprint, code_lengths
+
+
+# HUFFMAN ADAPTATIVO (FGK)
+
+class AdaptiveHuffmanModel:
+    """Árvore de Huffman adaptativa (algoritmo FGK) em arrays, atualizada a cada símbolo do mesmo jeito no codificador
+    e no decodificador. Símbolos ainda não vistos são enviados pelo nó NYT seguidos do code point em Elias-gamma.
+    O tamanho da árvore é limitado pelo alfabeto (2 nós por símbolo distinto), não pelo tamanho da mensagem.
+    Os nós são numerados pela ordem do FGK: order[rank] é o nó de rank `rank` e a raiz tem sempre o maior rank"""
+
+    def __init__(self):
+        self.weights = [0]
+        self.parents = [-1]
+        self.children = [None]
+        self.symbols = [None]
+        self.ranks = [0]
+        self.order = [0]
+        self.root = 0
+        self.nyt = 0
+        self.leaves = {}
+
+    def get_code(self, node: int):
+        """Código (valor, tamanho) do caminho da raiz até o nó: filho esquerdo 0 e direito 1"""
+        code = 0
+        code_len = 0
+        parent = self.parents[node]
+        while parent >= 0:
+            if self.children[parent][1] == node:
+                code |= 1 << code_len
+            code_len += 1
+            node = parent
+            parent = self.parents[node]
+        return code, code_len
+
+    def encode_symbol(self, writer: BitWriter, symbol: str):
+        leaf = self.leaves.get(symbol)
+        if leaf is None:
+            writer.write(*self.get_code(self.nyt))
+            writer.write_gamma(ord(symbol) + 1)
+        else:
+            writer.write(*self.get_code(leaf))
+        self.update(symbol)
+
+    def decode_symbol(self, reader: BitReader):
+        node = self.root
+        children = self.children
+        while children[node] is not None:
+            node = children[node][reader.read_bit()]
+        symbol = chr(reader.read_gamma() - 1) if node == self.nyt else self.symbols[node]
+        self.update(symbol)
+        return symbol
+
+    def add_node(self, parent: int, symbol):
+        node = len(self.weights)
+        self.weights.append(0)
+        self.parents.append(parent)
+        self.children.append(None)
+        self.symbols.append(symbol)
+        return node
+
+    def split_nyt(self, symbol: str):
+        """O NYT vira um nó interno com um novo NYT à esquerda e a folha do novo símbolo à direita. Os dois novos nós
+        recebem os menores ranks, abaixo de todos os outros"""
+        old_nyt = self.nyt
+        self.nyt = self.add_node(old_nyt, None)
+        leaf = self.add_node(old_nyt, symbol)
+        self.children[old_nyt] = [self.nyt, leaf]
+        self.leaves[symbol] = leaf
+        self.order[0:0] = [self.nyt, leaf]
+        self.ranks.extend((0, 0))
+        for rank, node in enumerate(self.order):
+            self.ranks[node] = rank
+        return leaf
+
+    def swap(self, a: int, b: int):
+        """Troca as subárvores de a e b de lugar (e seus ranks)"""
+        parent_a, parent_b = self.parents[a], self.parents[b]
+        side_a = self.children[parent_a].index(a)
+        side_b = self.children[parent_b].index(b)
+        self.children[parent_a][side_a] = b
+        self.children[parent_b][side_b] = a
+        self.parents[a], self.parents[b] = parent_b, parent_a
+        rank_a, rank_b = self.ranks[a], self.ranks[b]
+        self.order[rank_a], self.order[rank_b] = b, a
+        self.ranks[a], self.ranks[b] = rank_b, rank_a
+
+    def update(self, symbol: str):
+        node = self.leaves.get(symbol)
+        if node is None:
+            node = self.split_nyt(symbol)
+        weights, order, ranks = self.weights, self.order, self.ranks
+        while node != self.root:
+            """O líder do bloco é o nó de maior rank com o mesmo peso; trocando com ele a propriedade de irmãos se mantém"""
+            weight = weights[node]
+            leader_rank = ranks[node]
+            while leader_rank + 1 < len(order) and weights[order[leader_rank + 1]] == weight:
+                leader_rank += 1
+            leader = order[leader_rank]
+            if leader != node and leader != self.parents[node]:
+                self.swap(node, leader)
+            weights[node] += 1
+            node = self.parents[node]
+        weights[node] += 1
@@ -0,0 +1,158 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# MEDIÇÃO OPCIONAL DAS CHAMADAS DOS CODIFICADORES (TEMPO, TAMANHOS E ERROS CORRIGIDOS)
+
+import threading
+import time
+
+from bits import Bits
+
+
+def get_encoded_bits(value):
+    """Tamanho em bits de uma mensagem codificada (Bits, bytes ou string de '0'/'1')"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value) * 8
+    return len(value)
+
+
+def get_plain_size(value, plain_is_bits: bool):
+    """Símbolos e bits da mensagem original. Textos contam 8 bits por símbolo, como no Ascii"""
+    if plain_is_bits:
+        size = get_encoded_bits(value)
+        return size, size
+    if isinstance(value, Bits):
+        return len(value), len(value)
+    return len(value), len(value) * 8
+
+
+class CallRecord:
+    """Medição de uma chamada de encode/decode, entregue aos hooks"""
+    __slots__ = ('encoder_name', 'operation', 'seconds', 'plain_symbols', 'plain_bits', 'encoded_bits', 'corrected', 'uncorrectable', 'failed')
+
+    def __init__(self, encoder_name: str, operation: str):
+        self.encoder_name = encoder_name
+        self.operation = operation
+        self.seconds = 0.0
+        self.plain_symbols = 0
+        self.plain_bits = 0
+        self.encoded_bits = 0
+        self.corrected = 0
+        self.uncorrectable = 0
+        self.failed = False
+
+    @property
+    def bits_per_symbol(self):
+        return self.encoded_bits / self.plain_symbols if self.plain_symbols else 0.0
+
+    @property
+    def compression_ratio(self):
+        """Bits codificados por bit da mensagem original (menor que 1 é compressão)"""
+        return self.encoded_bits / self.plain_bits if self.plain_bits else 0.0
+
+    def set_result(self, result):
+        """Contagens de erros de um DecodeResult"""
+        self.corrected = len(result.corrected_positions)
+        self.uncorrectable = len(result.uncorrectable_blocks)
+
+    def to_dict(self):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values['bits_per_symbol'] = self.bits_per_symbol
+        values['compression_ratio'] = self.compression_ratio
+        return values
+
+
+class OperationStats:
+    """Totais acumulados das chamadas de uma operação"""
+    FIELDS = ('calls', 'failures', 'seconds', 'plain_symbols', 'plain_bits', 'encoded_bits', 'corrected', 'uncorrectable')
+
+    def __init__(self):
+        for name in self.FIELDS:
+            setattr(self, name, 0)
+
+    def add(self, record: CallRecord):
+        self.calls += 1
+        self.failures += record.failed
+        self.seconds += record.seconds
+        self.plain_symbols += record.plain_symbols
+        self.plain_bits += record.plain_bits
+        self.encoded_bits += record.encoded_bits
+        self.corrected += record.corrected
+        self.uncorrectable += record.uncorrectable
+
+    def to_dict(self):
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        values['bits_per_symbol'] = self.encoded_bits / self.plain_symbols if self.plain_symbols else 0.0
+        values['compression_ratio'] = self.encoded_bits / self.plain_bits if self.plain_bits else 0.0
+        values['symbols_per_second'] = self.plain_symbols / self.seconds if self.seconds else 0.0
+        return values
+
+
+class Instrumentation:
+    """Substitui encode/decode de uma instância por versões que medem cada chamada. Como as versões medidas são
+    atributos da instância, desativar é só removê-los, e a classe continua sem nenhum custo extra"""
+
+    def __init__(self, encoder_name: str, plain_is_bits: bool, hooks=()):
+        self.encoder_name = encoder_name
+        self.plain_is_bits = plain_is_bits
+        self.hooks = list(hooks)
+        self.operations = {}
+        self.lock = threading.Lock()
+        """Chamada em andamento por thread: decode_report chamado de dentro do decode só completa a medição dele"""
+        self.local = threading.local()
+
+    def add_hook(self, hook):
+        """hook(record) é chamado depois de cada chamada medida"""
+        self.hooks.append(hook)
+
+    def wrap(self, operation: str, method):
+        def instrumented(value, *args, **kwargs):
+            parent = getattr(self.local, 'active', None)
+            if parent is not None:
+                result = method(value, *args, **kwargs)
+                if operation == 'decode_report':
+                    parent.set_result(result)
+                return result
+            record = CallRecord(self.encoder_name, operation)
+            self.local.active = record
+            start = time.perf_counter()
+            try:
+                result = method(value, *args, **kwargs)
+            except Exception as error:
+                record.seconds = time.perf_counter() - start
+                record.failed = True
+                if operation != 'encode':
+                    record.encoded_bits = get_encoded_bits(value)
+                if getattr(error, 'result', None) is not None:
+                    record.set_result(error.result)
+                self.record(record)
+                raise
+            finally:
+                self.local.active = None
+            record.seconds = time.perf_counter() - start
+            if operation == 'encode':
+                record.plain_symbols, record.plain_bits = get_plain_size(value, self.plain_is_bits)
+                record.encoded_bits = get_encoded_bits(result)
+            else:
+                record.encoded_bits = get_encoded_bits(value)
+                decoded = result.data if operation == 'decode_report' else result
+                record.plain_symbols, record.plain_bits = get_plain_size(decoded, self.plain_is_bits)
+                if operation == 'decode_report':
+                    record.set_result(result)
+            self.record(record)
+            return result
+        instrumented.__wrapped__ = method
+        return instrumented
+
+    def record(self, record: CallRecord):
+        with self.lock:
+            self.operations.setdefault(record.operation, OperationStats()).add(record)
+        for hook in self.hooks:
+            hook(record)
+
+    def snapshot(self):
+        with self.lock:
+            return {operation: stats.to_dict() for operation, stats in self.operations.items()}
+
+    def reset(self):
+        with self.lock:
+            self.operations.clear()
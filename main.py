@@ -1,7 +1,8 @@
 # DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
 
-from encoders import Encoder, Golomb, EliasGamma, FibonacciZeckendorf, Huffman, RepetitionCode, Crc, Hamming74, Ascii
+from encoders import Encoder, ErrorCorrectionEncoder, Golomb, EliasGamma, FibonacciZeckendorf, Huffman, AdaptiveHuffman, Rans, RepetitionCode, Crc, Hamming74, HammingCode, Ascii
 from typing import List
+import sys
 
 AVAILABLE_ENCODERS: List[Encoder] = [
     Ascii("Ascii"),
@@ -9,9 +10,13 @@ AVAILABLE_ENCODERS: List[Encoder] = [
     EliasGamma("Elias-Gamma"),
     FibonacciZeckendorf("Fibonacci/Zeckendorf"),
     Huffman("Huffman"),
+    AdaptiveHuffman("Huffman adaptativo"),
+    Rans("rANS"),
     RepetitionCode("Código de Repetição"),
     Crc("CRC"),
-    Hamming74("Hamming(7, 4)")
+    Hamming74("Hamming(7, 4)"),
+    HammingCode("Hamming(2^m - 1, 2^m - m - 1)"),
+    HammingCode("Hamming estendido (SECDED)", extended_=True)
 ]
 
 
@@ -40,7 +45,7 @@ def get_validated_encoded_str():
     str_to_decode = ''
     while not valid_str:
         str_to_decode = input("Insira a mensagem para decodificar: ")
-        valid_str = all([bit == '0' or bit == '1' for bit in str_to_decode]) and len(str_to_decode) > 0
+        valid_str = len(str_to_decode) > 0 and not str_to_decode.strip('01')
     return str_to_decode
 
 
@@ -63,7 +68,9 @@ X para voltar ao menu principal
         try:
             encoder = get_encoder()
             encoder.get_additional_parameters()
-            encoded_str = encoder.encode(output_str)
+            """Codificadores de fonte recebem a representação em texto ('0'/'1') de uma saída em bits"""
+            str_to_encode = output_str if isinstance(encoder, ErrorCorrectionEncoder) else str(output_str)
+            encoded_str = encoder.encode(str_to_encode)
             print(f"Input codificado:\n{encoded_str}")
             get_follow_up_action(encoded_str, encoder)
         except Exception as error:
@@ -128,5 +135,9 @@ X para sair
 
 
 if __name__ == '__main__':
+    """Com argumentos na linha de comando, roda o modo não interativo (python main.py --help)"""
+    if len(sys.argv) > 1:
+        from cli import run_batch
+        sys.exit(run_batch())
     run()
 
@@ -0,0 +1,125 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# COMPOSIÇÃO DE CODIFICADORES (POR EXEMPLO HUFFMAN -> CRC -> HAMMING) LIGADOS PELOS STREAMS
+
+from typing import List
+
+from bits import Bits, BitWriter, as_bits, iter_chunks
+from encoders import Encoder, ErrorCorrectionEncoder
+
+"""Tamanho máximo dos pedaços de zeros entregues por remove_end_marker"""
+ZERO_CHUNK_BITS = 1 << 20
+
+
+def as_text_chunks(bit_chunks):
+    """Codificadores de fonte recebem a representação em texto ('0'/'1') de uma saída em bits, como no menu"""
+    return (str(bits) for bits in bit_chunks)
+
+
+def add_end_marker(bit_chunks):
+    """Um bit 1 ao final dos dados. Como o padding de um código de blocos só tem zeros, o marcador indica onde os
+    dados terminam depois da decodificação"""
+    yield from bit_chunks
+    yield Bits.from_int(1, 1)
+
+
+def iter_zero_bits(count: int):
+    """count bits zero, em pedaços de até ZERO_CHUNK_BITS"""
+    while count > 0:
+        length = min(count, ZERO_CHUNK_BITS)
+        yield Bits(bytes((length + 7) >> 3), length)
+        count -= length
+
+
+def remove_end_marker(bit_chunks):
+    """Guarda apenas se há um bit 1 pendente (o candidato a marcador) e quantos zeros vieram depois dele. Tudo antes
+    do último bit 1 recebido é entregue na hora, então longas sequências de zeros não acumulam memória. No fim do
+    stream o último bit 1 e os zeros seguintes (o padding) são descartados"""
+    has_marker = False
+    zero_count = 0
+    for chunk in bit_chunks:
+        data = as_bits(chunk)
+        """Os bits de padding de Bits são sempre zero, então o último bit 1 está no último byte diferente de zero"""
+        nonzero = data.data.rstrip(b'\0')
+        if not nonzero:
+            zero_count += len(data)
+            continue
+        last_byte = nonzero[-1]
+        last_one = len(nonzero) * 8 - (last_byte & -last_byte).bit_length()
+        if has_marker:
+            yield Bits.from_int(1, 1)
+        yield from iter_zero_bits(zero_count)
+        if last_one:
+            yield data[:last_one]
+        has_marker = True
+        zero_count = len(data) - last_one - 1
+    if not has_marker:
+        raise ValueError("Marcador de fim dos dados não encontrado, a mensagem está corrompida ou incompleta")
+
+
+class Pipeline(Encoder):
+    """Codifica passando a saída de cada etapa para a seguinte e decodifica na ordem inversa. As etapas são ligadas
+    pelos geradores de encode_stream/decode_stream, então só um pedaço de cada etapa fica em memória por vez.
+    Antes das etapas que completam o último bloco com zeros é adicionado um marcador de fim, para que a etapa
+    anterior receba exatamente os bits que gerou"""
+    stages: List[Encoder]
+
+    def __init__(self, name_: str, stages_: List[Encoder]):
+        super().__init__(name_)
+        if not stages_:
+            raise ValueError("O pipeline precisa de pelo menos uma etapa")
+        self.stages = list(stages_)
+
+    @property
+    def PARAMETERS(self):
+        return tuple(dict.fromkeys(name for stage in self.stages for name in stage.PARAMETERS))
+
+    def set_parameters(self, **parameters):
+        """Cada parâmetro vale para todas as etapas que o aceitam. As etapas são substituídas por cópias
+        configuradas, então um pipeline criado com configured não altera as etapas do original"""
+        for name in parameters:
+            if name not in self.PARAMETERS:
+                raise ValueError(f"{self.name} não tem o parâmetro {name}")
+        self.stages = [stage.configured(**{name: value for name, value in parameters.items() if name in stage.PARAMETERS})
+                       for stage in self.stages]
+
+    def encode_stream(self, chunks):
+        stream = iter_chunks(chunks, self.STREAM_CHUNK_SIZE)
+        for n, stage in enumerate(self.stages):
+            if n > 0 and not isinstance(stage, ErrorCorrectionEncoder):
+                stream = as_text_chunks(stream)
+            if getattr(stage, 'PADS_LAST_BLOCK', False):
+                stream = add_end_marker(as_bits(chunk) for chunk in stream)
+            stream = stage.encode_stream(stream)
+        return stream
+
+    def decode_stream(self, chunks):
+        stream = iter_chunks(chunks, self.STREAM_CHUNK_SIZE)
+        for stage in reversed(self.stages):
+            stream = stage.decode_stream(stream)
+            if getattr(stage, 'PADS_LAST_BLOCK', False):
+                stream = remove_end_marker(stream)
+        return stream
+
+    def encode(self, str_to_encode):
+        writer = BitWriter()
+        for bits in self.encode_stream(str_to_encode):
+            writer.write_bits(bits)
+        return writer.getvalue()
+
+    def decode(self, encoded_str):
+        """Retorna texto se a primeira etapa é um codificador de fonte e Bits se é um código de correção"""
+        if isinstance(self.stages[0], ErrorCorrectionEncoder):
+            writer = BitWriter()
+            for bits in self.decode_stream(encoded_str):
+                writer.write_bits(bits)
+            return writer.getvalue()
+        return ''.join(self.decode_stream(encoded_str))
+
+    def get_additional_parameters(self):
+        for stage in self.stages:
+            print(f"Parâmetros de {stage.name}:")
+            stage.get_additional_parameters()
+
+    def is_valid_str_to_encode(self, str_to_encode: str):
+        return self.stages[0].is_valid_str_to_encode(str_to_encode)
@@ -0,0 +1,234 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# CODIFICAÇÃO DE ENTROPIA rANS (RANGE ASYMMETRIC NUMERAL SYSTEMS) COM O MESMO MODELO DE FREQUÊNCIAS DO HUFFMAN
+
+import math
+import sys
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+from bits import BitReader, BitWriter
+from huffman import CodebookCache, get_fingerprint, get_frequency_profile
+
+DEFAULT_SCALE_BITS = 14
+MAX_SCALE_BITS = 24
+"""Estado entre STATE_LOWER e STATE_LOWER << 32, renormalizado de 32 em 32 bits"""
+STATE_LOWER = 1 << 31
+WORD_BITS = 32
+WORD_MASK = (1 << WORD_BITS) - 1
+
+MAX_CODE_POINT = 0x10FFFF
+"""Limite do número de símbolos de um modelo com um símbolo só, que não gasta bits por símbolo"""
+MAX_SYMBOL_COUNT = 1 << 32
+
+HEADER_INLINE = 0
+HEADER_REFERENCE = 1
+FINGERPRINT_BITS = 64
+
+
+def get_scale_bits(symbol_count: int, scale_bits: int = DEFAULT_SCALE_BITS):
+    """As frequências normalizadas somam 2^scale_bits. Com muitos símbolos a escala aumenta para que cada um ainda
+    tenha uma fração razoável da precisão"""
+    return min(MAX_SCALE_BITS, max(scale_bits, (symbol_count - 1).bit_length() + 2))
+
+
+def normalize_frequencies(frequencies: Counter, scale_bits: int):
+    """Frequências inteiras proporcionais às contagens, com soma 2^scale_bits e pelo menos 1 para cada símbolo.
+    A diferença do arredondamento é ajustada nos símbolos mais frequentes, onde ela custa menos"""
+    if len(frequencies) > 1 << scale_bits:
+        raise ValueError(f"Não é possível representar {len(frequencies)} símbolos com escala de {scale_bits} bits")
+    total = sum(frequencies.values())
+    scale = 1 << scale_bits
+    normalized = {symbol: max(1, int(count * scale / total)) for symbol, count in frequencies.items()}
+    by_frequency = sorted(frequencies, key=lambda symbol: (-frequencies[symbol], symbol))
+    difference = scale - sum(normalized.values())
+    if difference > 0:
+        normalized[by_frequency[0]] += difference
+    while difference < 0:
+        for symbol in by_frequency:
+            if normalized[symbol] > 1:
+                normalized[symbol] -= 1
+                difference += 1
+                if difference == 0:
+                    break
+    return normalized
+
+
+class RansTables:
+    """Tabelas de um modelo: para a codificação, (frequência, início, limite de renormalização) de cada símbolo; para
+    a decodificação, uma entrada por posição da escala com (símbolo, frequência, posição - início), então cada
+    símbolo é decodificado com uma consulta e uma multiplicação"""
+
+    def __init__(self, frequencies: dict):
+        self.frequencies = frequencies
+        total = sum(frequencies.values())
+        self.scale_bits = total.bit_length() - 1
+        if total != 1 << self.scale_bits:
+            raise ValueError("A soma das frequências precisa ser uma potência de 2")
+        self.encode_table = {}
+        self.decode_table = []
+        start = 0
+        for symbol in sorted(frequencies):
+            frequency = frequencies[symbol]
+            self.encode_table[symbol] = (frequency, start, ((STATE_LOWER >> self.scale_bits) << WORD_BITS) * frequency)
+            self.decode_table.extend([(symbol, frequency, bias) for bias in range(frequency)])
+            start += frequency
+
+    def encode(self, text: str):
+        """Os símbolos são codificados do último para o primeiro, para que o decodificador os leia na ordem"""
+        encode_table = self.encode_table
+        scale_bits = self.scale_bits
+        state = STATE_LOWER
+        words = array('I')
+        append = words.append
+        for symbol in reversed(text):
+            frequency, start, state_limit = encode_table[symbol]
+            if state >= state_limit:
+                append(state & WORD_MASK)
+                state >>= WORD_BITS
+            quotient, remainder = divmod(state, frequency)
+            state = (quotient << scale_bits) + remainder + start
+        append(state & WORD_MASK)
+        append(state >> WORD_BITS)
+        words.reverse()
+        if sys.byteorder == 'little':
+            words.byteswap()
+        return words.tobytes()
+
+    def decode(self, data: bytes, symbol_count: int):
+        if len(data) % 4 or len(data) < 8:
+            raise ValueError("Mensagem rANS com tamanho inválido")
+        words = array('I', data)
+        if sys.byteorder == 'little':
+            words.byteswap()
+        if len(self.frequencies) == 1:
+            """Com um símbolo só o estado nunca muda, então a mensagem é apenas o estado inicial"""
+            if len(words) != 2 or (words[0] << WORD_BITS) | words[1] != STATE_LOWER:
+                raise ValueError("Mensagem rANS corrompida: o estado final não confere")
+            return next(iter(self.frequencies)) * symbol_count
+        decode_table = self.decode_table
+        scale_bits = self.scale_bits
+        mask = (1 << scale_bits) - 1
+        state = (words[0] << WORD_BITS) | words[1]
+        position = 2
+        decoded = []
+        append = decoded.append
+        try:
+            for _ in range(symbol_count):
+                symbol, frequency, bias = decode_table[state & mask]
+                state = frequency * (state >> scale_bits) + bias
+                if state < STATE_LOWER:
+                    state = (state << WORD_BITS) | words[position]
+                    position += 1
+                append(symbol)
+        except IndexError:
+            raise ValueError("Fim inesperado da mensagem rANS") from None
+        if position != len(words) or state != STATE_LOWER:
+            raise ValueError("Mensagem rANS corrompida: o estado final não confere")
+        return ''.join(decoded)
+
+
+@lru_cache(maxsize=64)
+def get_cached_tables(frequencies_key: tuple):
+    return RansTables(dict(frequencies_key))
+
+
+def get_tables(frequencies: dict):
+    """As tabelas são montadas uma vez por modelo e reaproveitadas"""
+    return get_cached_tables(tuple(sorted(frequencies.items())))
+
+
+# CABEÇALHO COMPACTO E CACHE DE MODELOS ESTÁTICOS
+
+def write_header(writer: BitWriter, symbol_count: int, frequencies: dict):
+    """Formato: bit de modo (0), gamma(número de símbolos da mensagem + 1), gamma(tamanho do alfabeto + 1),
+    gamma(bits da escala) e, para cada símbolo em ordem de code point, gamma da diferença para o símbolo anterior
+    seguido de gamma(frequência). A frequência do último símbolo é o que falta para completar a escala"""
+    writer.write_bit(HEADER_INLINE)
+    writer.write_gamma(symbol_count + 1)
+    writer.write_gamma(len(frequencies) + 1)
+    if not frequencies:
+        return
+    writer.write_gamma(sum(frequencies.values()).bit_length() - 1)
+    previous = -1
+    symbols = sorted(frequencies)
+    for symbol in symbols:
+        writer.write_gamma(ord(symbol) - previous)
+        if symbol != symbols[-1]:
+            writer.write_gamma(frequencies[symbol])
+        previous = ord(symbol)
+
+
+def write_reference_header(writer: BitWriter, symbol_count: int, fingerprint: int):
+    """Cabeçalho que só referencia um modelo já conhecido pelo decodificador (registrado no cache)"""
+    writer.write_bit(HEADER_REFERENCE)
+    writer.write_gamma(symbol_count + 1)
+    writer.write(fingerprint, FINGERPRINT_BITS)
+
+
+def read_header(reader: BitReader):
+    """Retorna (número de símbolos da mensagem, frequências normalizadas). O cabeçalho é validado antes que qualquer
+    tabela seja montada, então uma mensagem corrompida gera ValueError em vez de pedir uma tabela enorme"""
+    mode = reader.read_bit()
+    symbol_count = reader.read_gamma() - 1
+    if mode == HEADER_REFERENCE:
+        fingerprint = reader.read(FINGERPRINT_BITS)
+        frequencies = model_cache.get(fingerprint)
+        if frequencies is None:
+            raise ValueError(f"Modelo {fingerprint:016x} desconhecido, é necessário registrá-lo antes de decodificar")
+        check_symbol_count(symbol_count, frequencies, reader.remaining)
+        return symbol_count, frequencies
+    alphabet_size = reader.read_gamma() - 1
+    if alphabet_size == 0:
+        if symbol_count:
+            raise ValueError("Cabeçalho rANS inválido: mensagem com símbolos e sem modelo")
+        return symbol_count, {}
+    scale_bits = reader.read_gamma()
+    if scale_bits > MAX_SCALE_BITS:
+        raise ValueError(f"Cabeçalho rANS inválido: escala de {scale_bits} bits (máximo {MAX_SCALE_BITS})")
+    scale = 1 << scale_bits
+    if alphabet_size > scale:
+        raise ValueError("Cabeçalho rANS inválido: mais símbolos do que posições na escala")
+    frequencies = {}
+    total = 0
+    previous = -1
+    for n in range(alphabet_size):
+        previous += reader.read_gamma()
+        if previous > MAX_CODE_POINT:
+            raise ValueError("Cabeçalho rANS inválido: code point fora do intervalo")
+        frequency = reader.read_gamma() if n < alphabet_size - 1 else scale - total
+        if frequency <= 0 or total + frequency > scale:
+            raise ValueError("Cabeçalho rANS inválido: as frequências passam da escala")
+        frequencies[chr(previous)] = frequency
+        total += frequency
+    check_symbol_count(symbol_count, frequencies, reader.remaining)
+    return symbol_count, frequencies
+
+
+def check_symbol_count(symbol_count: int, frequencies: dict, remaining_bits: int):
+    """Cada símbolo gasta pelo menos log2(escala / maior frequência) bits, e o estado final guarda no máximo
+    2 * WORD_BITS bits, então o número de símbolos é limitado pelo tamanho da mensagem"""
+    if symbol_count > MAX_SYMBOL_COUNT:
+        raise ValueError(f"Cabeçalho rANS inválido: {symbol_count} símbolos (máximo {MAX_SYMBOL_COUNT})")
+    if not frequencies:
+        return
+    scale = sum(frequencies.values())
+    min_bits = math.log2(scale / max(frequencies.values()))
+    if min_bits > 0 and symbol_count * min_bits > remaining_bits + 2 * WORD_BITS + 1:
+        raise ValueError("Cabeçalho rANS inválido: a mensagem é curta demais para o número de símbolos")
+
+
+model_cache = CodebookCache()
+
+
+def get_static_model(frequencies: Counter, scale_bits: int):
+    """Modelo montado a partir do mesmo perfil quantizado dos codebooks estáticos do Huffman, então mensagens com
+    frequências parecidas reaproveitam as frequências normalizadas e as tabelas. Retorna (fingerprint, frequências)"""
+    profile = get_frequency_profile(frequencies)
+    fingerprint = get_fingerprint(profile, ('rans', scale_bits))
+    normalized = model_cache.get(fingerprint)
+    if normalized is None:
+        normalized = normalize_frequencies(Counter({symbol: 2 ** (level / 2) for symbol, level in profile}), scale_bits)
+        model_cache.put(fingerprint, normalized)
+    return fingerprint, normalized
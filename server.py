@@ -0,0 +1,305 @@
+# DESENVOLVIDO POR GUSTAVO LAVINA E VITOR GOULART
+
+# SERVIÇO ASSÍNCRONO DE ENCODE/DECODE POR SOCKET TCP OU UNIX, COM POOL DE WORKERS E CONTROLE DE FLUXO
+
+# Cada mensagem (pedido ou resposta) é um cabeçalho '>II' com o tamanho do JSON e o tamanho do payload, seguido do
+# JSON em UTF-8 e do payload. Pedido: {"id", "action": "encode" ou "decode", "encoder": nome ou pipeline com '+' como
+# na linha de comando, "parameters": {"k": 5, ...}}. Resposta: {"id", "ok": true} ou {"id", "ok": false, "error"}.
+# Os payloads usam os mesmos formatos do cli.py: texto em UTF-8 (ou bytes nos códigos de correção) e mensagens
+# codificadas no formato empacotado. As respostas de uma conexão podem chegar fora de ordem, identificadas pelo id
+
+import argparse
+import asyncio
+import json
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from cli import ENCODER_FACTORIES, build_encoder, iter_output_chunks
+
+FRAME_HEADER = struct.Struct('>II')
+DEFAULT_PORT = 8765
+DEFAULT_MAX_PENDING = 64
+DEFAULT_MAX_CONNECTION_PENDING = 8
+DEFAULT_MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+"""Pedidos de encode com payload até esse tamanho, e só com codificadores de INLINE_ENCODERS, são atendidos no
+próprio event loop, sem o custo de enviar para o pool"""
+DEFAULT_INLINE_SIZE = 4096
+"""Codificadores com custo fixo por símbolo, sem cabeçalho e sem parâmetros que mudem o custo. O tamanho do payload
+não limita o custo de um decode (por exemplo, um cabeçalho de Huffman ou rANS pequeno que descreve uma mensagem
+enorme), nem o dos codificadores com parâmetros como k ou r, então esses pedidos sempre vão para o pool"""
+INLINE_ENCODERS = ('ascii', 'elias-gamma', 'fibonacci', 'hamming74')
+ACTIONS = ('encode', 'decode')
+
+
+class ProtocolError(ValueError):
+    """Mensagem mal formada ou grande demais: a conexão é encerrada depois da resposta de erro"""
+
+
+class ServiceError(Exception):
+    """Erro retornado pelo serviço para um pedido"""
+
+
+@lru_cache(maxsize=256)
+def get_service_encoder(encoder_spec: str, parameters_key: str):
+    """Codificadores configurados, compartilhados entre os pedidos (e as threads) com a mesma configuração. Os
+    códigos de correção ficam em modo silencioso, já que os avisos não têm para onde ir"""
+    names = encoder_spec.lower().split('+')
+    for name in names:
+        if name not in ENCODER_FACTORIES:
+            raise ValueError(f"Codificador desconhecido: {name}")
+    parameters = json.loads(parameters_key)
+    encoder = build_encoder(names, {'quiet': True, **parameters})
+    for name in parameters:
+        if name not in encoder.PARAMETERS:
+            raise ValueError(f"{encoder.name} não tem o parâmetro {name}")
+    return encoder
+
+
+def run_job(action: str, encoder_spec: str, parameters_key: str, payload: bytes):
+    """Executado no pool de workers (ou no event loop para pedidos pequenos)"""
+    encoder = get_service_encoder(encoder_spec, parameters_key)
+    return b''.join(iter_output_chunks(encoder, action, [payload]))
+
+
+def pack_frame(header: dict, payload: bytes = b''):
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    return FRAME_HEADER.pack(len(header_bytes), len(payload)) + header_bytes + payload
+
+
+async def read_frame(reader: asyncio.StreamReader, max_message_size: int):
+    """Retorna (cabeçalho, payload), ou None se a conexão foi fechada entre duas mensagens"""
+    try:
+        prefix = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as error:
+        if error.partial:
+            raise ProtocolError("Conexão encerrada no meio de uma mensagem") from None
+        return None
+    header_len, payload_len = FRAME_HEADER.unpack(prefix)
+    if header_len + payload_len > max_message_size:
+        raise ProtocolError(f"Mensagem de {header_len + payload_len} bytes, acima do limite de {max_message_size}")
+    try:
+        header = json.loads(await reader.readexactly(header_len))
+        payload = await reader.readexactly(payload_len)
+    except asyncio.IncompleteReadError:
+        raise ProtocolError("Conexão encerrada no meio de uma mensagem") from None
+    except ValueError:
+        raise ProtocolError("Cabeçalho JSON inválido") from None
+    if not isinstance(header, dict):
+        raise ProtocolError("O cabeçalho precisa ser um objeto JSON")
+    return header, payload
+
+
+class EncodingService:
+    """Atende muitos clientes em um único processo. O controle de fluxo tem dois níveis: no máximo max_pending
+    pedidos em andamento no total e max_connection_pending por conexão. Sem vaga, o servidor para de ler o socket
+    da conexão, e o cliente passa a esperar pelo buffer do TCP. A escrita das respostas também espera o cliente ler
+    (drain), então um cliente lento só ocupa as vagas da própria conexão"""
+
+    def __init__(self, workers: int | None = None, use_threads: bool = False, max_pending: int = DEFAULT_MAX_PENDING,
+                 max_connection_pending: int = DEFAULT_MAX_CONNECTION_PENDING, max_message_size: int = DEFAULT_MAX_MESSAGE_SIZE,
+                 inline_size: int = DEFAULT_INLINE_SIZE):
+        """Com threads o pool compartilha os codificadores, mas o GIL limita o paralelismo; com processos cada
+        worker tem os seus"""
+        self.executor = ThreadPoolExecutor(workers) if use_threads else ProcessPoolExecutor(workers)
+        self.max_pending = max_pending
+        self.max_connection_pending = max_connection_pending
+        self.max_message_size = max_message_size
+        self.inline_size = inline_size
+        self.pending = None
+        """Conexões abertas (writer -> task que atende a conexão), encerradas junto com o serviço"""
+        self.connections = {}
+
+    async def run(self, header: dict, payload: bytes):
+        action = header.get('action')
+        if action not in ACTIONS:
+            raise ValueError(f"Ação inválida: {action}")
+        encoder_spec = header.get('encoder')
+        if not isinstance(encoder_spec, str):
+            raise ValueError("O nome do codificador é obrigatório")
+        parameters = header.get('parameters') or {}
+        if not isinstance(parameters, dict):
+            raise ValueError("Os parâmetros precisam ser um objeto JSON")
+        parameters_key = json.dumps(parameters, sort_keys=True)
+        if self.is_inline(action, encoder_spec, payload):
+            return run_job(action, encoder_spec, parameters_key, payload)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, run_job, action, encoder_spec, parameters_key, payload)
+
+    def is_inline(self, action: str, encoder_spec: str, payload: bytes):
+        """Só encodes pequenos com custo limitado pelo tamanho do payload ocupam o event loop"""
+        return (action == 'encode' and len(payload) <= self.inline_size
+                and all(name in INLINE_ENCODERS for name in encoder_spec.lower().split('+')))
+
+    async def handle_request(self, header: dict, payload: bytes, writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        response = {'id': header.get('id'), 'ok': True}
+        try:
+            output = await self.run(header, payload)
+        except Exception as error:
+            """Um pedido inválido (ou uma mensagem corrompida) gera uma resposta de erro, nunca derruba o serviço"""
+            response.update(ok=False, error=str(error) or type(error).__name__)
+            output = b''
+        async with write_lock:
+            writer.write(pack_frame(response, output))
+            await writer.drain()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections[writer] = asyncio.current_task()
+        connection_slots = asyncio.Semaphore(self.max_connection_pending)
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        def finish(task):
+            tasks.discard(task)
+            connection_slots.release()
+            self.pending.release()
+        try:
+            while True:
+                frame = await read_frame(reader, self.max_message_size)
+                if frame is None:
+                    break
+                """O próximo pedido só é lido depois que este consegue uma vaga"""
+                await connection_slots.acquire()
+                try:
+                    await self.pending.acquire()
+                except BaseException:
+                    connection_slots.release()
+                    raise
+                task = asyncio.create_task(self.handle_request(*frame, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(finish)
+        except ProtocolError as error:
+            async with write_lock:
+                writer.write(pack_frame({'id': None, 'ok': False, 'error': str(error)}))
+        except ConnectionError:
+            pass
+        finally:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.connections.pop(writer, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host: str | None = None, port: int | None = None, path: str | None = None, ready=None):
+        """Atende até ser cancelado. ready(server) é chamado quando o socket já está aceitando conexões"""
+        self.pending = asyncio.Semaphore(self.max_pending)
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        try:
+            async with server:
+                if ready is not None:
+                    ready(server)
+                await server.serve_forever()
+        finally:
+            """Fechar o socket de cada conexão termina a leitura, e os pedidos já recebidos ainda são respondidos"""
+            for writer in list(self.connections):
+                writer.close()
+            await asyncio.gather(*self.connections.values(), return_exceptions=True)
+            self.executor.shutdown(cancel_futures=True)
+
+
+class ServiceClient:
+    """Cliente do serviço. Vários pedidos podem ser feitos ao mesmo tempo na mesma conexão (por exemplo com
+    asyncio.gather), e as respostas são associadas aos pedidos pelo id"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.waiting = {}
+        self.receiver = asyncio.create_task(self.receive())
+
+    @classmethod
+    async def connect(cls, host: str = '127.0.0.1', port: int = DEFAULT_PORT, path: str | None = None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def receive(self):
+        try:
+            while True:
+                frame = await read_frame(self.reader, sys.maxsize)
+                if frame is None:
+                    break
+                header, payload = frame
+                future = self.waiting.pop(header.get('id'), None)
+                if future is None:
+                    """Erro de protocolo, sem id: o servidor vai encerrar a conexão"""
+                    error = ServiceError(header.get('error', "Resposta inesperada do servidor"))
+                    for future in self.waiting.values():
+                        future.set_exception(error)
+                    self.waiting.clear()
+                elif header.get('ok'):
+                    future.set_result(payload)
+                else:
+                    future.set_exception(ServiceError(header.get('error')))
+        finally:
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Conexão com o servidor encerrada"))
+            self.waiting.clear()
+
+    async def request(self, action: str, encoder: str, payload: bytes, **parameters):
+        """Retorna o payload da resposta ou gera ServiceError"""
+        if self.receiver.done():
+            raise ConnectionError("Conexão com o servidor encerrada")
+        request_id = self.next_id
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self.writer.write(pack_frame({'id': request_id, 'action': action, 'encoder': encoder, 'parameters': parameters}, payload))
+        await self.writer.drain()
+        return await future
+
+    async def encode(self, encoder: str, payload: bytes, **parameters):
+        return await self.request('encode', encoder, payload, **parameters)
+
+    async def decode(self, encoder: str, payload: bytes, **parameters):
+        return await self.request('decode', encoder, payload, **parameters)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        await asyncio.gather(self.receiver, return_exceptions=True)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Serviço de encode/decode por socket TCP ou Unix, para muitos clientes "
+                                                 "em um único processo")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help="caminho de um socket Unix (no lugar de TCP)")
+    parser.add_argument('--workers', type=int, help="tamanho do pool de workers (padrão: número de CPUs)")
+    parser.add_argument('--threads', action='store_true', help="usa um pool de threads no lugar de processos")
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING, help="pedidos em andamento no total")
+    parser.add_argument('--max-connection-pending', type=int, default=DEFAULT_MAX_CONNECTION_PENDING, help="pedidos em andamento por conexão")
+    parser.add_argument('--max-message-size', type=int, default=DEFAULT_MAX_MESSAGE_SIZE, help="tamanho máximo de um pedido, em bytes")
+    parser.add_argument('--inline-size', type=int, default=DEFAULT_INLINE_SIZE, help=f"encodes com payload até esse tamanho e apenas com {', '.join(INLINE_ENCODERS)} não vão para o pool")
+    return parser
+
+
+def run_server(argv=None):
+    args = get_parser().parse_args(argv)
+    service = EncodingService(args.workers, args.threads, args.max_pending, args.max_connection_pending,
+                              args.max_message_size, args.inline_size)
+    address = args.unix or f"{args.host}:{args.port}"
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix,
+                                  ready=lambda server: print(f"Servindo em {address}", file=sys.stderr, flush=True)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_server())